@@ -0,0 +1,121 @@
+"""Throughput and rejected requests with and without admission control.
+
+Starts the in-process FakeWhisperServer enforcing --rate-limit requests
+per second (bursts of --burst) and --max-concurrency requests at a time,
+answering after --latency ms, then sends --requests transcriptions from
+--clients threads, as several dictations and batch jobs would. With
+admission control off every client sends as soon as it can and retries
+its 429s with backoff; with it on, requests go through the shared
+AdmissionController, which reads the server's Retry-After and
+x-ratelimit-* headers and adapts its window.
+
+Reports completed and failed transcriptions, 429s, sustained requests
+per second, p95 latency and the controller's window, queue depth and
+admission wait. Run from the repository root:
+
+    python benchmarks/bench_admission.py [--requests N] [--clients N] [--rate-limit RPS]
+"""
+import io
+import sys
+import time
+import logging
+import argparse
+import threading
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio.backends import FakeBackend, FakeWhisperServer
+from src.audio.transcriber import Transcriber
+from src.config import Config
+
+def scenario(admission: bool, args):
+    Config.ADMISSION = admission
+    Config.TRANSCRIPTION_WORKERS = args.clients
+    server = FakeWhisperServer(latency=args.latency / 1000, rate_limit=args.rate_limit, burst=args.burst,
+                               max_concurrency=args.max_concurrency, seed=args.seed)
+    transcriber = Transcriber(FakeBackend(server))
+    latencies, failed = [], 0
+    lock = threading.Lock()
+    remaining = iter(range(args.requests))
+
+    def client():
+        nonlocal failed
+        audio = io.BytesIO(b'\0' * 32000)
+        audio.name = 'segment_0.wav'
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            started = time.perf_counter()
+            text = transcriber.transcribe(audio)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                failed += not text
+
+    # Sample the controller's window and queue while the clients run
+    windows, queued, stop = [], [], threading.Event()
+
+    def sample():
+        while not stop.wait(0.05):
+            stats = transcriber.admission.stats()
+            windows.append(stats['window'])
+            queued.append(stats['queued'])
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    if transcriber.admission:
+        sampler.start()
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(args.clients)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+
+    stats = transcriber.admission.stats() if transcriber.admission else None
+    transcriber.close()
+    server.close()
+    p95 = statistics.quantiles(latencies, n=20)[18] * 1000
+    completed = len(latencies) - failed
+    return {
+        'completed': completed,
+        'failed': failed,
+        'rejected': server.rejected,
+        'sent': server.requests,
+        'rps': completed / elapsed,
+        'p95': p95,
+        'window': statistics.mean(windows) if windows else None,
+        'max_queued': max(queued) if queued else None,
+        'mean_wait': stats['mean_wait_ms'] if stats else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--clients', type=int, default=16, help="concurrent transcriptions wanted")
+    parser.add_argument('--latency', type=float, default=150.0, help="response time in ms")
+    parser.add_argument('--rate-limit', type=float, default=30.0, help="server limit in requests per second")
+    parser.add_argument('--burst', type=int, default=5)
+    parser.add_argument('--max-concurrency', type=int, default=6, help="server limit on requests in flight")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)  # 429s are expected here
+    Config.HTTP_KEEPALIVE_INTERVAL = 0
+    Config.RETRY_BASE_DELAY = 0.05
+    Config.RETRY_DEADLINE = 120.0
+
+    print(f"{'admission':>9} {'done':>5} {'failed':>6} {'429s':>5} {'sent':>5} {'req/s':>6} {'p95 ms':>7} "
+          f"{'window':>6} {'max queue':>9} {'wait ms':>7}")
+    for admission in (False, True):
+        r = scenario(admission, args)
+        extra = (f"{r['window']:>6.1f} {r['max_queued']:>9} {r['mean_wait']:>7.0f}" if admission
+                 else f"{'-':>6} {'-':>9} {'-':>7}")
+        print(f"{'on' if admission else 'off':>9} {r['completed']:>5} {r['failed']:>6} {r['rejected']:>5} "
+              f"{r['sent']:>5} {r['rps']:>6.1f} {r['p95']:>7.0f} {extra}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Transcription latency per backend on the same audio fixtures.
+
+Encodes the fixtures once (--wav files, or synthetic speech cut into
+segments by AudioRecorder) and sends each through Transcriber with every
+available backend: the in-process fake server (a floor for the client's
+own overhead), a self-hosted OpenAI-compatible server given by
+--base-url or TRANSCRIPTION_BASE_URL, and the hosted API if
+OPENAI_API_KEY is set. Reports the first (cold connection) request, then
+p50/p95 over --rounds passes, and a sample of the text. Run from the
+repository root:
+
+    python benchmarks/bench_backends.py [--wav FILE ...] [--base-url URL] [--model NAME] [--rounds N]
+"""
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio.backends import CompatibleBackend, FakeBackend, OpenAIBackend
+from src.audio.recorder import AudioRecorder
+from src.audio.sources import SyntheticSource, WavFileSource
+from src.audio.transcriber import Transcriber
+from src.config import Config
+
+def load_fixtures(args):
+    """Encoded uploads, the same bytes for every backend"""
+    Config.CAPTURE_MODE = 'blocking'
+    Config.WARM_STREAM = False
+    sources = [WavFileSource(path) for path in args.wav] if args.wav else [SyntheticSource(args.seconds)]
+    fixtures = []
+    for source in sources:
+        recorder = AudioRecorder(source=source)
+        recorder.on_segment = lambda segment: fixtures.append(recorder.encode_segment(segment))
+        recorder.start()
+        while recorder.record_chunk():
+            pass
+        recorder.stop()
+        recorder.finish_recording()
+        recorder.cleanup()
+    return [fixture for fixture in fixtures if fixture is not None]
+
+def backends(args):
+    yield 'fake', lambda: FakeBackend()
+    base_url = args.base_url or Config.TRANSCRIPTION_BASE_URL
+    if base_url:
+        yield 'compatible', lambda: CompatibleBackend(base_url=base_url, model=args.model)
+    if Config.OPENAI_API_KEY:
+        yield 'openai', lambda: OpenAIBackend()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--wav', type=Path, nargs='*', help="fixtures to send instead of synthetic speech")
+    parser.add_argument('--seconds', type=float, default=20.0, help="length of synthetic speech")
+    parser.add_argument('--base-url', help="OpenAI-compatible server, e.g. http://whisper.lan:8000/v1/")
+    parser.add_argument('--model', help="model name on that server")
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args)
+    size = sum(fixture.getbuffer().nbytes for fixture in fixtures)
+    print(f"{len(fixtures)} fixtures, {size / 1024:.0f} KB as {Path(fixtures[0].name).suffix[1:]}\n")
+    print(f"{'backend':>10} {'cold ms':>8} {'p50 ms':>7} {'p95 ms':>7} {'failed':>7}  text")
+    for name, create in backends(args):
+        transcriber = Transcriber(create())
+        started = time.perf_counter()
+        sample = transcriber.transcribe(fixtures[0])
+        cold = (time.perf_counter() - started) * 1000
+        latencies, failed = [], 0
+        for _ in range(args.rounds):
+            for fixture in fixtures:
+                started = time.perf_counter()
+                text = transcriber.transcribe(fixture)
+                latencies.append((time.perf_counter() - started) * 1000)
+                failed += not text
+        transcriber.close()
+        p95 = statistics.quantiles(latencies, n=20)[18] if len(latencies) > 1 else latencies[0]
+        print(f"{name:>10} {cold:>8.0f} {statistics.median(latencies):>7.0f} {p95:>7.0f} {failed:>7}  {sample[:40]!r}")
+
+if __name__ == "__main__":
+    main()
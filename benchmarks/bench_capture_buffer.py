@@ -0,0 +1,77 @@
+"""Compare the list-of-bytes capture path with the preallocated AudioBuffer.
+
+Measures the post-release save latency and peak Python allocations for
+5 s, 30 s and 10 min recordings. Run from the repository root:
+
+    python benchmarks/bench_capture_buffer.py
+"""
+import io
+import sys
+import time
+import wave
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio.buffer import AudioBuffer
+from src.config import Config
+
+DURATIONS = [5, 30, 600]
+
+def make_chunks(seconds):
+    """Generate float32 PortAudio-style chunks of noise"""
+    rng = np.random.default_rng(0)
+    count = int(seconds * Config.RATE / Config.CHUNK)
+    return [(rng.standard_normal(Config.CHUNK) * 0.1).astype(np.float32).tobytes()
+            for _ in range(count)]
+
+def write_wav(pcm):
+    out = io.BytesIO()
+    with wave.open(out, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(Config.RATE)
+        wf.writeframes(pcm)
+    return out
+
+def list_path(chunks):
+    """Baseline: append bytes, join and normalize after release"""
+    frames = []
+    for data in chunks:
+        frames.append(data)
+    start = time.perf_counter()
+    audio_data = np.frombuffer(b''.join(frames), dtype=np.float32)
+    max_val = np.max(np.abs(audio_data))
+    audio_data = audio_data / max_val
+    write_wav((audio_data * 32767).astype(np.int16).tobytes())
+    return time.perf_counter() - start
+
+def buffer_path(chunks):
+    """AudioBuffer: copy once during capture, fused convert after release"""
+    buffer = AudioBuffer(int(Config.MAX_AUDIO_LENGTH * Config.RATE))
+    for data in chunks:
+        buffer.append_bytes(data)
+    start = time.perf_counter()
+    write_wav(buffer.to_int16(1.0 / buffer.peak()))
+    return time.perf_counter() - start
+
+def measure(func, chunks):
+    tracemalloc.start()
+    elapsed = func(chunks)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    print(f"{'length':>8} {'path':>8} {'save ms':>10} {'peak MB':>10}")
+    for seconds in DURATIONS:
+        chunks = make_chunks(seconds)
+        for name, func in (('list', list_path), ('buffer', buffer_path)):
+            elapsed, peak = measure(func, chunks)
+            print(f"{seconds:>7}s {name:>8} {elapsed * 1000:>10.2f} {peak / 1e6:>10.2f}")
+
+if __name__ == "__main__":
+    main()
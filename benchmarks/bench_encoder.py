@@ -0,0 +1,100 @@
+"""Upload payload, encode CPU and release latency per upload codec.
+
+Records the same dictation in real time for each case and compares the
+previous save_recording() WAV file with in-memory WAV and the codecs that
+are encoded during capture (FLAC, Opus at several bitrates; these need
+ffmpeg). Reports payload size, CPU seconds per audio second including
+the ffmpeg child (lower is better), time from release to a ready
+payload, and the upload time of the final segment at --uplink kbit/s
+added to that as an end-to-end estimate. Run from the repository root:
+
+    python benchmarks/bench_encoder.py [--wav FILE] [--seconds N] [--uplink KBPS]
+"""
+import sys
+import time
+import argparse
+import resource
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio.recorder import AudioRecorder
+from src.audio.sources import SyntheticSource, WavFileSource
+from src.config import Config
+
+CASES = [
+    # (label, UPLOAD_CODEC, UPLOAD_BITRATE)
+    ('save_recording', 'wav', None),
+    ('wav', 'wav', None),
+    ('flac', 'flac', None),
+    ('opus 16k', 'opus', '16k'),
+    ('opus 24k', 'opus', '24k'),
+    ('opus 32k', 'opus', '32k'),
+]
+
+def cpu_seconds():
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+def run(label, codec, bitrate, args):
+    """Record once; returns (payload bytes, final payload bytes, CPU s per audio s, release-to-ready ms)"""
+    Config.UPLOAD_CODEC = codec
+    Config.UPLOAD_BITRATE = bitrate or Config.UPLOAD_BITRATE
+    source = WavFileSource(args.wav, realtime=True) if args.wav else SyntheticSource(args.seconds, realtime=True)
+    recorder = AudioRecorder(source=source)
+    if codec != 'wav' and not recorder.compress:
+        recorder.cleanup()
+        return None
+
+    sizes = []
+
+    def encode(segment):
+        encoded = recorder.encode_segment(segment)
+        sizes.append(encoded.getbuffer().nbytes)
+
+    recorder.on_segment = encode
+    cpu = cpu_seconds()
+    recorder.start()
+    while recorder.record_chunk():
+        pass
+
+    release = time.perf_counter()
+    recorder.stop()
+    if label == 'save_recording':
+        path = Config.TEMP_DIR / "bench_encoder.wav"
+        recorder.save_recording(path)
+        sizes.append(path.stat().st_size)
+        path.unlink()
+    else:
+        recorder.finish_recording()
+    ready_ms = (time.perf_counter() - release) * 1000
+    audio_seconds = source.duration
+    cpu = (cpu_seconds() - cpu) / audio_seconds
+    recorder.cleanup()
+    return sum(sizes), sizes[-1], cpu, ready_ms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--wav', type=Path, help="replay this file instead of synthetic speech")
+    parser.add_argument('--seconds', type=float, default=15.0, help="length of synthetic speech")
+    parser.add_argument('--uplink', type=float, default=1000.0, help="uplink in kbit/s for the upload estimate")
+    args = parser.parse_args()
+
+    Config.CAPTURE_MODE = 'blocking'
+    Config.WARM_STREAM = False
+    print(f"{'case':>15} {'payload KB':>11} {'vs WAV':>7} {'CPU/s':>8} {'ready ms':>9} "
+          f"{'upload ms':>10} {'end-to-end ms':>14}")
+    reference = None
+    for label, codec, bitrate in CASES:
+        result = run(label, codec, bitrate, args)
+        if result is None:
+            print(f"{label:>15}   skipped (ffmpeg not found)")
+            continue
+        total, final, cpu, ready_ms = result
+        reference = reference or total
+        upload_ms = final * 8 / args.uplink
+        print(f"{label:>15} {total / 1024:>11.1f} {total / reference:>7.0%} {cpu:>8.4f} {ready_ms:>9.1f} "
+              f"{upload_ms:>10.0f} {ready_ms + upload_ms:>14.0f}")
+
+if __name__ == "__main__":
+    main()
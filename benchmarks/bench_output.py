@@ -0,0 +1,119 @@
+"""Characters per second and time to last character per text output strategy.
+
+Opens a Tk text box, gives it the keyboard focus and writes sample texts
+into it with each available TextOutput strategy (clipboard paste, bulk
+xdotool typing, pyautogui per-key typing), polling the box until the
+whole text has arrived. Reports how long the write call blocked, the
+time until the last character appeared, characters per second and
+whether the text arrived intact (the Portuguese sample checks non-ASCII
+handling). Needs an X display; headless, run it under Xvfb from the
+repository root:
+
+    xvfb-run -a python benchmarks/bench_output.py [--repeat N]
+
+The clipboard strategy needs xclip or xsel, and xdotool for the paste
+shortcut; the xdotool strategy needs xdotool.
+"""
+import sys
+import time
+import argparse
+import threading
+import statistics
+import tkinter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.ui.text_output import STRATEGIES
+from src.config import Config
+
+SAMPLES = {
+    'sentence': "Please send the quarterly report to the whole team by Friday.",
+    'paragraph': ("The meeting covered the migration plan in detail. We agreed to move the staging "
+                  "environment first, watch error rates for a week, and only then schedule production. "
+                  "Each service owner will confirm their rollback steps before the freeze, and the "
+                  "on-call rotation will be doubled during the cut-over window. ") * 2,
+    'portuguese': ("Não há razão para adiar a reunião: a sessão começa às nove e a apresentação já "
+                   "está pronta. Obrigado pela atenção e até amanhã."),
+}
+
+class Target:
+    """Focused text box; measures when a write has fully arrived"""
+
+    def __init__(self):
+        self.root = tkinter.Tk()
+        self.root.title('bench_output')
+        self.text = tkinter.Text(self.root, width=100, height=20)
+        self.text.pack()
+
+    def content(self) -> str:
+        return self.text.get('1.0', 'end-1c')
+
+    def measure(self, strategy, text: str, timeout: float) -> dict:
+        self.text.delete('1.0', 'end')
+        self.root.focus_force()
+        self.text.focus_set()
+        self.root.update()
+        time.sleep(0.2)  # Let the focus change reach the X server
+        result = {}
+
+        def write():
+            started = time.perf_counter()
+            try:
+                strategy.write(text)
+            except Exception as e:
+                result['error'] = str(e)
+            result['call'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        worker = threading.Thread(target=write, daemon=True)
+        worker.start()
+        last = None
+        while time.perf_counter() - started < timeout:
+            self.root.update()
+            content = self.content()
+            if content == text:
+                last = time.perf_counter() - started
+                break
+            if not worker.is_alive() and len(content) >= len(text):
+                break  # Everything arrived, but not intact
+            time.sleep(0.002)
+        worker.join(timeout)
+        self.root.update()
+        result['last'] = last
+        result['intact'] = self.content() == text
+        return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=30.0, help="seconds to wait for one text")
+    args = parser.parse_args()
+
+    Config.OUTPUT_CLIPBOARD_RESTORE_DELAY = 0.2
+    target = Target()
+    print(f"{'strategy':>10} {'sample':>11} {'chars':>6} {'call ms':>8} {'last char ms':>13} {'chars/s':>8} {'intact':>7}")
+    for name, cls in STRATEGIES.items():
+        strategy = cls()
+        if not strategy.available():
+            print(f"{name:>10}  (not available)")
+            continue
+        for sample, text in SAMPLES.items():
+            runs = [target.measure(strategy, text, args.timeout) for _ in range(args.repeat)]
+            errors = [run['error'] for run in runs if 'error' in run]
+            if errors:
+                print(f"{name:>10} {sample:>11}  failed: {errors[0]}")
+                continue
+            call = statistics.median(run['call'] for run in runs) * 1000
+            arrived = [run['last'] for run in runs if run['last'] is not None]
+            if arrived:
+                last = statistics.median(arrived)
+                timing = f"{last * 1000:>13.0f} {len(text) / last:>8.0f}"
+            else:
+                timing = f"{'-':>13} {'-':>8}"
+            intact = sum(run['intact'] for run in runs)
+            print(f"{name:>10} {sample:>11} {len(text):>6} {call:>8.0f} {timing} {intact:>4}/{len(runs)}")
+    target.root.destroy()
+
+if __name__ == "__main__":
+    main()
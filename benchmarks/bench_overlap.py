@@ -0,0 +1,111 @@
+"""Hotkey blocking time and throughput of back-to-back dictations.
+
+Records --dictations synthetic dictations in real time, each started
+--pause seconds after the previous release, and sends them to a stand-in
+transcriber that answers after --api-latency seconds. Compares the
+previous synchronous release (finish, wait for every segment, output)
+with TranscriptionPipeline, where the release returns at once and
+dictations overlap. Reports how long the release blocks the keyboard
+listener, release-to-text latency and total time, and checks that text
+comes out in order. Run from the repository root:
+
+    python benchmarks/bench_overlap.py [--dictations N] [--seconds S] [--api-latency S]
+"""
+import sys
+import time
+import itertools
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio.recorder import AudioRecorder
+from src.audio.sources import SyntheticSource
+from src.pipeline import TranscriptionPipeline
+from src.config import Config
+
+class FakeTranscriber:
+    """Answers with the request's sequence number; odd requests are three times faster"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = itertools.count()
+
+    def transcribe(self, audio, prompt=None, on_text=None) -> str:
+        number = next(self.calls)
+        time.sleep(self.latency * (0.5 if number % 2 else 1.5))
+        return str(number)
+
+def in_order(texts):
+    """Whether the dictations came out in the order their requests were sent"""
+    firsts = [int(text.split()[0]) for text in texts if text]
+    return firsts == sorted(firsts)
+
+def record(recorder, seconds):
+    recorder.source = SyntheticSource(seconds, realtime=True)
+    recorder.start()
+    while recorder.record_chunk():
+        pass
+    recorder.stop()
+
+def run_sync(args):
+    """The previous release path: encode and transcribe before returning"""
+    recorder = AudioRecorder(source=SyntheticSource(args.seconds))
+    transcriber = FakeTranscriber(args.api_latency)
+    blocked, output, segments = [], [], []
+    recorder.on_segment = segments.append
+    started = time.perf_counter()
+    for _ in range(args.dictations):
+        segments.clear()
+        record(recorder, args.seconds)
+        release = time.perf_counter()
+        recorder.finish_recording()
+        output.append(" ".join(transcriber.transcribe(recorder.encode_segment(segment)) for segment in segments))
+        blocked.append(time.perf_counter() - release)  # The text is out when the release returns
+        time.sleep(args.pause)
+    recorder.cleanup()
+    return blocked, blocked, time.perf_counter() - started, in_order(output)
+
+def run_pipeline(args):
+    recorder = AudioRecorder(source=SyntheticSource(args.seconds))
+    output = []
+    pipeline = TranscriptionPipeline(recorder, FakeTranscriber(args.api_latency),
+                                     lambda text: output.append((time.perf_counter(), text)))
+    blocked, releases = [], []
+    started = time.perf_counter()
+    for _ in range(args.dictations):
+        if pipeline.begin() is None:
+            pipeline.wait_idle()
+            pipeline.begin()
+        record(recorder, args.seconds)
+        release = time.perf_counter()
+        pipeline.finish(release)
+        blocked.append(time.perf_counter() - release)
+        releases.append(release)
+        time.sleep(args.pause)
+    pipeline.wait_idle()
+    total = time.perf_counter() - started
+    latencies = [done - release for (done, _), release in zip(output, releases)]
+    recorder.cleanup()
+    return blocked, latencies, total, in_order([text for _, text in output])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dictations', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=3.0, help="length of each dictation")
+    parser.add_argument('--pause', type=float, default=0.3, help="seconds from release to the next press")
+    parser.add_argument('--api-latency', type=float, default=1.5, help="seconds per transcription request")
+    args = parser.parse_args()
+
+    Config.CAPTURE_MODE = 'blocking'
+    Config.WARM_STREAM = False
+    Config.UPLOAD_CODEC = 'wav'
+    print(f"{'path':>10} {'release blocks ms':>18} {'release-to-text ms':>19} {'total s':>8} {'in order':>9}")
+    for name, run in (('sync', run_sync), ('pipeline', run_pipeline)):
+        blocked, latencies, total, ordered = run(args)
+        print(f"{name:>10} {statistics.mean(blocked) * 1000:>18.1f} {statistics.mean(latencies) * 1000:>19.0f} "
+              f"{total:>8.1f} {str(ordered):>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Headless capture -> encode (-> transcribe) benchmark.
+
+Drives AudioRecorder from a SyntheticSource (or a WAV file) instead of a
+microphone, as fast as possible, and reports capture throughput, segment
+encode times, upload bytes and release-to-upload latency. With
+--transcribe the segments are also sent through Transcriber (needs
+OPENAI_API_KEY). --compare-trim runs twice, without and with silence
+trimming, and reports the bytes and latency saved. --via-disk encodes
+through a temp file in TEMP_DIR, as before in-memory encoding. Run from
+the repository root:
+
+    python benchmarks/bench_pipeline.py [--wav FILE] [--seconds N] [--transcribe] [--compare-trim] [--via-disk]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio.recorder import AudioRecorder
+from src.audio.segmenter import WAV_HEADER_BYTES
+from src.audio.sources import SyntheticSource, WavFileSource
+from src.config import Config
+
+def run(args):
+    """One headless dictation; returns (upload bytes, release-to-upload ms, total transcribe ms)"""
+    Config.CAPTURE_MODE = 'blocking'
+    Config.WARM_STREAM = False
+    source = WavFileSource(args.wav, realtime=False) if args.wav else SyntheticSource(args.seconds)
+    recorder = AudioRecorder(source=source)
+    transcriber = None
+    if args.transcribe:
+        from src.audio.transcriber import Transcriber
+        transcriber = Transcriber()
+
+    workdir = Config.TEMP_DIR
+    results = []
+
+    def process(segment):
+        """Encode (and transcribe) a segment as soon as it closes"""
+        started = time.perf_counter()
+        if args.via_disk:
+            # The previous path: a temp WAV written, re-read by the upload and removed
+            audio = workdir / f"segment_{segment.index}.wav"
+            recorder.save_segment(segment, audio)
+            audio.read_bytes()
+        else:
+            audio = recorder.encode_segment(segment)
+        encoded = time.perf_counter()
+        text_ms = float('nan')
+        if transcriber:
+            transcriber.transcribe(audio)
+            text_ms = (time.perf_counter() - encoded) * 1000
+        if args.via_disk:
+            audio.unlink()
+        results.append((segment, (encoded - started) * 1000, text_ms, encoded))
+
+    recorder.on_segment = process
+    start = time.perf_counter()
+    recorder.start()
+    while recorder.record_chunk():
+        pass
+    capture = time.perf_counter() - start
+
+    # Release: everything from here to the final segment's upload is on the critical path
+    release = time.perf_counter()
+    recorder.stop()
+    recorder.finish_recording()
+
+    print(f"{'segment':>8} {'seconds':>8} {'sent s':>7} {'encode ms':>10} {'transcribe ms':>14}")
+    for segment, encode_ms, text_ms, _ in results:
+        print(f"{segment.index:>8} {segment.duration:>8.2f} {segment.kept_samples / segment.rate:>7.2f} "
+              f"{encode_ms:>10.2f} {text_ms:>14.1f}")
+
+    audio_seconds = len(recorder.buffer) / recorder.rate
+    raw_bytes = sum(len(segment.audio) * 2 + WAV_HEADER_BYTES for segment, *_ in results)
+    sent_bytes = sum(segment.kept_samples * 2 + WAV_HEADER_BYTES for segment, *_ in results)
+    print(f"\ncaptured {audio_seconds:.1f}s in {capture:.2f}s ({audio_seconds / capture:.0f}x real time)")
+    print(f"uploaded {sent_bytes} of {raw_bytes} bytes ({1 - sent_bytes / max(raw_bytes, 1):.0%} trimmed)")
+    latency_ms = float('nan')
+    if results and results[-1][0].final:
+        latency_ms = (results[-1][3] - release) * 1000
+        print(f"release-to-upload latency: {latency_ms:.1f} ms")
+    recorder.cleanup()
+    return sent_bytes, latency_ms, sum(text_ms for *_, text_ms, _ in results)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--wav', type=Path, help="replay this file instead of synthetic speech")
+    parser.add_argument('--seconds', type=float, default=120.0, help="length of synthetic speech")
+    parser.add_argument('--transcribe', action='store_true', help="also transcribe each segment")
+    parser.add_argument('--via-disk', action='store_true', help="encode through a temp WAV in TEMP_DIR instead of memory")
+    parser.add_argument('--compare-trim', action='store_true', help="run without and with silence trimming")
+    args = parser.parse_args()
+
+    if not args.compare_trim:
+        run(args)
+        return
+
+    outcomes = {}
+    for trim in (False, True):
+        Config.TRIM_SILENCE = trim
+        print(f"\n== silence trimming {'on' if trim else 'off'} ==")
+        outcomes[trim] = run(args)
+    (bytes_off, upload_off, text_off), (bytes_on, upload_on, text_on) = outcomes[False], outcomes[True]
+    print(f"\ntrimming saves {bytes_off - bytes_on} bytes ({1 - bytes_on / max(bytes_off, 1):.0%}), "
+          f"release-to-upload {upload_off:.1f} -> {upload_on:.1f} ms")
+    if args.transcribe:
+        print(f"total transcribe time {text_off:.0f} -> {text_on:.0f} ms ({text_on - text_off:+.0f} ms)")
+
+if __name__ == "__main__":
+    main()
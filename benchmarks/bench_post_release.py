@@ -0,0 +1,63 @@
+"""Post-release processing time: peak normalization vs streaming gain.
+
+'peak' is the previous save path: a full pass for the peak, then a pass
+that scales and converts to int16. 'streaming' updates StreamingGain per
+chunk during capture (reported as capture CPU) so only the fused
+scale-and-convert pass remains after release. Run from the repository
+root:
+
+    python benchmarks/bench_post_release.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio.buffer import AudioBuffer
+from src.audio.gain import StreamingGain
+from src.config import Config
+
+DURATIONS = [30, 300, 600]
+
+def make_audio(seconds):
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal(int(seconds * Config.RATE)) * 0.05).astype(np.float32)
+    audio[Config.RATE] = 0.99  # A click that peak normalization would key on
+    return audio
+
+def peak_path(audio):
+    buffer = AudioBuffer(len(audio), dtype=np.float32)
+    buffer.append(audio)
+    start = time.perf_counter()
+    peak = buffer.peak()
+    buffer.to_int16(1.0 / peak)
+    return 0.0, time.perf_counter() - start
+
+def streaming_path(audio):
+    buffer = AudioBuffer(len(audio), dtype=np.int16)
+    gain = StreamingGain()
+    capture = 0.0
+    for i in range(0, len(audio), Config.CHUNK):
+        chunk = audio[i:i + Config.CHUNK]
+        buffer.append(chunk)
+        started = time.perf_counter()
+        gain.update(chunk)
+        capture += time.perf_counter() - started
+    start = time.perf_counter()
+    factor = gain.gain()
+    buffer.to_int16(factor, clip=factor * gain.peak > 1.0)
+    return capture, time.perf_counter() - start
+
+def main():
+    print(f"{'length':>7} {'path':>10} {'capture ms':>11} {'post-release ms':>16}")
+    for seconds in DURATIONS:
+        audio = make_audio(seconds)
+        for name, func in (('peak', peak_path), ('streaming', streaming_path)):
+            capture, post = func(audio)
+            print(f"{seconds:>6}s {name:>10} {capture * 1000:>11.1f} {post * 1000:>16.2f}")
+
+if __name__ == "__main__":
+    main()
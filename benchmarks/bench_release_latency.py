@@ -0,0 +1,82 @@
+"""Measure key-release-to-upload-ready latency for each capture mode.
+
+Records synthetic speech from a SyntheticSource paced like a real device
+in 'blocking', 'callback' and warm-stream mode, then times what
+VoiceToTextApp.stop_recording and the pipeline do before the upload can
+start: stopping the stream, joining the polling thread, closing the last
+segment and encoding it in memory. No input device is needed. Run from
+the repository root:
+
+    python benchmarks/bench_release_latency.py [--runs N] [--seconds S] [--codec wav|flac|opus]
+"""
+import sys
+import time
+import logging
+import argparse
+import threading
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio.recorder import AudioRecorder
+from src.audio.sources import SyntheticSource
+from src.config import Config
+
+MODES = {
+    'blocking': ('blocking', False),
+    'callback': ('callback', False),
+    'warm': ('callback', True),
+}
+
+def poll(recorder):
+    """Same loop as VoiceToTextApp._record_audio"""
+    while recorder.is_recording and recorder.record_chunk():
+        pass
+
+def run_once(recorder, seconds):
+    if not recorder.start():
+        raise RuntimeError("Failed to start recording")
+    thread = None
+    if not recorder.uses_callback:
+        thread = threading.Thread(target=poll, args=(recorder,), daemon=True)
+        thread.start()
+    time.sleep(seconds)
+
+    release = time.perf_counter()
+    recorder.stop()
+    stopped = time.perf_counter()
+    if thread:
+        thread.join(timeout=1.0)
+    segment = recorder.finish_recording(emit=False)
+    if segment is None or recorder.encode_segment(segment) is None:
+        raise RuntimeError("Nothing to upload")
+    return stopped - release, time.perf_counter() - release
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--seconds', type=float, default=2.0, help="length of each recording")
+    parser.add_argument('--codec', default=Config.UPLOAD_CODEC, help="upload codec (falls back to wav without ffmpeg)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    Config.UPLOAD_CODEC = args.codec
+    print(f"{'mode':>9} {'stop p50':>10} {'stop max':>10} {'upload p50':>11} {'upload max':>11}  (ms)")
+    for name, (capture_mode, warm) in MODES.items():
+        Config.CAPTURE_MODE = capture_mode
+        Config.WARM_STREAM = warm
+        recorder = AudioRecorder(source=SyntheticSource(30, realtime=True, loop=True))
+        try:
+            if warm:
+                recorder.arm()
+            results = [run_once(recorder, args.seconds) for _ in range(args.runs)]
+        finally:
+            recorder.cleanup()
+        stops = [r[0] * 1000 for r in results]
+        uploads = [r[1] * 1000 for r in results]
+        print(f"{name:>9} {statistics.median(stops):>10.1f} {max(stops):>10.1f} "
+              f"{statistics.median(uploads):>11.1f} {max(uploads):>11.1f}")
+
+if __name__ == "__main__":
+    main()
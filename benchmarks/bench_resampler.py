@@ -0,0 +1,50 @@
+"""Real-time factor of the capture converter (decode, downmix, resample).
+
+Feeds 60 s of native-format device chunks through CaptureConverter and
+reports CPU seconds per audio second on one core (lower is better; 0.01
+means 1% of a core). Run from the repository root:
+
+    python benchmarks/bench_resampler.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio.resample import CaptureConverter
+from src.config import Config
+
+SECONDS = 60
+CASES = [
+    (np.int16, 1, 16000),
+    (np.int16, 2, 44100),
+    (np.int16, 2, 48000),
+    (np.float32, 2, 48000),
+    (np.int32, 1, 96000),
+]
+
+def make_chunks(dtype, channels, rate):
+    rng = np.random.default_rng(0)
+    chunk = int(Config.CHUNK * rate / Config.RATE)
+    samples = rng.standard_normal(SECONDS * rate * channels) * 0.1
+    if np.dtype(dtype).kind == 'i':
+        samples *= np.iinfo(dtype).max
+    data = samples.astype(dtype).tobytes()
+    step = chunk * channels * np.dtype(dtype).itemsize
+    return [data[i:i + step] for i in range(0, len(data), step)]
+
+def main():
+    print(f"{'format':>8} {'ch':>3} {'rate':>6} {'RTF':>9} {'out samples':>12}")
+    for dtype, channels, rate in CASES:
+        chunks = make_chunks(dtype, channels, rate)
+        converter = CaptureConverter(dtype, channels, rate, Config.RATE)
+        start = time.process_time()
+        produced = sum(len(converter.process(chunk)) for chunk in chunks)
+        rtf = (time.process_time() - start) / SECONDS
+        print(f"{np.dtype(dtype).name:>8} {channels:>3} {rate:>6} {rtf:>9.5f} {produced:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Lost dictations and tail latency with retries and hedged requests.
+
+Starts the in-process FakeWhisperServer answering after --latency ms,
+delaying --slow-rate of requests by --slow ms extra and failing
+--error-rate of them with a 5xx, then sends --requests transcriptions
+through Transcriber with:
+
+  single         one attempt, as before the retry policy
+  retry          jittered exponential backoff on retryable errors
+  retry + hedge  also a duplicate request past the observed p95
+
+Reports failed transcriptions, p50/p95/p99 latency and the requests
+the server saw. Run from the repository root:
+
+    python benchmarks/bench_retry.py [--requests N] [--error-rate R] [--slow-rate R]
+"""
+import io
+import sys
+import time
+import logging
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio.backends import FakeBackend, FakeWhisperServer
+from src.audio.transcriber import Transcriber
+from src.config import Config
+
+def scenario(name, args):
+    Config.RETRY_MAX_ATTEMPTS = 1 if name == 'single' else 3
+    Config.HEDGE = name == 'retry + hedge'
+    server = FakeWhisperServer(latency=args.latency / 1000, slow=args.slow / 1000, slow_rate=args.slow_rate,
+                               error_rate=args.error_rate, seed=args.seed)
+    transcriber = Transcriber(FakeBackend(server))
+    audio = io.BytesIO(b'\0' * 32000)
+    audio.name = 'segment_0.wav'
+
+    latencies, failed = [], 0
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        text = transcriber.transcribe(audio)
+        latencies.append((time.perf_counter() - started) * 1000)
+        failed += not text
+    time.sleep(args.slow / 1000)  # Let abandoned hedges finish before counting
+    transcriber.close()
+    server.close()
+    quantiles = statistics.quantiles(latencies, n=100)
+    return failed, quantiles[49], quantiles[94], quantiles[98], server.requests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=40.0, help="normal response time in ms")
+    parser.add_argument('--slow', type=float, default=400.0, help="extra ms for slow responses")
+    parser.add_argument('--slow-rate', type=float, default=0.03)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)  # Failed attempts are expected here
+    Config.HTTP_KEEPALIVE_INTERVAL = 0
+    Config.RETRY_BASE_DELAY = 0.05
+    Config.HEDGE_BUDGET = 0.2
+
+    print(f"{'policy':>14} {'failed':>7} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'requests sent':>14}")
+    for name in ('single', 'retry', 'retry + hedge'):
+        failed, p50, p95, p99, sent = scenario(name, args)
+        print(f"{name:>14} {failed:>7} {p50:>7.0f} {p95:>7.0f} {p99:>7.0f} {sent:>14}")
+
+if __name__ == "__main__":
+    main()
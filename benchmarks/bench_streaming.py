@@ -0,0 +1,118 @@
+"""Time to first word with streamed versus whole transcription responses.
+
+Starts the in-process FakeWhisperServer, which answers after --latency ms
+and, for streamed requests, sends one word every --interval ms after the
+first. With --correct the streamed words contain a mistake that the final
+text fixes. Each of --dictations synthetic dictations of --seconds runs
+through TranscriptionPipeline into a stand-in screen that applies typed
+text and backspaces, first with whole responses and then with
+STREAMING on. Reports release-to-first-word and release-to-last-word
+latency, characters corrected and whether the screen ended up with the
+right text. Run from the repository root:
+
+    python benchmarks/bench_streaming.py [--latency MS] [--interval MS] [--correct]
+"""
+import sys
+import time
+import logging
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio.backends import FakeBackend, FakeWhisperServer
+from src.audio.recorder import AudioRecorder
+from src.audio.sources import SyntheticSource
+from src.audio.transcriber import Transcriber
+from src.pipeline import TranscriptionPipeline
+from src.ui.text_output import IncrementalText
+from src.config import Config
+
+TEXT = "we agreed to move the staging environment first and watch the error rates for a week"
+
+class Screen:
+    """Applies output like a text box would, noting when the first and last characters arrived"""
+
+    def __init__(self):
+        self.content = ""
+        self.first = None
+        self.last = None
+        self.erased = 0
+
+    def _typed(self):
+        now = time.perf_counter()
+        self.first = self.first or now
+        self.last = now
+
+    def write_text(self, text: str) -> bool:
+        return self.insert(text)
+
+    def insert(self, text: str) -> bool:
+        self.content += text
+        self._typed()
+        return True
+
+    def erase(self, count: int) -> bool:
+        self.content = self.content[:-count]
+        self.erased += count
+        self._typed()
+        return True
+
+    def incremental(self) -> IncrementalText:
+        return IncrementalText(self)
+
+def scenario(streaming: bool, args):
+    Config.STREAMING = streaming
+    stream_text = TEXT.replace("staging", "stage in") if args.correct else None
+    server = FakeWhisperServer(text=TEXT, stream_text=stream_text, latency=args.latency / 1000,
+                               stream_interval=args.interval / 1000, seed=1)
+    transcriber = Transcriber(FakeBackend(server))
+    recorder = AudioRecorder(source=SyntheticSource(args.seconds))
+    first, last, erased, correct = [], [], 0, 0
+    for number in range(args.dictations):
+        screen = Screen()
+        pipeline = TranscriptionPipeline(recorder, transcriber, screen.write_text, incremental=screen.incremental)
+        recorder.source = SyntheticSource(args.seconds, seed=number)
+        pipeline.begin()
+        recorder.start()
+        while recorder.record_chunk():
+            pass
+        recorder.stop()
+        release = time.perf_counter()
+        segments = recorder._segment_index
+        pipeline.finish(release)
+        pipeline.wait_idle()
+        segments = recorder._segment_index or segments
+        first.append(max(screen.first - release, 0.0))
+        last.append(screen.last - release)
+        erased += screen.erased
+        correct += screen.content.strip() == " ".join([TEXT] * segments)
+    recorder.cleanup()
+    transcriber.close()
+    server.close()
+    return statistics.mean(first) * 1000, statistics.mean(last) * 1000, erased, correct
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dictations', type=int, default=3)
+    parser.add_argument('--seconds', type=float, default=8.0, help="length of each dictation")
+    parser.add_argument('--latency', type=float, default=300.0, help="ms until the first word is sent")
+    parser.add_argument('--interval', type=float, default=60.0, help="ms between streamed words")
+    parser.add_argument('--correct', action='store_true', help="stream a mistake that the final text fixes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    Config.CAPTURE_MODE = 'blocking'
+    Config.WARM_STREAM = False
+    Config.UPLOAD_CODEC = 'wav'
+    Config.HTTP_KEEPALIVE_INTERVAL = 0
+    Config.TRANSCRIPT_CACHE_ENTRIES = 0  # Every dictation makes its requests
+    print(f"{'responses':>10} {'first word ms':>14} {'last word ms':>13} {'chars corrected':>16} {'correct':>8}")
+    for streaming in (False, True):
+        first, last, erased, correct = scenario(streaming, args)
+        print(f"{'streamed' if streaming else 'whole':>10} {first:>14.0f} {last:>13.0f} {erased:>16} "
+              f"{correct:>5}/{args.dictations}")
+
+if __name__ == "__main__":
+    main()
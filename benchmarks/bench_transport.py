@@ -0,0 +1,132 @@
+"""Connection set-up time saved by the pooled, pre-warmed transport.
+
+Starts a local HTTPS stand-in for the transcription API (self-signed
+certificate made with the openssl CLI) that adds --rtt of latency per
+round trip and closes connections idle for --server-idle seconds, like
+a real front end. Then sends --requests uploads separated by --gap idle
+seconds through:
+
+  fresh client   a new connection for every request
+  default pool   httpx's defaults (idle connections dropped after 5 s)
+  tuned pool     PooledTransport without keep-alive or pre-warming
+  keep-alive     PooledTransport touching connections while idle
+  prewarm        PooledTransport warmed one "utterance" before the upload
+
+Reports mean request time and handshake time per request. Run from the
+repository root:
+
+    python benchmarks/bench_transport.py [--rtt MS] [--gap S] [--requests N]
+"""
+import ssl
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio.transport import PooledTransport
+from src.config import Config
+
+PAYLOAD = b'\0' * 100_000  # About 3 s of 16 kHz PCM
+
+def make_certificate(directory: Path):
+    cert, key = directory / 'cert.pem', directory / 'key.pem'
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-subj', '/CN=localhost', '-addext', 'subjectAltName=DNS:localhost',
+                    '-keyout', str(key), '-out', str(cert)], check=True, capture_output=True)
+    return cert, key
+
+def start_server(cert, key, rtt: float, idle: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        timeout = idle  # Idle keep-alive connections are closed after this
+
+        def _reply(self, body=b''):
+            time.sleep(rtt)  # Request and response
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            return body
+
+        def do_HEAD(self):
+            self._reply()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.wfile.write(self._reply(json.dumps({'text': 'ok'}).encode()))
+
+        def log_message(self, *args):
+            pass
+
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+
+        def get_request(self):
+            sock, address = super().get_request()
+            # Loopback TCP connects instantly, so the TCP and TLS 1.3 round
+            # trips are both charged to the TLS handshake
+            time.sleep(2 * rtt)
+            return context.wrap_socket(sock, server_side=True), address
+
+    server = Server(('localhost', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def scenario(name, url, cert, args):
+    """Mean (request ms, handshake ms) over the requests of one scenario"""
+    Config.HTTP_KEEPALIVE_EXPIRY = 5.0 if name == 'default pool' else 120.0
+    Config.HTTP_KEEPALIVE_INTERVAL = args.server_idle / 2 if name == 'keep-alive' else 0
+    transport = None
+    totals, handshakes = [], []
+    for _ in range(args.requests):
+        if transport is None or name == 'fresh client':
+            if transport:
+                transport.close()
+            transport = PooledTransport(base_url=url, verify=str(cert), connections=1)
+            transport.mark_used()
+            transport.start_keepalive()
+        time.sleep(args.gap - args.utterance)
+        if name == 'prewarm':
+            transport.prewarm()  # Hotkey pressed
+        time.sleep(args.utterance)  # Speaking
+        started = time.perf_counter()
+        transport.client.post(url + 'audio/transcriptions', content=PAYLOAD).raise_for_status()
+        totals.append((time.perf_counter() - started) * 1000)
+        handshakes.append(transport.last_handshake() * 1000)
+    transport.close()
+    return sum(totals) / len(totals), sum(handshakes) / len(handshakes)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rtt', type=float, default=40.0, help="simulated round trip in ms")
+    parser.add_argument('--gap', type=float, default=6.0, help="idle seconds between dictations")
+    parser.add_argument('--utterance', type=float, default=1.0, help="seconds from key press to upload")
+    parser.add_argument('--server-idle', type=float, default=4.0, help="server idle connection timeout")
+    parser.add_argument('--requests', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_certificate(Path(directory))
+        server = start_server(cert, key, args.rtt / 1000, args.server_idle)
+        url = f"https://localhost:{server.server_address[1]}/v1/"
+
+        print(f"{'scenario':>14} {'request ms':>11} {'handshake ms':>13}")
+        baseline = None
+        for name in ('fresh client', 'default pool', 'tuned pool', 'keep-alive', 'prewarm'):
+            total, handshake = scenario(name, url, cert, args)
+            baseline = baseline if baseline is not None else total
+            print(f"{name:>14} {total:>11.1f} {handshake:>13.1f}   saves {baseline - total:.1f} ms per request")
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
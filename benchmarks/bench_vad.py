@@ -0,0 +1,62 @@
+"""CPU cost and accuracy of the voice activity detector.
+
+Builds a labeled synthetic fixture (voiced syllables with fricative onsets
+over background noise at several SNRs), feeds it through
+VoiceActivityDetector in capture-sized chunks and reports the share of one
+core used at 16 kHz plus frame-level accuracy against the labels. Run from
+the repository root:
+
+    python benchmarks/bench_vad.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.audio.sources import synthesize_speech
+from src.audio.vad import VoiceActivityDetector
+from src.config import Config
+
+SECONDS = 60
+# Silence this close to speech is not scored: it is covered on purpose by
+# the pre-pad before onsets and the hangover after offsets
+COLLAR_BEFORE = Config.VAD_PREPAD_MS / 1000 + 0.05
+COLLAR_AFTER = Config.VAD_HANGOVER_MS / 1000 + 0.05
+
+def run(audio, labels):
+    vad = VoiceActivityDetector(Config.RATE)
+    start = time.process_time()
+    for i in range(0, len(audio), Config.CHUNK):
+        vad.process(audio[i:i + Config.CHUNK])
+    vad.finish()
+    cpu = time.process_time() - start
+
+    predicted = np.zeros(len(audio), dtype=bool)
+    for s, e in vad.regions:
+        predicted[s:e] = True
+    changes = np.diff(labels.astype(np.int8))
+    scored = np.ones(len(labels), dtype=bool)
+    for onset in np.flatnonzero(changes == 1) + 1:
+        scored[max(onset - int(COLLAR_BEFORE * Config.RATE), 0):onset] = False
+    for offset in np.flatnonzero(changes == -1) + 1:
+        scored[offset:offset + int(COLLAR_AFTER * Config.RATE)] = False
+    scored |= labels
+    speech, silence = labels, ~labels & scored
+
+    recall = np.count_nonzero(predicted & speech) / np.count_nonzero(speech)
+    false_alarm = np.count_nonzero(predicted & silence) / np.count_nonzero(silence)
+    accuracy = np.count_nonzero((predicted == labels) & scored) / np.count_nonzero(scored)
+    return cpu, recall, false_alarm, accuracy
+
+def main():
+    print(f"{'SNR dB':>7} {'core %':>8} {'accuracy':>9} {'recall':>8} {'false alarm':>12}")
+    for snr_db in (30, 20, 10):
+        audio, labels = synthesize_speech(SECONDS, Config.RATE, snr_db)
+        cpu, recall, false_alarm, accuracy = run(audio, labels)
+        print(f"{snr_db:>7} {cpu / SECONDS * 100:>8.3f} {accuracy:>9.3f} {recall:>8.3f} {false_alarm:>12.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
-from .app import VoiceToTextApp
 from .config import Config
 
-__version__ = "1.0.0" 
\ No newline at end of file
+__version__ = "1.0.0"
+
+def __getattr__(name):
+    # Imported on first use so headless entry points (src.batch) need no GUI libraries
+    if name == 'VoiceToTextApp':
+        from .app import VoiceToTextApp
+        return VoiceToTextApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
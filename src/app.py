@@ -1,29 +1,34 @@
 import os
 import time
+import queue
 import logging
+import functools
 import threading
-from pathlib import Path
-from datetime import datetime
 from .audio.recorder import AudioRecorder
 from .audio.transcriber import Transcriber
 from .ui.tray_icon import TrayIcon
 from .ui.keyboard_handler import KeyboardHandler
 from .ui.text_output import TextOutput
+from .pipeline import TranscriptionPipeline
+from .sinks import create_sinks
 from .config import Config
 
 logger = logging.getLogger(__name__)
 
 class VoiceToTextApp:
-    def __init__(self):
-        """Initialize the Voice to Text application"""
+    def __init__(self, source=None):
+        """Initialize the Voice to Text application
+        
+        `source` is any AudioSource; the default microphone is used if omitted.
+        """
         try:
             # Validate configuration
             Config.validate()
             
             # Initialize components
-            self.recorder = AudioRecorder()
+            self.recorder = AudioRecorder(source=source)
             self.transcriber = Transcriber()
-            self.tray_icon = TrayIcon(on_exit=self.quit_application)
+            self.tray_icon = TrayIcon(on_exit=self.quit_application, on_reinsert=self.reinsert_last)
             self.keyboard_handler = KeyboardHandler(
                 on_start_recording=self.start_recording,
                 on_stop_recording=self.stop_recording
@@ -33,6 +38,19 @@ class VoiceToTextApp:
             self.is_recording = False
             self.recording_thread = None
             
+            # Hotkey callbacks only queue the press or release; the capture
+            # stage runs them in order and the pipeline does the rest
+            # Transcripts go to each of the OUTPUT_SINKS through its own queue
+            self.text_output = TextOutput()
+            self.sinks = create_sinks(self.text_output)
+            self.pipeline = TranscriptionPipeline(self.recorder, self.transcriber, self.sinks,
+                                                  on_idle=self._on_pipeline_idle,
+                                                  incremental=self.sinks.incremental,
+                                                  reinsert=self.sinks.reinsert)
+            self.capture_queue = queue.Queue()
+            self.capture_thread = threading.Thread(target=self._run_capture, daemon=True)
+            self.capture_thread.start()
+            
             logger.info("Application initialized successfully")
             
         except Exception as e:
@@ -40,38 +58,70 @@ class VoiceToTextApp:
             raise
             
     def start_recording(self):
+        """Hotkey pressed: queue the start and return to the listener at once"""
+        self.capture_queue.put(self._start_recording)
+        
+    def stop_recording(self):
+        """Hotkey released: queue the stop and return to the listener at once"""
+        self.capture_queue.put(functools.partial(self._stop_recording, time.perf_counter()))
+        
+    def _run_capture(self):
+        """Capture stage: starts and stops recordings in hotkey order"""
+        while True:
+            action = self.capture_queue.get()
+            try:
+                action()
+            except Exception as e:
+                logger.error(f"Capture stage error: {e}")
+                
+    def _start_recording(self):
         """Start audio recording"""
         if self.is_recording:
             return
             
+        if self.pipeline.begin() is None:
+            return
         try:
+            # Connect while the user speaks, not after release
+            self.transcriber.prewarm()
             if self.recorder.start():
                 self.is_recording = True
                 self.tray_icon.set_recording_state(True)
-                self.recording_thread = threading.Thread(target=self._record_audio)
-                self.recording_thread.daemon = True
-                self.recording_thread.start()
+                # In callback mode PortAudio drives capture, no polling thread needed
+                if not self.recorder.uses_callback:
+                    self.recording_thread = threading.Thread(target=self._record_audio)
+                    self.recording_thread.daemon = True
+                    self.recording_thread.start()
         except Exception as e:
             logger.error(f"Failed to start recording: {e}")
+        finally:
+            if not self.is_recording:
+                self.pipeline.cancel()
             
-    def stop_recording(self):
-        """Stop audio recording and process the audio"""
+    def _stop_recording(self, release_time=None):
+        """Stop audio recording and hand the last segment to the pipeline"""
         if not self.is_recording:
             return
             
         try:
             self.is_recording = False
             self.recorder.stop()
-            self.tray_icon.set_processing_state(True)  # Show processing state
+            self.tray_icon.set_processing_state(True)  # Idle again once the pipeline drains
             
             if self.recording_thread and self.recording_thread.is_alive():
                 self.recording_thread.join(timeout=1.0)
                 
-            self._process_recording()
-            
         except Exception as e:
             logger.error(f"Failed to stop recording: {e}")
         finally:
+            self.pipeline.finish(release_time)
+            
+    def reinsert_last(self):
+        """Type the last transcript again from the cache, without re-recording"""
+        self.pipeline.reinsert_last()
+        
+    def _on_pipeline_idle(self):
+        if not self.is_recording:
             self.tray_icon.set_processing_state(False)  # Return to idle state
             
     def _record_audio(self):
@@ -84,27 +134,6 @@ class VoiceToTextApp:
                 logger.error(f"Error during recording: {e}")
                 break
                 
-    def _process_recording(self):
-        """Process recorded audio and output transcription"""
-        try:
-            # Create temporary file
-            temp_file = Config.TEMP_DIR / f"recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav"
-            
-            # Save recording
-            if self.recorder.save_recording(temp_file):
-                # Transcribe audio
-                text = self.transcriber.transcribe(temp_file)
-                if text:
-                    # Output text
-                    TextOutput.write_text(text)
-                    
-            # Clean up
-            if temp_file.exists():
-                temp_file.unlink()
-                
-        except Exception as e:
-            logger.error(f"Failed to process recording: {e}")
-            
     def run(self):
         """Run the application"""
         try:
@@ -115,6 +144,11 @@ class VoiceToTextApp:
             if not self.keyboard_handler.start():
                 raise RuntimeError("Failed to start keyboard handler")
                 
+            # Keep the input stream open while armed so presses start instantly
+            if Config.WARM_STREAM and not self.recorder.arm():
+                logger.warning("Failed to arm warm input stream, will retry on the next press")
+            self.transcriber.start_keepalive()
+                
             logger.info("\nVoice-to-Text application started")
             logger.info("Hold F4 to record, release to transcribe")
             logger.info("Check the system tray for the application icon")
@@ -135,12 +169,16 @@ class VoiceToTextApp:
         """Clean up and quit the application"""
         logger.info("Shutting down application...")
         
-        # Stop recording if active
+        # Stop recording if active and let the text in flight be written
         if self.is_recording:
-            self.stop_recording()
+            self._stop_recording(time.perf_counter())
+        self.pipeline.wait_idle(timeout=Config.HTTP_TIMEOUT)
+        self.pipeline.close()
+        self.sinks.close(timeout=5)
             
         # Clean up components
         self.recorder.cleanup()
+        self.transcriber.close()
         self.keyboard_handler.stop()
         self.tray_icon.cleanup()
         
@@ -1,2 +1,4 @@
 from .recorder import AudioRecorder
-from .transcriber import Transcriber 
\ No newline at end of file
+from .sources import AudioSource, PyAudioSource, WavFileSource, DecodedFileSource, SyntheticSource
+from .transcriber import Transcriber
+from .backends import TranscriptionBackend, OpenAIBackend, CompatibleBackend, FakeBackend
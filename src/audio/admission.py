@@ -0,0 +1,186 @@
+import re
+import time
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean the service wants fewer requests
+THROTTLE_STATUS = {429, 503}
+
+def parse_retry_after(headers) -> float:
+    """Seconds to wait from Retry-After (seconds or an HTTP date) or retry-after-ms, or None"""
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+def parse_duration(value: str) -> float:
+    """Seconds in a rate-limit reset time such as "20ms", "1s" or "6m0s", or None"""
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value or '')
+    if not parts:
+        return None
+    scale = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+class AdmissionController:
+    """Paces requests to one API so it is used fully without tripping its limits.
+
+    A request is admitted when fewer than `window` requests are in flight
+    and, if a rate is known, the token bucket holds a token. The window
+    grows by one request per window of successes and is multiplied by
+    ADMISSION_DECREASE when the service throttles (429 or 503, at most
+    once per round trip), so concurrency settles just below what the
+    service accepts. Retry-After and an exhausted
+    x-ratelimit-remaining-requests pause all admissions until the given
+    time; x-ratelimit-limit-requests sets the bucket's rate unless
+    ADMISSION_RATE does. Requests wait in arrival order of wake-up, up
+    to RETRY_DEADLINE.
+    """
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self.window = float(Config.ADMISSION_INITIAL_WINDOW)
+        self.rate = Config.ADMISSION_RATE  # Requests per second (0 = not paced)
+        self.tokens = float(Config.ADMISSION_BURST)
+        self.refilled = time.monotonic()
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.queued = 0
+        self.rtt = None  # Smoothed request latency in seconds
+        self.last_decrease = 0.0
+        self.admitted = 0
+        self.throttled = 0
+        self.wait_time = 0.0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+        self._cond = threading.Condition()
+
+    def run(self, request):
+        """Call `request()` once admitted; raises TimeoutError if not admitted within RETRY_DEADLINE"""
+        self.acquire(Config.RETRY_DEADLINE)
+        started = time.monotonic()
+        succeeded = False
+        try:
+            result = request()
+            succeeded = True
+            return result
+        finally:
+            self.release(succeeded, time.monotonic() - started)
+
+    def acquire(self, timeout: float):
+        started = time.monotonic()
+        deadline = started + timeout
+        with self._cond:
+            self.queued += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = self._delay(now)
+                    if delay == 0:
+                        break
+                    if now >= deadline:
+                        raise TimeoutError(f"Not admitted within {timeout:g} s ({self.in_flight} requests in flight)")
+                    # None: wait for a request to finish
+                    self._cond.wait(deadline - now if delay is None else min(delay, deadline - now))
+                if self.rate > 0:
+                    self.tokens -= 1
+                self.in_flight += 1
+                self.admitted += 1
+                waited = time.monotonic() - started
+                self.wait_time += waited
+                self.last_wait = waited
+                self.max_wait = max(self.max_wait, waited)
+            finally:
+                self.queued -= 1
+
+    def _delay(self, now: float):
+        """0 if a request may start now, else seconds until one might, or None if waiting on a release"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= max(int(self.window), 1):
+            return None
+        if self.rate > 0:
+            self.tokens = min(self.tokens + (now - self.refilled) * self.rate, max(Config.ADMISSION_BURST, 1))
+            self.refilled = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+        return 0
+
+    def release(self, succeeded: bool, latency: float):
+        with self._cond:
+            self.in_flight -= 1
+            if succeeded:
+                self.rtt = latency if self.rtt is None else 0.8 * self.rtt + 0.2 * latency
+                self.window = min(self.window + 1 / self.window, Config.ADMISSION_MAX_WINDOW)
+            self._cond.notify_all()
+
+    def observe(self, status: int, headers):
+        """Feed back one response's status and rate-limit headers"""
+        now = time.monotonic()
+        with self._cond:
+            pause = parse_retry_after(headers) if status in THROTTLE_STATUS else None
+            if headers.get('x-ratelimit-remaining-requests') == '0':
+                reset = parse_duration(headers.get('x-ratelimit-reset-requests'))
+                pause = max(pause or 0, reset or 0) or pause
+            if pause and pause > 0:
+                self.paused_until = max(self.paused_until, now + min(pause, Config.RETRY_DEADLINE))
+
+            limit = headers.get('x-ratelimit-limit-requests')
+            if limit and not Config.ADMISSION_RATE:
+                try:
+                    self.rate = float(limit) / 60  # The OpenAI API's request limit is per minute
+                except ValueError:
+                    pass
+
+            if status in THROTTLE_STATUS:
+                self.throttled += 1
+                # One decrease per round trip: the other requests of the burst were already sent
+                if now - self.last_decrease >= (self.rtt or 0):
+                    self.last_decrease = now
+                    window = self.window
+                    self.window = max(self.window * Config.ADMISSION_DECREASE, 1.0)
+                    logger.warning(f"Throttled by {self.name or 'the API'} ({status}): window {window:.1f} -> "
+                                   f"{self.window:.1f}" + (f", pausing {pause:.2f} s" if pause else ""))
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'window': self.window,
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'rate': self.rate,
+                'paused_s': max(self.paused_until - time.monotonic(), 0.0),
+                'admitted': self.admitted,
+                'throttled': self.throttled,
+                'mean_wait_ms': self.wait_time / self.admitted * 1000 if self.admitted else 0.0,
+                'last_wait_ms': self.last_wait * 1000,
+                'max_wait_ms': self.max_wait * 1000,
+            }
+
+# Controllers by API base URL, shared by every transcriber in the process
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+def shared_controller(key: str) -> AdmissionController:
+    """The process-wide controller for the API at `key`"""
+    with _controllers_lock:
+        if key not in _controllers:
+            _controllers[key] = AdmissionController(key)
+        return _controllers[key]
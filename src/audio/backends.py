@@ -0,0 +1,304 @@
+import re
+import json
+import time
+import random
+import logging
+import threading
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from openai import OpenAI
+from .transport import PooledTransport, DEFAULT_BASE_URL
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+class TranscriptionBackend(ABC):
+    """Where transcription requests go.
+
+    request() makes exactly one call and returns the service's response
+    (an object with `text`, a dict or a str) or raises; retries, hedging
+    and parsing are left to Transcriber. Backends that talk HTTP keep
+    their connections in `transport`, which prewarm() and
+    start_keepalive() act on. Backends that can stream set `streaming`;
+    stream() is only called on those.
+    """
+
+    name = 'backend'
+    model = None  # Model name; part of the transcript cache key
+    transport = None
+    streaming = False
+
+    @abstractmethod
+    def request(self, upload, prompt: str = None):
+        """Transcribe `upload`, a (filename, bytes) pair, continuing from `prompt`"""
+
+    @abstractmethod
+    def stream(self, upload, prompt: str = None, on_text=None) -> str:
+        """Like request(), calling `on_text` with the text so far as it arrives; returns the final text"""
+
+    def prewarm(self):
+        if self.transport:
+            self.transport.prewarm()
+
+    def start_keepalive(self):
+        if self.transport:
+            self.transport.start_keepalive()
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({getattr(self, 'base_url', '')})"
+
+class OpenAIBackend(TranscriptionBackend):
+    """OpenAI's hosted Whisper API"""
+
+    name = 'openai'
+    streaming = True  # For models that stream, e.g. gpt-4o-transcribe; whisper-1 does not
+
+    def __init__(self, base_url: str = None, api_key: str = None, model: str = None, verify=True,
+                 connections: int = None):
+        self.base_url = base_url or DEFAULT_BASE_URL
+        self.model = model or Config.WHISPER_MODEL
+        self.transport = PooledTransport(base_url=self.base_url, verify=verify, connections=connections)
+        self.client = OpenAI(
+            api_key=api_key or Config.OPENAI_API_KEY,
+            base_url=self.base_url,
+            http_client=self.transport.client,
+            timeout=self.transport.timeout,
+            max_retries=0  # Retries and hedging are done by Transcriber's policy
+        )
+
+    def request(self, upload, prompt: str = None):
+        return self.client.audio.transcriptions.create(
+            model=self.model,
+            file=upload,
+            response_format=Config.WHISPER_RESPONSE_FORMAT,
+            language=Config.CURRENT_LANGUAGE,
+            prompt=prompt or "Hello, please transcribe carefully."
+        )
+
+    def stream(self, upload, prompt: str = None, on_text=None) -> str:
+        events = self.client.audio.transcriptions.create(
+            model=self.model,
+            file=upload,
+            response_format='json',  # Streaming does not offer verbose_json
+            language=Config.CURRENT_LANGUAGE,
+            prompt=prompt or "Hello, please transcribe carefully.",
+            stream=True
+        )
+        text = ""
+        for event in events:
+            if event.type == 'transcript.text.delta':
+                text += event.delta
+                if on_text:
+                    on_text(text)
+            elif event.type == 'transcript.text.done':
+                return event.text
+        return text
+
+class CompatibleBackend(OpenAIBackend):
+    """A server speaking the OpenAI transcription API at TRANSCRIPTION_BASE_URL.
+
+    For self-hosted Whisper servers (faster-whisper-server, whisper.cpp's
+    server, LocalAI, ...) on the local network. Most ignore the API key
+    but the client needs one, and their model names differ from OpenAI's.
+    """
+
+    name = 'compatible'
+
+    def __init__(self, base_url: str = None, api_key: str = None, model: str = None, verify=None,
+                 connections: int = None):
+        super().__init__(
+            base_url=base_url or Config.TRANSCRIPTION_BASE_URL,
+            api_key=api_key or Config.TRANSCRIPTION_API_KEY or 'unused',
+            model=model or Config.TRANSCRIPTION_MODEL or Config.WHISPER_MODEL,
+            verify=Config.TRANSCRIPTION_VERIFY_TLS if verify is None else verify,
+            connections=connections
+        )
+
+class FakeWhisperServer:
+    """In-process stand-in for an OpenAI-compatible transcription endpoint.
+
+    Answers POST .../audio/transcriptions with `text` after `latency`
+    seconds; `slow_rate` of requests take `slow` seconds longer and
+    `error_rate` of them fail with a 503. With `rate_limit` (requests per
+    second, in bursts of up to `burst`) or `max_concurrency` it enforces
+    limits like the OpenAI API: excess requests get a 429 with
+    Retry-After, and every response carries x-ratelimit-* headers.
+    Streamed requests get one transcript.text.delta event per word every
+    `stream_interval` seconds after the first; the deltas spell out
+    `stream_text` if given, so the final transcript.text.done corrects
+    them; with a `stream_interval` whole responses wait for the last
+    word too. For tests and benchmarks, which need no network or API key
+    this way.
+    """
+
+    def __init__(self, text: str = "hello world", latency: float = 0.0, slow: float = 0.0,
+                 slow_rate: float = 0.0, error_rate: float = 0.0, seed: int = None,
+                 rate_limit: float = 0.0, burst: int = 1, max_concurrency: int = 0,
+                 stream_interval: float = 0.0, stream_text: str = None):
+        self.text = text
+        self.stream_interval = stream_interval
+        self.stream_text = stream_text
+        self.latency = latency
+        self.slow = slow
+        self.slow_rate = slow_rate
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.random = random.Random(seed)
+        self.requests = 0  # Transcription requests received
+        self.rejected = 0  # Of those, answered with 429
+        self.upload_bytes = 0
+        self.active = 0
+        self.tokens = float(burst)
+        self.refilled = time.monotonic()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('localhost', 0), self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://localhost:{self.server.server_address[1]}/v1/"
+
+    def _admit(self):
+        """Rate-limit headers and, if the request is over a limit, seconds to retry after"""
+        headers = {}
+        retry_after = None
+        if self.max_concurrency and self.active >= self.max_concurrency:
+            retry_after = self.latency
+        if self.rate_limit:
+            now = time.monotonic()
+            self.tokens = min(self.tokens + (now - self.refilled) * self.rate_limit, self.burst)
+            self.refilled = now
+            if self.tokens < 1:
+                retry_after = (1 - self.tokens) / self.rate_limit
+            elif retry_after is None:
+                self.tokens -= 1
+            headers = {
+                'x-ratelimit-limit-requests': f"{self.rate_limit * 60:g}",
+                'x-ratelimit-remaining-requests': str(int(self.tokens)),
+                'x-ratelimit-reset-requests': f"{int(max(1 - self.tokens, 0) / self.rate_limit * 1000)}ms",
+            }
+        if retry_after is not None:
+            headers['retry-after'] = str(max(int(retry_after + 0.999), 1))
+            headers['retry-after-ms'] = str(int(retry_after * 1000))
+        return headers, retry_after
+
+    def _respond(self, size: int):
+        """Status, JSON body and headers for one request"""
+        with self._lock:
+            self.requests += 1
+            self.upload_bytes += size
+            headers, retry_after = self._admit()
+            if retry_after is not None:
+                self.rejected += 1
+                return 429, {'error': {'message': 'Rate limit reached', 'type': 'requests',
+                                       'code': 'rate_limit_exceeded'}}, headers
+            self.active += 1
+            delay = self.latency * self.random.uniform(0.8, 1.2)
+            if self.random.random() < self.slow_rate:
+                delay += self.slow
+            failed = self.random.random() < self.error_rate
+        time.sleep(delay)
+        with self._lock:
+            self.active -= 1
+        if failed:
+            return 503, {'error': {'message': 'Server overloaded', 'type': 'server_error'}}, headers
+        return 200, {'text': self.text}, headers
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _send(self, status: int, body: dict = None, headers: dict = None):
+                data = json.dumps(body).encode() if body is not None else b''
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(data)
+
+            def do_HEAD(self):
+                self._send(200)
+
+            def _stream(self, headers: dict):
+                """Server-sent events, one delta per word, in chunked encoding"""
+                self.send_response(200)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                events = [{'type': 'transcript.text.delta', 'delta': word}
+                          for word in re.findall(r'\S+\s*', fake.stream_text or fake.text)]
+                events.append({'type': 'transcript.text.done', 'text': fake.text})
+                for number, event in enumerate(events):
+                    if number and event['type'] == 'transcript.text.delta':
+                        time.sleep(fake.stream_interval)
+                    data = f"data: {json.dumps(event)}\n\n".encode()
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def do_POST(self):
+                size = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(size)
+                if not self.path.rstrip('/').endswith('/audio/transcriptions'):
+                    self._send(404, {'error': {'message': f'Unknown path {self.path}'}})
+                    return
+                status, response, headers = fake._respond(size)
+                if status == 200 and re.search(rb'name="stream"\r\n\r\ntrue', body):
+                    self._stream(headers)
+                    return
+                if status == 200 and fake.stream_interval:
+                    time.sleep(fake.stream_interval * (len(fake.text.split()) - 1))  # Until the last word is ready
+                self._send(status, response, headers)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class FakeBackend(CompatibleBackend):
+    """CompatibleBackend pointed at a FakeWhisperServer it starts in-process"""
+
+    name = 'fake'
+
+    def __init__(self, server: FakeWhisperServer = None, connections: int = None):
+        self._owns_server = server is None
+        self.server = server or FakeWhisperServer(latency=Config.FAKE_BACKEND_LATENCY)
+        super().__init__(base_url=self.server.url, api_key='fake', model='fake-whisper', connections=connections)
+
+    def close(self):
+        super().close()
+        if self._owns_server:
+            self.server.close()
+
+# Backends by Config.TRANSCRIPTION_BACKEND name
+BACKENDS = {
+    'openai': OpenAIBackend,
+    'compatible': CompatibleBackend,
+    'fake': FakeBackend,
+}
+
+def create_backend(name: str = None, connections: int = None) -> TranscriptionBackend:
+    """Backend named by `name`, or by Config.TRANSCRIPTION_BACKEND, pooling `connections` connections"""
+    name = name or Config.TRANSCRIPTION_BACKEND
+    backend = BACKENDS[name](connections=connections)
+    logger.info(f"Transcribing with {backend}")
+    return backend
@@ -0,0 +1,147 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Samples converted per pass when producing int16 PCM; keeps the float
+# scratch array small (256 KB) regardless of recording length
+CONVERT_BLOCK = 65536
+
+def convert_to_int16(data: np.ndarray, gain: float = 1.0, full_scale: float = 1.0,
+                     clip: bool = True) -> np.ndarray:
+    """Scale samples by `gain` and convert to int16 PCM in one blocked pass
+
+    Pass clip=False when the caller knows the scaled peak stays within
+    full scale, which saves the clipping work.
+    """
+    out = np.empty(len(data), dtype=np.int16)
+    scratch = np.empty(min(len(data), CONVERT_BLOCK), dtype=np.float32)
+    scale = np.float32(gain * 32767 / full_scale)
+    for start in range(0, len(data), CONVERT_BLOCK):
+        block = data[start:start + CONVERT_BLOCK]
+        tmp = scratch[:len(block)]
+        np.multiply(block, scale, out=tmp)
+        if clip:
+            np.clip(tmp, -32768, 32767, out=tmp)
+        out[start:start + len(block)] = tmp
+    return out
+
+class AudioBuffer:
+    """Preallocated, growable sample arena for a single recording.
+
+    Chunks are copied once into a contiguous NumPy array as they arrive, so
+    segments are sliced out of one array instead of joining a list of byte
+    strings after the key is released. With an int16 arena,
+    float chunks are scaled to full scale on the way in, halving memory.
+    """
+
+    def __init__(self, capacity: int, dtype=np.float32, channels: int = 1):
+        self.dtype = np.dtype(dtype)
+        self.channels = channels
+        self.full_scale = 32768.0 if self.dtype == np.int16 else 1.0
+        self._data = np.empty(max(int(capacity), 1) * channels, dtype=self.dtype)
+        self._length = 0
+
+    def __len__(self):
+        """Number of frames (samples per channel) currently stored"""
+        return self._length // self.channels
+
+    @property
+    def capacity(self) -> int:
+        """Number of frames that fit without growing"""
+        return len(self._data) // self.channels
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of audio currently stored"""
+        return self._length * self.dtype.itemsize
+
+    def _reserve(self, size: int):
+        """Grow the arena so at least `size` samples fit"""
+        if size <= len(self._data):
+            return
+        new_size = max(size, len(self._data) * 2)
+        logger.debug(f"Growing audio buffer from {len(self._data)} to {new_size} samples")
+        data = np.empty(new_size, dtype=self.dtype)
+        data[:self._length] = self._data[:self._length]
+        self._data = data
+
+    def append(self, samples: np.ndarray):
+        """Copy interleaved samples into the arena"""
+        count = len(samples)
+        end = self._length + count
+        self._reserve(end)
+        target = self._data[self._length:end]
+        if self.dtype == np.int16 and samples.dtype.kind == 'f':
+            scaled = samples * np.float32(32767)
+            np.clip(scaled, -32768, 32767, out=scaled)
+            target[:] = scaled
+        else:
+            target[:] = samples
+        self._length = end
+
+    def append_bytes(self, data: bytes):
+        """Copy a raw PortAudio chunk into the arena"""
+        self.append(np.frombuffer(data, dtype=self.dtype))
+
+    def view(self) -> np.ndarray:
+        """Zero-copy view of the recorded interleaved samples"""
+        return self._data[:self._length]
+
+    def peak(self) -> float:
+        """Absolute peak (1.0 = full scale) without allocating a temporary"""
+        if not self._length:
+            return 0.0
+        data = self.view()
+        return max(float(data.max()), -float(data.min())) / self.full_scale
+
+    def to_int16(self, gain: float = 1.0, clip: bool = True) -> np.ndarray:
+        """Scale the recording by `gain` and convert to int16 PCM in one pass"""
+        return convert_to_int16(self.view(), gain, self.full_scale, clip)
+
+    def clear(self):
+        """Forget the recorded samples but keep the allocation"""
+        self._length = 0
+
+class RingBuffer:
+    """Fixed-size circular buffer keeping the most recent samples"""
+
+    def __init__(self, capacity: int, dtype=np.float32):
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros(max(int(capacity), 1), dtype=self.dtype)
+        self._pos = 0
+        self._filled = 0
+
+    def __len__(self):
+        return self._filled
+
+    def write(self, samples: np.ndarray):
+        """Append samples, overwriting the oldest ones once full"""
+        size = len(self._data)
+        if len(samples) >= size:
+            self._data[:] = samples[-size:]
+            self._pos = 0
+            self._filled = size
+            return
+        end = self._pos + len(samples)
+        if end <= size:
+            self._data[self._pos:end] = samples
+        else:
+            split = size - self._pos
+            self._data[self._pos:] = samples[:split]
+            self._data[:end - size] = samples[split:]
+        self._pos = end % size
+        self._filled = min(self._filled + len(samples), size)
+
+    def drain(self) -> np.ndarray:
+        """Return the buffered samples, oldest first, and reset"""
+        if self._filled == len(self._data):
+            samples = np.concatenate((self._data[self._pos:], self._data[:self._pos]))
+        else:
+            samples = self._data[:self._filled].copy()
+        self.clear()
+        return samples
+
+    def clear(self):
+        self._pos = 0
+        self._filled = 0
@@ -0,0 +1,132 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+import collections
+from pathlib import Path
+import numpy as np
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+class TranscriptCache:
+    """Bounded LRU cache of transcripts keyed by the audio that produced them.
+
+    Keys hash the segment's kept int16 PCM (trimmed, mono, at Config.RATE,
+    before gain, so the upload codec does not matter) together with the
+    language and model, so identical audio is never sent twice. `last`
+    holds the keys of the most recent dictation, which is what "re-insert
+    last transcript" reads back. With a `path` the cache is kept on disk,
+    oldest entries dropped to stay under TRANSCRIPT_CACHE_MAX_BYTES. The
+    file is rewritten by a background thread at most once per
+    TRANSCRIPT_CACHE_SAVE_DELAY, never on the caller's thread; close()
+    writes what is left at shutdown.
+    """
+
+    def __init__(self, capacity: int = None, path: Path = None):
+        self.capacity = capacity or Config.TRANSCRIPT_CACHE_ENTRIES
+        self.path = Path(path) if path else None
+        self.entries = collections.OrderedDict()  # Least recently used first
+        self.last = []
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._stop = threading.Event()
+        self._writer = None
+        if self.path:
+            self._load()
+            self._writer = threading.Thread(target=self._write_behind, name='transcript-cache', daemon=True)
+            self._writer.start()
+
+    @staticmethod
+    def key(pcm: np.ndarray, language: str, model: str) -> str:
+        digest = hashlib.blake2b(np.ascontiguousarray(pcm).view(np.uint8), digest_size=16)
+        digest.update(f"|{language}|{model}".encode())
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """Cached text for `key`, or None"""
+        with self._lock:
+            text = self.entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key: str, text: str):
+        if not text:
+            return  # Failures are not cached, so the audio is retried next time
+        with self._lock:
+            self.entries[key] = text
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        self._dirty.set()
+
+    def set_last(self, keys):
+        """Remember the segments of the last dictation written out"""
+        with self._lock:
+            self.last = list(keys)
+        self._dirty.set()
+
+    def last_text(self) -> str:
+        """Text of the last dictation, or None if any of it is no longer cached"""
+        with self._lock:
+            if not self.last or any(key not in self.entries for key in self.last):
+                return None
+            return " ".join(self.entries[key].strip() for key in self.last)
+
+    def _load(self):
+        try:
+            if self.path.exists():
+                data = json.loads(self.path.read_text())
+                self.entries.update(data.get('entries', []))
+                self.last = data.get('last', [])
+                while len(self.entries) > self.capacity:
+                    self.entries.popitem(last=False)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable transcript cache {self.path}: {e}")
+            self.entries.clear()
+            self.last = []
+
+    def _write_behind(self):
+        """Writer thread: saves once changes have gathered for TRANSCRIPT_CACHE_SAVE_DELAY"""
+        while not self._stop.is_set():
+            self._dirty.wait()
+            self._stop.wait(Config.TRANSCRIPT_CACHE_SAVE_DELAY)
+            self._dirty.clear()
+            self.save()
+
+    def close(self, timeout: float = 5.0):
+        """Write unsaved changes now and stop the writer"""
+        if self._writer:
+            self._stop.set()
+            self._dirty.set()
+            self._writer.join(timeout)
+
+    def save(self):
+        """Write the cache atomically, dropping the oldest entries beyond the size cap"""
+        if not self.path:
+            return
+        with self._lock:
+            entries = list(self.entries.items())
+            last = list(self.last)
+        data = json.dumps({'last': last, 'entries': entries})
+        while entries and len(data) > Config.TRANSCRIPT_CACHE_MAX_BYTES:
+            entries = entries[max(len(entries) // 10, 1):]
+            data = json.dumps({'last': last, 'entries': entries})
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f'.{threading.get_ident()}.tmp')
+            tmp.write_text(data)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"Failed to save transcript cache: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
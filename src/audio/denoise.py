@@ -0,0 +1,144 @@
+import logging
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+STFT_FRAME_MS = 32  # Analysis frame, rounded up to a power of two in samples
+GAIN_RELEASE_MS = 80  # Time for a bin's gain to fall back by 1/e once speech stops
+NOISE_RISE_PER_FRAME = 1.003  # Upward drift of the noise profile, about 0.8 dB/s at 16 kHz
+
+class Preprocessor:
+    """Streaming clean-up of captured audio before it is stored.
+
+    Runs chunk by chunk during capture: pre-emphasis as a one-tap FIR, then
+    a short-time Fourier transform in which DC and hum below HIGHPASS_HZ
+    are removed and every bin is gated against a noise profile. The profile
+    is learned from the warm-stream pre-roll when there is one and follows
+    the quietest recent frames otherwise. Frames are analysed and
+    resynthesised with a square-root Hann window at 50% overlap, so the
+    stage holds back half a frame until flush().
+    """
+
+    def __init__(self, rate: int = Config.RATE):
+        self.rate = rate
+        self.frame = 1 << int(np.ceil(np.log2(rate * STFT_FRAME_MS / 1000)))
+        self.hop = self.frame // 2
+        self.bins = self.frame // 2 + 1
+        # Periodic Hann: the squared window sums to one at 50% overlap
+        self._window = np.sqrt(np.hanning(self.frame + 1)[:-1]).astype(np.float32)
+
+        freqs = np.fft.rfftfreq(self.frame, 1 / rate)
+        half = Config.HIGHPASS_HZ / 2
+        self._highpass = (np.clip((freqs - half) / half, 0, 1) ** 2 if half > 0
+                          else np.ones(self.bins)).astype(np.float32)
+        self._highpass[0] = 0.0  # Always remove DC
+
+        self.emphasis = np.float32(Config.PRE_EMPHASIS)
+        self.floor = 10 ** (-Config.NOISE_REDUCTION_DB / 20)
+        self.oversubtract = 10 ** (Config.NOISE_GATE_DB / 10)
+        self.release = float(np.exp(-self.hop / (rate * GAIN_RELEASE_MS / 1000)))
+        self.noise = None  # Noise power per bin, kept across recordings
+        self._frames = np.empty((0, self.frame), dtype=np.float32)
+        self.reset()
+
+    @property
+    def gating(self) -> bool:
+        return self.floor < 1.0
+
+    def reset(self):
+        """Start a new recording; the noise profile is kept"""
+        # Half a frame of leading zeros so the first sample gets a full frame
+        self._pending = np.zeros(self.hop, dtype=np.float32)
+        self._overlap = np.zeros(self.hop, dtype=np.float32)
+        self._skip = self.hop
+        self._last = np.float32(0.0)
+        self._gain = np.ones(self.bins, dtype=np.float32)
+        self._received = 0
+        self._emitted = 0
+
+    def learn(self, samples: np.ndarray):
+        """Set the noise profile from audio known to be (mostly) background"""
+        if len(samples) < self.frame:
+            return
+        frames = sliding_window_view(samples, self.frame)[::self.hop] * self._window
+        spectra = np.fft.rfft(frames, axis=1)
+        # The median ignores the odd frame where speech has already started
+        self.noise = np.median(spectra.real ** 2 + spectra.imag ** 2, axis=0)
+        logger.debug(f"Noise profile learned from {len(samples) / self.rate * 1000:.0f} ms")
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Clean a chunk of mono float32 samples; returns the samples that are complete"""
+        if not len(samples):
+            return samples
+        if self.emphasis:
+            previous = np.empty_like(samples)
+            previous[0] = self._last
+            previous[1:] = samples[:-1]
+            self._last = samples[-1]
+            samples = samples - self.emphasis * previous
+        self._received += len(samples)
+        return self._run(samples)
+
+    def flush(self) -> np.ndarray:
+        """Return the samples still held back, at the end of a recording"""
+        # Trailing zeros complete the last frames; _run trims them off again
+        return self._run(np.zeros(self.frame, dtype=np.float32))
+
+    def _run(self, samples: np.ndarray) -> np.ndarray:
+        pending = np.concatenate((self._pending, samples))
+        count = (len(pending) - self.frame) // self.hop + 1
+        if count <= 0:
+            self._pending = pending
+            return np.empty(0, dtype=np.float32)
+
+        if len(self._frames) < count:
+            self._frames = np.empty((count, self.frame), dtype=np.float32)
+        frames = self._frames[:count]
+        np.multiply(sliding_window_view(pending, self.frame)[::self.hop][:count], self._window, out=frames)
+        spectra = np.fft.rfft(frames, axis=1)
+        spectra *= self._gains(spectra)
+        frames[:] = np.fft.irfft(spectra, n=self.frame, axis=1)
+        frames *= self._window
+
+        # Each hop-sized block is the first half of its own frame plus the
+        # second half of the previous one
+        out = frames[:, :self.hop].copy()
+        out[0] += self._overlap
+        out[1:] += frames[:-1, self.hop:]
+        self._overlap = frames[-1, self.hop:].copy()
+        self._pending = pending[count * self.hop:]
+
+        out = out.ravel()
+        if self._skip:
+            out = out[self._skip:]
+            self._skip = 0
+        if self._emitted + len(out) > self._received:
+            out = out[:max(self._received - self._emitted, 0)]
+        self._emitted += len(out)
+        return out
+
+    def _gains(self, spectra: np.ndarray) -> np.ndarray:
+        """Per-frame, per-bin gains: high-pass times the noise gate"""
+        if not self.gating:
+            return self._highpass
+        power = spectra.real ** 2 + spectra.imag ** 2
+        quiet = power.mean(axis=0)
+        if self.noise is None:
+            self.noise = quiet
+
+        gains = np.sqrt(np.clip(1 - self.oversubtract * self.noise / np.maximum(power, 1e-12), 0, 1))
+        # Smooth across neighbouring bins, then let gains fall back slowly
+        # over time; both keep isolated bins from flickering ("musical noise")
+        gains[:, 1:-1] = 0.25 * gains[:, :-2] + 0.5 * gains[:, 1:-1] + 0.25 * gains[:, 2:]
+        for row in gains:
+            np.maximum(row, self._gain * self.release, out=row)
+            self._gain = row
+        self._gain = self._gain.copy()
+        np.maximum(gains, self.floor, out=gains)
+
+        # Follow the noise down quickly and up slowly
+        rise = self.noise * NOISE_RISE_PER_FRAME ** len(power)
+        self.noise = np.where(quiet < self.noise, 0.5 * (self.noise + quiet), np.minimum(rise, quiet))
+        return (gains * self._highpass).astype(np.float32)
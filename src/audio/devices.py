@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+class DeviceProbeCache:
+    """On-disk record of which input devices opened successfully.
+
+    Entries are keyed by device name, host API and channel count rather
+    than by PortAudio index, since indices shift whenever a device is
+    plugged in or removed. Each entry stores the native sample format and
+    rate the device was opened with, so launch can skip format discovery.
+    """
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path or Config.DEVICE_CACHE_FILE)
+        self.entries = {}
+        self.selected = None
+        self._load()
+
+    @staticmethod
+    def key(device_info: dict, host_api: str, channels: int) -> str:
+        return f"{device_info['name']}|{host_api}|{channels}"
+
+    def _load(self):
+        try:
+            if self.path.exists():
+                data = json.loads(self.path.read_text())
+                self.entries = data.get('entries', {})
+                self.selected = data.get('selected')
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable device cache {self.path}: {e}")
+            self.entries = {}
+            self.selected = None
+
+    def save(self):
+        """Write the cache atomically"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            tmp.write_text(json.dumps({'selected': self.selected, 'entries': self.entries}, indent=2))
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"Failed to save device cache: {e}")
+
+    def result(self, key: str):
+        """Cached probe outcome: True, False or None when never probed"""
+        entry = self.entries.get(key)
+        return None if entry is None else entry['ok']
+
+    def settings(self, key: str):
+        """Cached (format name, rate) of a device that opened successfully"""
+        entry = self.entries.get(key)
+        if entry and entry['ok'] and entry.get('format'):
+            return entry['format'], entry['rate']
+        return None
+
+    def record(self, key: str, ok: bool, sample_format: str = None, rate: int = None):
+        self.entries[key] = {'ok': ok, 'format': sample_format, 'rate': rate, 'probed_at': time.time()}
+
+    def select(self, key: str):
+        self.selected = key
+        self.save()
+
+class DeviceWatcher:
+    """Polls a cheap signature of the audio device list and reports changes.
+
+    PortAudio only enumerates devices at initialization, so asking it would
+    mean re-initializing on every poll. Instead the ALSA card list and the
+    /dev/snd nodes are compared, which changes exactly when hardware is
+    plugged in or removed.
+    """
+
+    def __init__(self, on_change, interval: float = None):
+        self.on_change = on_change
+        self.interval = Config.HOTPLUG_POLL_INTERVAL if interval is None else interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._signature = None
+
+    @staticmethod
+    def signature():
+        parts = []
+        try:
+            parts.append(Path('/proc/asound/cards').read_text())
+        except OSError:
+            pass
+        try:
+            parts.extend(sorted(os.listdir('/dev/snd')))
+        except OSError:
+            pass
+        return tuple(parts)
+
+    def start(self):
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._signature = self.signature()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logger.debug("Device hot-plug watcher started")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            current = self.signature()
+            if current != self._signature:
+                self._signature = current
+                logger.info("Audio device list changed")
+                try:
+                    self.on_change()
+                except Exception as e:
+                    logger.error(f"Error handling device change: {e}")
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,146 @@
+import io
+import queue
+import shutil
+import logging
+import threading
+import subprocess
+import numpy as np
+from .segmenter import JOIN_FADE_MS
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+# ffmpeg output arguments and upload file extension per Config.UPLOAD_CODEC
+CODECS = {
+    'flac': (['-c:a', 'flac', '-compression_level', '5', '-f', 'flac'], 'flac'),
+    'opus': (['-c:a', 'libopus', '-application', 'voip', '-f', 'ogg'], 'ogg'),
+}
+
+def compressed_codec_available(codec: str) -> bool:
+    """Whether `codec` can be encoded here (ffmpeg is on the PATH)"""
+    return codec in CODECS and shutil.which('ffmpeg') is not None
+
+class StreamingEncoder:
+    """Compresses one segment with ffmpeg while it is being recorded.
+
+    Samples are handed over with feed() as capture proceeds, so when the
+    segment closes only the encoder's flush remains. Writes to ffmpeg go
+    through a queue and a feeder thread, so capture never blocks on the
+    pipe. Samples are scaled by the StreamingGain gain as it stands at
+    each feed, ramped from one feed's gain to the next so the level never
+    jumps; the statistics settle within the first second or so of speech,
+    after which this matches the gain the WAV path applies at the close.
+    """
+
+    def __init__(self, rate: int = Config.RATE, codec: str = None, bitrate: str = None):
+        # Set when the encoder is assigned to a segment; it is started ahead
+        # of time so the process launch stays off the capture path
+        self.start = 0  # Buffer index of the segment's first sample
+        self.index = 0
+        self.rate = rate
+        self.codec = codec or Config.UPLOAD_CODEC
+        self.cursor = 0  # Segment-relative index of the next sample to send
+        self.gain = None  # Gain applied at the end of the last feed
+        self.fade = int(JOIN_FADE_MS / 1000 * rate)
+        self._ramp = np.linspace(0.0, 1.0, self.fade, dtype=np.float32)
+        self._output = io.BytesIO()
+        self._queue = queue.SimpleQueue()
+        self.failed = False
+
+        output_args, self.extension = CODECS[self.codec]
+        if self.codec == 'opus':
+            output_args = output_args + ['-b:a', bitrate or Config.UPLOAD_BITRATE]
+        self.process = subprocess.Popen(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-f', 's16le', '-ar', str(rate),
+             '-ac', '1', '-i', 'pipe:0'] + output_args + ['pipe:1'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self._feeder = threading.Thread(target=self._write_input, daemon=True)
+        self._reader = threading.Thread(target=self._read_output, daemon=True)
+        self._feeder.start()
+        self._reader.start()
+
+    def feed(self, audio: np.ndarray, spans=None, gain: float = 1.0):
+        """Send what has not been sent yet of `audio` (the segment so far, int16).
+
+        `spans` are the parts to keep, as from Segmenter.keep_spans(); they
+        only ever grow past the cursor, so each call sends a suffix. Joins
+        between spans get the same fades as Segment.compacted(). The new
+        samples are scaled by a ramp from the previous feed's gain to `gain`.
+        """
+        if spans is None:
+            spans = [(0, len(audio))]
+        pieces = []
+        for number, (start, end) in enumerate(spans):
+            if end <= self.cursor:
+                continue
+            piece_start = max(start, self.cursor)
+            piece = audio[piece_start:end]
+            fade_in = number > 0 and piece_start < start + self.fade
+            fade_out = number < len(spans) - 1
+            piece = piece.astype(np.float32)
+            if fade_in:
+                count = min(start + self.fade - piece_start, len(piece))
+                piece[:count] *= self._ramp[piece_start - start:piece_start - start + count]
+            if fade_out:
+                count = min(self.fade, len(piece))
+                piece[len(piece) - count:] *= self._ramp[count - 1::-1]
+            pieces.append(piece)
+            self.cursor = end
+        if not pieces:
+            return
+        samples = np.concatenate(pieces) if len(pieces) > 1 else pieces[0]
+        previous = gain if self.gain is None else self.gain
+        if previous == gain:
+            samples *= np.float32(gain)
+        else:
+            samples *= np.linspace(previous, gain, len(samples), dtype=np.float32)
+        self.gain = gain
+        np.clip(samples, -32768, 32767, out=samples)
+        self._queue.put(samples.astype(np.int16).tobytes())
+
+    def _write_input(self):
+        try:
+            while True:
+                data = self._queue.get()
+                if data is None:
+                    break
+                self.process.stdin.write(data)
+        except OSError as e:
+            logger.error(f"Encoder input closed early: {e}")
+            self.failed = True
+        finally:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+
+    def _read_output(self):
+        for block in iter(lambda: self.process.stdout.read(65536), b''):
+            self._output.write(block)
+
+    def finish(self, timeout: float = 10.0):
+        """Flush the encoder; returns the encoded file as a named BytesIO, or None on failure"""
+        self._queue.put(None)
+        try:
+            self._feeder.join(timeout)
+            self.process.wait(timeout)
+            self._reader.join(timeout)
+        except subprocess.TimeoutExpired:
+            logger.error("Encoder did not finish in time")
+            self.abort()
+            return None
+        if self.failed or self.process.returncode != 0:
+            error = self.process.stderr.read().decode(errors='replace').strip()
+            logger.error(f"{self.codec} encoder failed ({self.process.returncode}): {error}")
+            return None
+        self._output.seek(0)
+        self._output.name = f"segment_{self.index}.{self.extension}"
+        return self._output
+
+    def abort(self):
+        """Stop the encoder and discard its output"""
+        self._queue.put(None)
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
@@ -0,0 +1,72 @@
+import logging
+import numpy as np
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+# Chunk peaks are binned in dB so the robust peak is a percentile lookup
+# over a fixed-size histogram, however long the take
+HISTOGRAM_FLOOR_DB = -100.0
+HISTOGRAM_STEP_DB = 0.5
+HISTOGRAM_BINS = int(-HISTOGRAM_FLOOR_DB / HISTOGRAM_STEP_DB) + 1
+
+class StreamingGain:
+    """Loudness statistics updated per chunk during capture.
+
+    Tracks the speech RMS and a histogram of chunk peaks, so the output
+    gain is known the moment recording stops. The gain brings speech to
+    GAIN_TARGET_DBFS RMS, limited so the GAIN_PEAK_PERCENTILE chunk peak
+    lands at GAIN_PEAK_CEILING; unlike plain peak normalization a single
+    click cannot flatten the whole take (it is clipped instead).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._histogram = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+        self._speech_energy = 0.0
+        self._speech_samples = 0
+        self._energy = 0.0
+        self._samples = 0
+        self.peak = 0.0
+
+    def update(self, samples: np.ndarray, is_speech: bool = True):
+        """Account for a chunk of float samples (1.0 = full scale)"""
+        if not len(samples):
+            return
+        chunk_peak = max(float(samples.max()), -float(samples.min()))
+        energy = float(np.dot(samples, samples))
+        self.peak = max(self.peak, chunk_peak)
+        self._energy += energy
+        self._samples += len(samples)
+        if is_speech:
+            self._speech_energy += energy
+            self._speech_samples += len(samples)
+        peak_db = 20 * np.log10(max(chunk_peak, 1e-10))
+        index = int((max(peak_db, HISTOGRAM_FLOOR_DB) - HISTOGRAM_FLOOR_DB) / HISTOGRAM_STEP_DB)
+        self._histogram[min(index, HISTOGRAM_BINS - 1)] += 1
+
+    def robust_peak(self) -> float:
+        """Chunk peak at GAIN_PEAK_PERCENTILE, ignoring rare transients"""
+        total = self._histogram.sum()
+        if not total:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self._histogram), total * Config.GAIN_PEAK_PERCENTILE / 100))
+        return min(10 ** ((HISTOGRAM_FLOOR_DB + (index + 1) * HISTOGRAM_STEP_DB) / 20), self.peak)
+
+    def rms(self) -> float:
+        """RMS of speech, or of everything when no speech was tagged"""
+        if self._speech_samples:
+            return (self._speech_energy / self._speech_samples) ** 0.5
+        return (self._energy / self._samples) ** 0.5 if self._samples else 0.0
+
+    def gain(self) -> float:
+        """Linear gain to apply to the take"""
+        rms = self.rms()
+        peak = self.robust_peak()
+        if rms <= 0 or peak <= 0:
+            return 1.0
+        target = 10 ** (Config.GAIN_TARGET_DBFS / 20) / rms
+        ceiling = Config.GAIN_PEAK_CEILING / peak
+        return float(min(target, ceiling, Config.GAIN_MAX))
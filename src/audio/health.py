@@ -0,0 +1,104 @@
+import time
+import logging
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+class CaptureHealth:
+    """Per-session capture accounting.
+
+    Counts overflows reported by the source, measures how regularly chunks
+    arrive compared with the buffer period, and compares the frames
+    delivered with the frames the wall clock says should have arrived.
+    A shortfall means audio was dropped even if no overflow was reported,
+    which is the only signal available in blocking mode; each jump of the
+    shortfall by most of a chunk is counted as a gap.
+    """
+
+    def __init__(self):
+        self.sessions = 0
+        self.total_overflows = 0
+        self.total_gaps = 0
+        self.total_missing_frames = 0
+        self.reset(0, 1, 0)
+
+    def reset(self, overflows_before: int, rate: int, chunk: int):
+        """Start accounting for a new session"""
+        self.rate = rate
+        self.period = chunk / rate if rate else 0.0
+        self._overflows_before = overflows_before
+        self.overflows = 0
+        self.gaps = 0
+        self._shortfall = -chunk  # Steady state: one chunk ahead of the expected count
+        self.chunks = 0
+        self.frames = 0
+        self._started = None
+        self._last = None
+        self._jitter_sum = 0.0
+        self.max_interval = 0.0
+        self.stopped = None
+
+    def record_chunk(self, frames: int, now: float = None):
+        """Account for a chunk of `frames` native frames arriving at `now` (perf_counter, default now)"""
+        now = time.perf_counter() if now is None else now
+        if self._started is None:
+            # The first chunk was captured one period before it arrived
+            self._started = now - frames / self.rate
+        elif self._last is not None:
+            interval = now - self._last
+            self._jitter_sum += abs(interval - self.period)
+            self.max_interval = max(self.max_interval, interval)
+        self._last = now
+        self.chunks += 1
+        self.frames += frames
+
+        shortfall = self._expected(now) - self.frames
+        # Scheduling jitter delays chunks by a fraction of a period, a drop by a whole one
+        if shortfall - self._shortfall > frames * 3 // 4:
+            self.gaps += 1
+            logger.debug(f"Capture gap: {(shortfall - self._shortfall) / self.rate * 1000:.0f} ms missing")
+        self._shortfall = max(shortfall, self._shortfall)
+
+    def _expected(self, now: float) -> int:
+        """Frames the device should have delivered by `now`"""
+        if self._started is None:
+            return 0
+        # The chunk in flight has not been delivered yet
+        return max(int((now - self._started - self.period) * self.rate), 0)
+
+    def record_overflows(self, overflows_now: int):
+        """Update the session's overflow count from the source's running total"""
+        self.overflows = overflows_now - self._overflows_before
+
+    def finish(self, overflows_now: int):
+        """Close the session; returns its stats"""
+        self.stopped = time.perf_counter()
+        self.record_overflows(overflows_now)
+        stats = self.stats()
+        self.sessions += 1
+        self.total_overflows += self.overflows
+        self.total_gaps += self.gaps
+        self.total_missing_frames += stats['missing_frames']
+        return stats
+
+    def stats(self) -> dict:
+        expected = self._expected(self.stopped or time.perf_counter())
+        missing = max(expected - self.frames, 0)
+        intervals = self.chunks - 1
+        return {
+            'overflows': self.overflows,
+            'gaps': self.gaps,
+            'chunks': self.chunks,
+            'delivered_frames': self.frames,
+            'expected_frames': expected,
+            'missing_frames': missing,
+            'missing_ratio': missing / expected if expected else 0.0,
+            'jitter_ms': self._jitter_sum / intervals * 1000 if intervals > 0 else 0.0,
+            'max_interval_ms': self.max_interval * 1000,
+            'period_ms': self.period * 1000,
+        }
+
+    def unhealthy(self, stats: dict) -> bool:
+        """Whether a session lost enough audio to warrant a larger buffer"""
+        return (stats['overflows'] + stats['gaps'] >= Config.XRUN_OVERFLOW_THRESHOLD
+                or stats['missing_ratio'] >= Config.XRUN_MISSING_THRESHOLD)
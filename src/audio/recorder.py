@@ -1,207 +1,610 @@
-import pyaudio
+import io
 import numpy as np
 import wave
+import time
+import queue
+import threading
 from datetime import datetime
 import logging
 from pathlib import Path
+from .buffer import AudioBuffer, RingBuffer, convert_to_int16
+from .vad import VoiceActivityDetector
+from .gain import StreamingGain
+from .resample import CaptureConverter
+from .denoise import Preprocessor
+from .segmenter import Segment, Segmenter
+from .health import CaptureHealth
+from .encoder import StreamingEncoder, compressed_codec_available
+from .sources import AudioSource, PyAudioSource
 from ..config import Config
 
 logger = logging.getLogger(__name__)
 
+WATCHDOG_INTERVAL = 1.0  # Seconds between warm-stream idle checks
+WATCHDOG_WINDOW = 10.0  # Seconds over which idle callback load is averaged
+
 class AudioRecorder:
-    def __init__(self):
-        self.format = pyaudio.paFloat32
-        self.channels = Config.CHANNELS
+    def __init__(self, source: AudioSource = None):
+        # Output: what the rest of the app sees (mono int16 at Config.RATE)
+        self.channels = 1
         self.rate = Config.RATE
         self.chunk = Config.CHUNK
-        self.frames = []
+        self.capture_mode = Config.CAPTURE_MODE
+        self.buffer = AudioBuffer(int(Config.MAX_AUDIO_LENGTH * self.rate), dtype=np.int16)
+        self.vad = VoiceActivityDetector(self.rate)
+        self.gain = StreamingGain()
+        self.preprocessor = Preprocessor(self.rate) if Config.PREPROCESS else None
+        self.segmenter = Segmenter(self.rate)
+        self.on_segment = None  # Called with each Segment as soon as it closes
+        self._segment_index = 0
         self.is_recording = False
-        self.stream = None
-        self.audio = None
-        self.device_index = None
+        self.health = CaptureHealth()
         
-        self._initialize_audio()
+        # Compressed uploads are encoded while recording
+        self.encoder = None  # Encoder fed with the open segment
+        self._spare_encoder = None
+        self._spawning = False  # A spare encoder process is starting
+        self._closed = False  # Set by cleanup(); spares starting after it are aborted
+        self._encoder_lock = threading.Lock()  # Guards the spare and the spawn in progress
+        self.compress = Config.UPLOAD_CODEC != 'wav'
+        if self.compress and not compressed_codec_available(Config.UPLOAD_CODEC):
+            logger.warning(f"ffmpeg not found, uploading WAV instead of {Config.UPLOAD_CODEC}")
+            self.compress = False
+        self.last_stats = None  # Capture health of the last finished session
+        self._frame_bytes = 2
         
-    def _initialize_audio(self):
-        """Initialize PyAudio and find suitable input device"""
-        try:
-            self.audio = pyaudio.PyAudio()
-            self.device_index = self._find_input_device()
-            if self.device_index is None:
-                raise RuntimeError("No suitable input device found")
-        except Exception as e:
-            logger.error(f"Failed to initialize PyAudio: {e}")
-            raise
-            
-    def _find_input_device(self):
-        """Find the first working input device"""
-        logger.info("Searching for input devices...")
+        # Warm mode state
+        self.warm = Config.WARM_STREAM
+        self.preroll = RingBuffer(int(Config.PREROLL_MS / 1000 * self.rate))
+        self._state_lock = threading.Lock()  # Serializes arming, suspending, starting and stopping
+        self._last_activity = time.monotonic()
+        self._idle_busy = 0.0
+        self._idle_window_start = self._last_activity
+        self._watchdog = None
+        self._watchdog_stop = threading.Event()
         
-        try:
-            # Try default input device first
-            default_device = self.audio.get_default_input_device_info()
-            logger.info(f"Testing default input device: {default_device['name']}")
-            
-            stream = self.audio.open(
-                format=self.format,
-                channels=self.channels,
-                rate=self.rate,
-                input=True,
-                frames_per_buffer=self.chunk
-            )
-            stream.close()
-            logger.info(f"Using default input device: {default_device['name']}")
-            return default_device['index']
-        except Exception as e:
-            logger.warning(f"Default device test failed: {e}")
-            
-        # If default device failed, try all devices
-        try:
-            info = self.audio.get_host_api_info_by_index(0)
-            numdevices = info.get('deviceCount')
-            
-            for i in range(numdevices):
-                try:
-                    device_info = self.audio.get_device_info_by_index(i)
-                    logger.info(f"Testing device {i}: {device_info['name']}")
-                    
-                    if device_info.get('maxInputChannels', 0) <= 0:
-                        continue
-                        
-                    stream = self.audio.open(
-                        format=self.format,
-                        channels=self.channels,
-                        rate=self.rate,
-                        input=True,
-                        input_device_index=i,
-                        frames_per_buffer=self.chunk
-                    )
-                    stream.close()
-                    logger.info(f"Selected input device {i}: {device_info['name']}")
-                    return i
-                except Exception as e:
-                    logger.warning(f"Device {i} test failed: {e}")
-                    continue
-        except Exception as e:
-            logger.error(f"Error enumerating devices: {e}")
-            
-        logger.error("No working input device found")
-        return None
+        # Callback capture: the audio thread only queues each chunk with its
+        # arrival time; a consumer thread converts and analyses them in order
+        self._chunks = queue.SimpleQueue()
+        self._consumer = None
+        
+        # Input: the microphone unless another source is given
+        self._source_changed = False
+        self._reopen_pending = False
+        self.source = source or PyAudioSource()
+        self.converter = None
+        self.chunk = self.segmenter.chunk = self.source.base_chunk
+        self._configure_converter()
+        self.source.watch(self._on_source_changed)
         
+    def _configure_converter(self):
+        """Match the converter to the source's native settings"""
+        self.converter = CaptureConverter(self.source.dtype, self.source.channels, self.source.rate, self.rate)
+        logger.info(f"Converting {self.source.channels} channel(s) at {self.source.rate} Hz "
+                    f"to mono {self.rate} Hz")
+        
+    def _on_source_changed(self):
+        """Re-select the input after a hot-plug event, deferring while a recording runs"""
+        if self.is_recording:
+            self._source_changed = True
+            return
+        self._reconfigure_source()
+        
+    def _reconfigure_source(self):
+        """Re-initialize the source and re-arm the warm stream if it was armed"""
+        self._source_changed = False
+        was_armed = self.warm and self.source.is_open
+        if self.warm:
+            self.suspend()
+        if not self.source.reinitialize():
+            return
+        self._configure_converter()
+        if was_armed:
+            self.arm()
+            
     def start(self):
         """Start audio recording"""
-        if not self.device_index:
+        if not self.source.available:
             logger.error("No input device available")
             return False
             
+        if self.warm:
+            return self._start_warm()
+            
         self.is_recording = True
-        self.frames = []
+        self._reset_recording()
+        self.converter.reset()
+        self._prepare_encoder()
+        if self.uses_callback:
+            self._start_consumer()
         
         try:
-            self.stream = self.audio.open(
-                format=self.format,
-                channels=self.channels,
-                rate=self.rate,
-                input=True,
-                input_device_index=self.device_index,
-                frames_per_buffer=self.chunk
-            )
-            logger.info("Recording started successfully")
+            self.source.open(self._stream_callback if self.uses_callback else None)
+            logger.info(f"Recording started successfully ({self.capture_mode} mode)")
             return True
         except Exception as e:
             logger.error(f"Failed to start recording: {e}")
             self.is_recording = False
             return False
             
+    def _reset_recording(self):
+        """Clear per-recording state before capture begins"""
+        self.buffer.clear()
+        self.vad.reset()
+        self.gain.reset()
+        self.segmenter.reset()
+        if self.preprocessor:
+            self.preprocessor.reset()
+        self._segment_index = 0
+        self._abort_encoder()
+        self._frame_bytes = self.source.dtype.itemsize * self.source.channels
+        self.health.reset(self.source.overflows, self.source.rate, self.source.chunk)
+        
+    @property
+    def uses_callback(self) -> bool:
+        """Whether the source pushes chunks to us instead of being polled"""
+        return self.capture_mode == 'callback' or self.warm
+        
+    def _process_chunk(self, data: bytes, arrived: float = None) -> bool:
+        """Store a captured chunk, returning False once recording should end"""
+        self.health.record_chunk(len(data) // self._frame_bytes, arrived)
+        audio_data = self.converter.process(data)
+        if self.preprocessor:
+            audio_data = self.preprocessor.process(audio_data)
+        self._store(audio_data)
+            
+        # Split long dictation at pauses so each piece can be sent early
+        cut = self.segmenter.next_cut(self.buffer.view(), self.vad)
+        if cut is not None:
+            self._close_segment(cut)
+        self._feed_encoder()
+            
+        # Check if we've exceeded maximum duration
+        duration = len(self.buffer) / self.rate
+        if duration >= Config.MAX_DICTATION_LENGTH:
+            logger.warning("Maximum recording duration reached")
+            return False
+            
+        return True
+        
+    def _store(self, audio_data: np.ndarray):
+        """Append converted audio and update the VAD and gain statistics"""
+        # Keep everything; the VAD only tags where speech is
+        self.buffer.append(audio_data)
+        flags = self.vad.process(audio_data)
+        self.gain.update(audio_data, self.vad.in_speech or bool(flags.any()))
+        
+    def _stream_callback(self, in_data) -> bool:
+        """Source callback: runs on the audio thread, so it only queues the chunk"""
+        self._chunks.put((time.perf_counter(), in_data))
+        return in_data is not None and (self.warm or self.is_recording)
+        
+    def _start_consumer(self):
+        if not self._consumer or not self._consumer.is_alive():
+            self._consumer = threading.Thread(target=self._consume_chunks, name='capture-consumer', daemon=True)
+            self._consumer.start()
+            
+    def _consume_chunks(self):
+        """Consumer thread: processes queued chunks, and runs queued actions between them"""
+        while True:
+            item = self._chunks.get()
+            if item is None:
+                return
+            if callable(item):
+                item()
+                continue
+            arrived, data = item
+            if data is None:
+                self.is_recording = False  # The source ran out
+                continue
+            try:
+                if self.is_recording:
+                    if not self._process_chunk(data, arrived):
+                        self.is_recording = False
+                elif self.warm:
+                    started = time.perf_counter()
+                    self.preroll.write(self.converter.process(data))
+                    self._idle_busy += time.perf_counter() - started
+            except Exception as e:
+                logger.error(f"Error processing captured audio: {e}")
+                if not self.warm:
+                    self.is_recording = False
+                    
+    def _on_consumer(self, action):
+        """Run `action` on the consumer thread after the chunks queued so far, waiting for it"""
+        if not self._consumer or not self._consumer.is_alive():
+            action()
+            return
+        done = threading.Event()
+        
+        def run():
+            try:
+                action()
+            except Exception as e:
+                logger.error(f"Error in capture consumer: {e}")
+            finally:
+                done.set()
+        self._chunks.put(run)
+        done.wait()
+        
     def record_chunk(self):
-        """Record a single chunk of audio"""
-        if not self.is_recording or not self.stream:
+        """Record a single chunk of audio (blocking mode)"""
+        if not self.is_recording or not self.source.is_open:
             return False
             
         try:
-            data = self.stream.read(self.chunk, exception_on_overflow=False)
-            audio_data = np.frombuffer(data, dtype=np.float32)
-            
-            # Only append if above silence threshold
-            if np.max(np.abs(audio_data)) > Config.SILENCE_THRESHOLD:
-                self.frames.append(data)
-                
-            # Check if we've exceeded maximum duration
-            duration = len(self.frames) * self.chunk / self.rate
-            if duration >= Config.MAX_AUDIO_LENGTH:
-                logger.warning("Maximum recording duration reached")
+            data = self.source.read()
+            if not data:
+                logger.info("Audio source exhausted")
                 return False
-                
-            return True
+            return self._process_chunk(data)
             
         except Exception as e:
             logger.error(f"Error recording chunk: {e}")
             return False
             
     def stop(self):
-        """Stop audio recording"""
-        self.is_recording = False
-        if self.stream:
-            try:
-                self.stream.stop_stream()
-                self.stream.close()
-                self.stream = None
-            except Exception as e:
-                logger.error(f"Error stopping stream: {e}")
+        """Stop audio recording
+        
+        In callback mode stop_stream() returns as soon as the callback in
+        flight has finished, i.e. within one buffer period, and the chunks
+        still queued are then processed. In warm mode the stream stays
+        open and the recording ends after the chunks queued so far.
+        """
+        if self.warm:
+            with self._state_lock:
+                self._on_consumer(self._end_recording)
+        elif self.uses_callback:
+            self.source.close()
+            self._on_consumer(self._end_recording)
+        else:
+            self.is_recording = False
+            self.source.close()
+            
+        self._check_health()
+            
+        # Apply a hot-plug change that arrived mid-recording, off the critical path
+        if self._source_changed:
+            threading.Thread(target=self._reconfigure_source, daemon=True).start()
+        elif self._reopen_pending:
+            threading.Thread(target=self._reopen_warm, daemon=True).start()
                 
-    def save_recording(self, output_path: Path) -> bool:
-        """Save recorded audio to a WAV file"""
-        if not self.frames:
-            logger.warning("No audio frames to save")
+    def _check_health(self):
+        """Log the session's capture health and enlarge the chunk after lossy sessions"""
+        stats = self.last_stats = self.health.finish(self.source.overflows)
+        summary = (f"{stats['overflows']} overflow(s), {stats['gaps']} gap(s), "
+                   f"{stats['missing_frames']} of {stats['expected_frames']} frames missing, "
+                   f"jitter {stats['jitter_ms']:.1f} ms (max interval {stats['max_interval_ms']:.0f} ms "
+                   f"for a {stats['period_ms']:.0f} ms period)")
+        if not self.health.unhealthy(stats):
+            logger.info(f"Capture health: {summary}")
+            return
+        logger.warning(f"Capture lost audio: {summary}")
+        
+        chunk = min(self.source.base_chunk * 2, Config.MAX_CHUNK)
+        if chunk == self.source.base_chunk:
+            logger.warning(f"Chunk size already at MAX_CHUNK ({Config.MAX_CHUNK})")
+            return
+        logger.warning(f"Increasing chunk size from {self.source.base_chunk} to {chunk} frames")
+        self.source.resize(chunk)
+        self.chunk = self.segmenter.chunk = chunk
+        # The open warm stream keeps its buffer size until it is reopened
+        self._reopen_pending = self.warm and self.source.is_open
+            
+    def _reopen_warm(self):
+        """Reopen the warm stream so a new chunk size takes effect"""
+        with self._state_lock:
+            if self.is_recording or not self._reopen_pending:
+                return
+            self._suspend()
+            self.arm()
+        
+    def get_stats(self) -> dict:
+        """Capture health of the current session, or of the last one when idle"""
+        if self.is_recording:
+            self.health.record_overflows(self.source.overflows)
+            stats = self.health.stats()
+        else:
+            stats = dict(self.last_stats or self.health.stats())
+        stats.update({
+            'recording': self.is_recording,
+            'chunk': self.source.base_chunk,
+            'sessions': self.health.sessions,
+            'total_overflows': self.health.total_overflows,
+            'total_gaps': self.health.total_gaps,
+            'total_missing_frames': self.health.total_missing_frames,
+        })
+        return stats
+        
+    # Warm mode: the input stream stays open while the app is armed and the
+    # callback keeps the last PREROLL_MS of audio, so a hotkey press starts
+    # recording with no stream-open latency and without losing the onset.
+    
+    def arm(self) -> bool:
+        """Open the warm input stream and start filling the pre-roll"""
+        if not self.warm:
+            return False
+        if self.source.is_open:
+            return True
+        if not self.source.available:
+            logger.error("No input device available")
             return False
             
         try:
-            # Convert frames to numpy array
-            audio_data = np.frombuffer(b''.join(self.frames), dtype=np.float32)
+            self._start_consumer()
+            self.preroll.clear()
+            self._idle_busy = 0.0
+            self._idle_window_start = time.monotonic()
+            self._last_activity = self._idle_window_start
+            self.source.open(self._stream_callback)
+            self._reopen_pending = False
+            logger.info(f"Warm input stream armed ({Config.PREROLL_MS} ms pre-roll)")
+        except Exception as e:
+            logger.error(f"Failed to arm warm input stream: {e}")
+            return False
             
-            # Check duration
-            duration = len(audio_data) / self.rate
-            if duration < Config.MIN_AUDIO_LENGTH:
-                logger.warning(f"Audio too short ({duration:.2f}s)")
-                return False
-                
-            # Normalize audio
-            max_val = np.max(np.abs(audio_data))
-            if max_val > 0:
-                audio_data = audio_data / max_val
-                
-            # Convert to int16
-            audio_data_int16 = (audio_data * 32767).astype(np.int16)
-            
-            # Save as WAV
-            with wave.open(str(output_path), 'wb') as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(2)  # 2 bytes for int16
-                wf.setframerate(self.rate)
-                wf.writeframes(audio_data_int16.tobytes())
+        if not self._watchdog or not self._watchdog.is_alive():
+            self._watchdog_stop.clear()
+            self._watchdog = threading.Thread(target=self._watch_idle, daemon=True)
+            self._watchdog.start()
+        return True
+        
+    def suspend(self):
+        """Close the warm stream; the next start() reopens it"""
+        with self._state_lock:
+            self._suspend()
+            
+    def _suspend(self):
+        self.source.close()
+        self._on_consumer(self.preroll.clear)
                 
-            # Clear frames
-            self.frames = []
-            return True
+    def _start_warm(self) -> bool:
+        """Begin a recording from the pre-roll of the warm stream"""
+        with self._state_lock:
+            if not self.source.is_open:
+                logger.info("Warm stream suspended, reopening")
+                if not self.arm():
+                    return False
+            # Chunks queued before the press end up in the pre-roll first
+            self._on_consumer(self._begin_warm)
+        logger.info(f"Recording started from warm stream ({len(self.buffer) / self.rate * 1000:.0f} ms pre-roll)")
+        return True
+        
+    def _begin_warm(self):
+        """Start the recording with the pre-roll; runs on the consumer thread"""
+        preroll = self.preroll.drain()
+        self._reset_recording()
+        if self.preprocessor:
+            # The pre-roll is background noise right up to the press
+            self.preprocessor.learn(preroll)
+            preroll = self.preprocessor.process(preroll)
+        self._store(preroll)
+        self._prepare_encoder()
+        self.is_recording = True
+        self._last_activity = time.monotonic()
+        
+    def _end_recording(self):
+        """End the recording; runs on the consumer thread once the chunks before the release are in"""
+        self.is_recording = False
+        self._last_activity = time.monotonic()
+        
+    def _watch_idle(self):
+        """Suspend the warm stream when idle too long or over its CPU budget"""
+        while not self._watchdog_stop.wait(WATCHDOG_INTERVAL):
+            # Under the lock a hotkey press cannot start a recording between the check and the suspend
+            with self._state_lock:
+                if not self.source.is_open or self.is_recording:
+                    continue
+                now = time.monotonic()
+                if Config.WARM_IDLE_TIMEOUT and now - self._last_activity >= Config.WARM_IDLE_TIMEOUT:
+                    logger.info(f"No recording for {Config.WARM_IDLE_TIMEOUT:.0f}s, suspending warm stream")
+                    self._suspend()
+                    continue
+                    
+                window = now - self._idle_window_start
+                if window >= WATCHDOG_WINDOW:
+                    load = self._idle_busy / window
+                    self._idle_busy = 0.0
+                    self._idle_window_start = now
+                    if load > Config.WARM_IDLE_CPU_BUDGET:
+                        logger.warning(f"Warm stream idle load {load:.2%} exceeds budget "
+                                       f"{Config.WARM_IDLE_CPU_BUDGET:.2%}, suspending")
+                        self._suspend()
+                    
+    def _prepare_encoder(self):
+        """Start a spare encoder process in the background for the next segment"""
+        with self._encoder_lock:
+            if not self.compress or self._closed or self._spawning or self._spare_encoder is not None:
+                return
+            self._spawning = True
+        
+        def spawn():
+            encoder = None
+            try:
+                encoder = StreamingEncoder(self.rate)
+            except Exception as e:
+                logger.error(f"Failed to start {Config.UPLOAD_CODEC} encoder: {e}")
+            with self._encoder_lock:
+                self._spawning = False
+                if not self._closed:
+                    self._spare_encoder, encoder = encoder, None
+            if encoder:
+                encoder.abort()  # Started after cleanup()
+        threading.Thread(target=spawn, daemon=True).start()
+        
+    def _feed_encoder(self, end: int = None):
+        """Send the open segment's new audio up to `end` to its encoder"""
+        if not self.compress:
+            return
+        if self.encoder is None:
+            # Adopt the spare if it has started; until then audio just waits in the buffer
+            with self._encoder_lock:
+                self.encoder, self._spare_encoder = self._spare_encoder, None
+            if self.encoder is None:
+                return
+            self.encoder.start = self.segmenter.start
+            self.encoder.index = self._segment_index
+            self._prepare_encoder()
             
+        start = self.encoder.start
+        end = len(self.buffer) if end is None else end
+        spans = self.segmenter.keep_spans(self.vad.regions, start, end) if Config.TRIM_SILENCE else None
+        self.encoder.feed(self.buffer.view()[start:end], spans, self.gain.gain())
+        
+    def _abort_encoder(self):
+        encoder, self.encoder = self.encoder, None
+        if encoder:
+            encoder.abort()
+            
+    def get_audio(self) -> np.ndarray:
+        """Zero-copy view of the recorded samples"""
+        return self.buffer.view()
+        
+    def _close_segment(self, end: int, final: bool = False, emit: bool = True):
+        """Close the open segment at `end` and hand it to on_segment"""
+        start = self.segmenter.start
+        if self.encoder and self.encoder.start != start:
+            self._abort_encoder()
+        self._feed_encoder(end)
+        encoder, self.encoder = self.encoder, None
+        self.segmenter.start = end
+        if not any(s < end and e > start for s, e in self.vad.regions):
+            logger.debug(f"Skipping segment without speech ({(end - start) / self.rate:.2f}s)")
+            if encoder:
+                encoder.abort()
+            return None
+            
+        # A copy: the next recording reuses the buffer while this segment may still be queued
+        segment = Segment(self._segment_index, start, end, self.buffer.view()[start:end].copy(),
+                          self.gain.gain(), self.rate, final)
+        if Config.TRIM_SILENCE:
+            segment.spans = self.segmenter.keep_spans(self.vad.regions, start, end)
+        segment.encoder = encoder
+        segment.peak = self.gain.peak  # The next recording may start before this one is encoded
+        self._segment_index += 1
+        logger.info(f"Closed {segment}")
+        if emit and self.on_segment:
+            self.on_segment(segment)
+        return segment
+        
+    def finish_recording(self, emit: bool = True):
+        """Close the last segment after stop(); returns it, or None if nothing is left to send"""
+        if self.preprocessor:
+            self._store(self.preprocessor.flush())
+        self.vad.finish()
+        duration = len(self.buffer) / self.rate
+        if duration < Config.MIN_AUDIO_LENGTH:
+            logger.warning(f"Audio too short ({duration:.2f}s)")
+            self._abort_encoder()
+            return None
+            
+        if not self.vad.has_speech:
+            logger.warning("No speech detected in recording")
+            self._abort_encoder()
+            return None
+        logger.debug(f"Speech regions: {len(self.vad.regions)}, "
+                     f"{self.vad.speech_samples() / self.rate:.2f}s of {duration:.2f}s")
+        return self._close_segment(len(self.buffer), final=True, emit=emit)
+        
+    def _write_wav(self, pcm: np.ndarray, output):
+        """Write int16 mono PCM as WAV to a path or a binary file object"""
+        with wave.open(str(output) if isinstance(output, Path) else output, 'wb') as wf:
+            wf.setnchannels(self.channels)
+            wf.setsampwidth(2)  # 2 bytes for int16
+            wf.setframerate(self.rate)
+            wf.writeframes(pcm)
+            
+    def encode_segment(self, segment: Segment):
+        """Encode a segment as an in-memory file for upload, or None on failure
+        
+        Segments compressed during capture only need the encoder flushed;
+        otherwise, or if that fails, the segment is encoded as WAV.
+        """
+        if segment.encoder:
+            started = time.perf_counter()
+            encoded = segment.encoder.finish()
+            segment.encoder = None
+            if encoded is not None:
+                size = encoded.getbuffer().nbytes
+                logger.info(f"Encoded {segment} as {Config.UPLOAD_CODEC}: {size} bytes "
+                            f"({size / (segment.kept_samples * 2 + 44):.0%} of WAV), flushed in "
+                            f"{(time.perf_counter() - started) * 1000:.1f} ms")
+                return encoded
+            logger.warning(f"Falling back to WAV for {segment}")
+        return self._encode_wav(segment)
+        
+    def _encode_wav(self, segment: Segment):
+        """Encode a segment as an in-memory WAV file, or None on failure"""
+        try:
+            # Gain is already known from the statistics gathered during
+            # capture, so conversion is a single fused pass
+            started = time.perf_counter()
+            audio = segment.compacted()
+            trimmed = len(segment.audio) - len(audio)
+            if trimmed:
+                logger.info(f"Trimmed {trimmed / self.rate:.2f}s of silence from {segment.duration:.2f}s "
+                            f"({trimmed * 2} bytes, {trimmed / len(segment.audio):.0%})")
+            pcm = convert_to_int16(audio, segment.gain, self.buffer.full_scale,
+                                   clip=segment.gain * segment.peak > 1.0)
+            logger.debug(f"Applied gain {20 * np.log10(segment.gain):+.1f} dB to {segment.duration:.1f}s "
+                         f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+            encoded = io.BytesIO()
+            self._write_wav(pcm, encoded)
+            encoded.seek(0)
+            encoded.name = f"segment_{segment.index}.wav"  # Upload filename; tells the API the format
+            return encoded
+            
+        except Exception as e:
+            logger.error(f"Error encoding audio: {e}")
+            return None
+            
+    def save_segment(self, segment: Segment, output_path: Path) -> bool:
+        """Save a segment to a WAV file, e.g. for debugging"""
+        if segment.encoder:
+            segment.encoder.abort()
+            segment.encoder = None
+        encoded = self._encode_wav(segment)
+        if encoded is None:
+            return False
+        try:
+            Path(output_path).write_bytes(encoded.getbuffer())
+            return True
         except Exception as e:
             logger.error(f"Error saving audio: {e}")
             return False
             
+    def save_recording(self, output_path: Path) -> bool:
+        """Save the whole recorded audio to a WAV file"""
+        if not len(self.buffer):
+            logger.warning("No audio frames to save")
+            return False
+            
+        # One segment spanning the whole recording
+        self.segmenter.reset()
+        segment = self.finish_recording(emit=False)
+        if segment is None:
+            return False
+            
+        saved = self.save_segment(segment, output_path)
+        # Clear frames
+        self.buffer.clear()
+        return saved
+        
     def cleanup(self):
         """Clean up resources"""
-        if self.stream:
-            try:
-                self.stream.stop_stream()
-                self.stream.close()
-            except Exception as e:
-                logger.error(f"Error closing stream: {e}")
-                
-        if self.audio:
-            try:
-                self.audio.terminate()
-            except Exception as e:
-                logger.error(f"Error terminating PyAudio: {e}")
-                
+        self._watchdog_stop.set()
+        self._abort_encoder()
+        with self._encoder_lock:
+            self._closed = True
+            spare, self._spare_encoder = self._spare_encoder, None
+        if spare:
+            spare.abort()
+        try:
+            self.source.terminate()
+        except Exception as e:
+            logger.error(f"Error closing audio source: {e}")
+        self._chunks.put(None)  # Ends the consumer thread
+            
+
         # Clear memory
-        self.frames = [] 
\ No newline at end of file
+        self.buffer.clear() 
\ No newline at end of file
@@ -0,0 +1,92 @@
+import logging
+from math import gcd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+# Scale factors that map integer PCM to [-1, 1)
+FULL_SCALE = {
+    np.dtype(np.int16): 32768.0,
+    np.dtype(np.int32): 2147483648.0,
+    np.dtype(np.float32): 1.0,
+}
+
+class Resampler:
+    """Streaming polyphase resampler.
+
+    The rational ratio rate_out / rate_in is reduced to up / down and a
+    Kaiser-windowed sinc low-pass is split into `up` phases of
+    `taps_per_phase` coefficients. Every output sample of a chunk is
+    computed at once as a dot product between a sliding window of the
+    input and the coefficients of its phase. History is carried between
+    calls so chunk boundaries are seamless.
+    """
+
+    def __init__(self, rate_in: int, rate_out: int, taps_per_phase: int = None):
+        divisor = gcd(int(rate_in), int(rate_out))
+        self.up = int(rate_out) // divisor
+        self.down = int(rate_in) // divisor
+        self.taps = taps_per_phase or Config.RESAMPLER_TAPS
+        self.passthrough = self.up == self.down
+        if not self.passthrough:
+            self._phases = self._design()
+        self.reset()
+
+    def _design(self) -> np.ndarray:
+        """Low-pass prototype split into reversed polyphase components"""
+        length = self.taps * self.up
+        # Cut off just below the lower of the two Nyquist frequencies,
+        # normalized to the upsampled rate
+        cutoff = 0.5 / max(self.up, self.down) * 0.9
+        m = np.arange(length) - (length - 1) / 2
+        prototype = 2 * cutoff * np.sinc(2 * cutoff * m) * np.kaiser(length, 8.0) * self.up
+        phases = prototype.reshape(self.taps, self.up).T
+        # Reverse so a forward sliding window lines up with x[n - k]
+        return np.ascontiguousarray(phases[:, ::-1], dtype=np.float32)
+
+    def reset(self):
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._consumed = 0  # Input samples seen so far
+        self._next = 0  # Upsampled-time index of the next output sample
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample a chunk of mono float32 samples"""
+        if self.passthrough:
+            return samples
+        extended = np.concatenate((self._history, samples))
+        available = (self._consumed + len(samples)) * self.up
+        count = max(0, (available - 1 - self._next) // self.down + 1)
+
+        times = self._next + np.arange(count, dtype=np.int64) * self.down
+        # extended[0] is input sample _consumed - (taps - 1), so the window
+        # ending at input sample t starts at t - _consumed
+        starts = times // self.up - self._consumed
+        windows = sliding_window_view(extended, self.taps)[starts]
+        out = np.einsum('ij,ij->i', windows, self._phases[times % self.up]).astype(np.float32)
+
+        self._next += count * self.down
+        self._consumed += len(samples)
+        self._history = extended[len(extended) - (self.taps - 1):].copy()
+        return out
+
+class CaptureConverter:
+    """Turns raw device chunks into mono float32 at the Whisper rate"""
+
+    def __init__(self, dtype, channels: int, rate_in: int, rate_out: int = Config.RATE):
+        self.dtype = np.dtype(dtype)
+        self.channels = channels
+        self.scale = 1.0 / FULL_SCALE[self.dtype]
+        self.resampler = Resampler(rate_in, rate_out)
+
+    def reset(self):
+        self.resampler.reset()
+
+    def process(self, data: bytes) -> np.ndarray:
+        samples = np.frombuffer(data, dtype=self.dtype)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        if self.dtype != np.float32:
+            samples = samples * np.float32(self.scale)
+        return self.resampler.process(samples.astype(np.float32, copy=False))
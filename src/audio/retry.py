@@ -0,0 +1,145 @@
+import time
+import random
+import logging
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+class LatencyTracker:
+    """Rolling window of recent successful request latencies"""
+
+    def __init__(self, window: int = None):
+        self.samples = collections.deque(maxlen=window or Config.HEDGE_WINDOW)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, percent: float):
+        """Latency at `percent` in seconds, or None until HEDGE_MIN_SAMPLES are known"""
+        with self._lock:
+            if len(self.samples) < Config.HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+class RetryPolicy:
+    """Retries with jittered exponential backoff, plus optional hedging.
+
+    A failed attempt is retried after a random delay of up to
+    RETRY_BASE_DELAY * 2**n (capped at RETRY_MAX_DELAY, "full jitter", so
+    clients that failed together do not retry together) if `retryable`
+    says the error is transient, up to RETRY_MAX_ATTEMPTS attempts and
+    RETRY_DEADLINE seconds overall.
+
+    With HEDGE enabled, an attempt that has not answered by the observed
+    HEDGE_PERCENTILE latency gets a duplicate request and the first
+    success wins; the other is left to finish and discarded. At most
+    HEDGE_BUDGET of requests are hedged, so a slow API is not hit twice
+    as hard.
+
+    Errors for which `throttled` is true (the service asked to slow down,
+    and the admission controller waits as long as it said) are retried
+    without using up an attempt, until RETRY_DEADLINE.
+    """
+
+    def __init__(self, retryable, workers: int = None, throttled=None):
+        self.retryable = retryable  # Called with an exception; True if worth retrying
+        self.throttled = throttled or (lambda error: False)
+        self.latency = LatencyTracker()
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        if Config.HEDGE:
+            # Each worker's request and its hedge run here
+            self._executor = ThreadPoolExecutor(max_workers=(workers or Config.TRANSCRIPTION_WORKERS) * 2,
+                                                thread_name_prefix='request')
+
+    def run(self, request, hedge: bool = True):
+        """Call `request()` until it succeeds or the retry budget is spent; raises the last error"""
+        deadline = time.monotonic() + Config.RETRY_DEADLINE
+        attempt = 1
+        failures = 0  # Backoff grows with every failure, throttled ones included
+        while True:
+            try:
+                return self._attempt(request, deadline, hedge)
+            except Exception as e:
+                throttled = self.throttled(e)
+                if not throttled and (not self.retryable(e) or attempt >= Config.RETRY_MAX_ATTEMPTS):
+                    raise
+                delay = random.uniform(0, min(Config.RETRY_MAX_DELAY, Config.RETRY_BASE_DELAY * 2 ** failures))
+                if time.monotonic() + delay >= deadline:
+                    raise
+                logger.warning(f"Request attempt {attempt} failed ({e}), retrying in {delay * 1000:.0f} ms")
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+                failures += 1
+                if not throttled:
+                    attempt += 1
+
+    def _timed(self, request):
+        started = time.perf_counter()
+        result = request()
+        self.latency.record(time.perf_counter() - started)
+        return result
+
+    def _hedge_delay(self):
+        """Seconds to wait before hedging this request, or None to not hedge"""
+        if not self._executor:
+            return None
+        delay = self.latency.percentile(Config.HEDGE_PERCENTILE)
+        if delay is None:
+            return None
+        with self._lock:
+            if self.hedges >= self.requests * Config.HEDGE_BUDGET:
+                return None
+        return delay
+
+    def _attempt(self, request, deadline: float, hedge: bool = True):
+        with self._lock:
+            self.requests += 1
+        hedge_after = self._hedge_delay() if hedge else None
+        if hedge_after is None:
+            return self._timed(request)
+
+        primary = self._executor.submit(self._timed, request)
+        pending = {primary}
+        done, _ = wait(pending, timeout=hedge_after)
+        if not done and self._hedge_delay() is not None:
+            logger.info(f"No response after {hedge_after * 1000:.0f} ms "
+                        f"(p{Config.HEDGE_PERCENTILE:g}), sending a hedged request")
+            with self._lock:
+                self.hedges += 1
+            pending.add(self._executor.submit(self._timed, request))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"No response within RETRY_DEADLINE ({Config.RETRY_DEADLINE:g} s)")
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'hedges': self.hedges,
+                'hedge_wins': self.hedge_wins,
+            }
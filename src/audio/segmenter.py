@@ -0,0 +1,130 @@
+import logging
+import numpy as np
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+# WAV header plus int16 mono samples must fit in one upload
+WAV_HEADER_BYTES = 44
+JOIN_FADE_MS = 5  # Fade on each side of a shortened pause, so joins do not click
+
+class Segment:
+    """A closed stretch of a recording, ready to be encoded and transcribed"""
+
+    def __init__(self, index: int, start: int, end: int, audio: np.ndarray,
+                 gain: float, rate: int, final: bool = False):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.audio = audio  # The segment's own copy of its samples
+        self.gain = gain
+        self.rate = rate
+        self.final = final
+        self.spans = None  # (start, end) parts of `audio` to upload; None keeps everything
+        self.encoder = None  # StreamingEncoder fed during capture, if compressing
+        self.peak = 1.0  # Recording peak when the segment closed (1.0 = full scale)
+
+    @property
+    def duration(self) -> float:
+        return (self.end - self.start) / self.rate
+
+    @property
+    def kept_samples(self) -> int:
+        if self.spans is None:
+            return len(self.audio)
+        return sum(end - start for start, end in self.spans)
+
+    def compacted(self) -> np.ndarray:
+        """The audio to upload: the kept spans joined with short fades"""
+        if self.spans is None or self.spans == [(0, len(self.audio))]:
+            return self.audio
+        pieces = [self.audio[start:end] for start, end in self.spans]
+        out = np.concatenate(pieces) if pieces else self.audio[:0].copy()
+        fade = int(JOIN_FADE_MS / 1000 * self.rate)
+        ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+        position = 0
+        for piece in pieces[:-1]:
+            position += len(piece)
+            if position < fade or len(out) - position < fade:
+                continue
+            out[position - fade:position] = out[position - fade:position] * ramp[::-1]
+            out[position:position + fade] = out[position:position + fade] * ramp
+        return out
+
+    def __repr__(self):
+        return f"Segment({self.index}, {self.start / self.rate:.2f}-{self.end / self.rate:.2f}s, final={self.final})"
+
+class Segmenter:
+    """Chooses where to split a long recording.
+
+    Once the open segment is longer than SEGMENT_TARGET_LENGTH it is cut
+    at the next pause the VAD reports. If no pause arrives before the
+    segment would exceed the per-upload limit (MAX_AUDIO_LENGTH or
+    MAX_UPLOAD_BYTES) it is cut at the quietest frame of the last second.
+    """
+
+    def __init__(self, rate: int = Config.RATE):
+        self.rate = rate
+        self.target = int(Config.SEGMENT_TARGET_LENGTH * rate)
+        self.limit = min(int(Config.MAX_AUDIO_LENGTH * rate),
+                         (Config.MAX_UPLOAD_BYTES - WAV_HEADER_BYTES) // 2)
+        self.min_pause = int(Config.SEGMENT_MIN_PAUSE_MS / 1000 * rate)
+        self.frame = int(Config.VAD_FRAME_MS / 1000 * rate)
+        self.max_pause = int(Config.MAX_PAUSE_MS / 1000 * rate)
+        self.chunk = Config.CHUNK  # Largest chunk the recorder appends at once
+        self.reset()
+
+    def reset(self):
+        self.start = 0  # Sample index where the open segment begins
+
+    def next_cut(self, audio: np.ndarray, vad) -> int:
+        """Sample index to close the open segment at, or None to keep going"""
+        length = len(audio) - self.start
+        if length < self.target:
+            return None
+
+        # Cut in the middle of a pause, leaving a little silence on each side
+        if not vad.in_speech:
+            regions = vad.closed_regions
+            pause_start = max(regions[-1][1], self.start) if regions else self.start
+            if len(audio) - pause_start >= self.min_pause:
+                return pause_start + self.min_pause // 2
+
+        # Leave room for the chunk that will arrive next
+        if length >= self.limit - self.chunk:
+            return self._quietest_point(audio)
+        return None
+
+    def keep_spans(self, regions, start: int, end: int):
+        """Parts of [start, end) worth uploading, relative to start.
+
+        Leading and trailing silence outside the speech regions is dropped
+        and pauses longer than MAX_PAUSE_MS are shortened to it, keeping
+        half on each side; shorter pauses are kept whole.
+        """
+        half = self.max_pause // 2
+        spans = []
+        for region_start, region_end in regions:
+            region_start, region_end = max(region_start, start), min(region_end, end)
+            if region_start >= region_end:
+                continue
+            if spans and region_start - spans[-1][1] <= self.max_pause:
+                spans[-1] = (spans[-1][0], region_end)
+            elif spans:
+                spans[-1] = (spans[-1][0], spans[-1][1] + half)
+                spans.append((region_start - half, region_end))
+            else:
+                spans.append((region_start, region_end))
+        return [(span_start - start, span_end - start) for span_start, span_end in spans]
+
+    def _quietest_point(self, audio: np.ndarray) -> int:
+        """Start of the lowest-energy frame within the last second"""
+        window_start = max(len(audio) - self.rate, self.start + 1)
+        window = audio[window_start:].astype(np.float32)
+        count = len(window) // self.frame
+        if not count:
+            return len(audio)
+        frames = window[:count * self.frame].reshape(count, self.frame)
+        energy = np.einsum('ij,ij->i', frames, frames)
+        logger.info("No pause before the segment limit, cutting at the quietest frame")
+        return window_start + int(np.argmin(energy)) * self.frame
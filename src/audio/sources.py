@@ -0,0 +1,455 @@
+import time
+import wave
+import logging
+import threading
+import subprocess
+from abc import ABC, abstractmethod
+from pathlib import Path
+import numpy as np
+from .devices import DeviceProbeCache, DeviceWatcher
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+# Capture formats by Config.FORMAT name: PortAudio format constant name and sample type
+SAMPLE_FORMATS = {
+    'INT16': ('paInt16', np.int16),
+    'FLOAT32': ('paFloat32', np.float32),
+    'INT32': ('paInt32', np.int32),
+}
+
+class AudioSource(ABC):
+    """Something that produces raw interleaved capture chunks.
+
+    After construction `dtype`, `channels`, `rate` and `chunk` (frames per
+    read) describe the native stream; AudioRecorder converts it to mono at
+    Config.RATE. A source is either polled with read() or, when opened
+    with a callback, pushes each chunk to `callback(data)` from its own
+    thread. The callback returns False to end the stream and receives
+    None once if the source runs out. `overflows` counts the overruns the
+    source has reported since it was created.
+    """
+
+    dtype = np.dtype(np.int16)
+    channels = 1
+    rate = Config.RATE
+    chunk = Config.CHUNK
+    base_chunk = Config.CHUNK  # Buffer period in frames at Config.RATE
+    overflows = 0
+
+    @property
+    def available(self) -> bool:
+        """Whether the source can currently be opened"""
+        return True
+
+    @property
+    @abstractmethod
+    def is_open(self) -> bool:
+        """Whether the stream is open"""
+
+    @abstractmethod
+    def open(self, callback=None):
+        """Start the stream, pushing chunks to `callback` if given"""
+
+    @abstractmethod
+    def read(self) -> bytes:
+        """Blocking read of one chunk; returns b'' at end of stream"""
+
+    @abstractmethod
+    def close(self):
+        """Stop the stream; it can be opened again"""
+
+    def watch(self, on_change):
+        """Call `on_change` when the underlying device set changes"""
+
+    def reinitialize(self) -> bool:
+        """Re-select the underlying device after a change"""
+        return True
+
+    def terminate(self):
+        """Release everything; the source cannot be reopened"""
+        if self.is_open:
+            self.close()
+
+    def resize(self, chunk: int):
+        """Use a buffer period of `chunk` frames at Config.RATE from the next open()"""
+        self.base_chunk = chunk
+        self.chunk = self._chunk_for(self.rate)
+
+    def _chunk_for(self, rate: int) -> int:
+        """Frames per read that keep the base_chunk buffer period at `rate`"""
+        return max(int(self.base_chunk * rate / Config.RATE), 1)
+
+class PyAudioSource(AudioSource):
+    """Microphone capture through PortAudio at the device's native settings.
+
+    PyAudio is imported here rather than at module level, so the file and
+    synthetic sources work on machines without PortAudio.
+    """
+
+    def __init__(self):
+        import pyaudio
+        self.pyaudio = pyaudio
+        self.formats = {name: (getattr(pyaudio, constant), dtype)
+                        for name, (constant, dtype) in SAMPLE_FORMATS.items()}
+        self.audio = None
+        self.stream = None
+        self.device_index = None
+        self.format = None
+        self.format_name = None
+        self.probe_cache = DeviceProbeCache()
+        self.device_watcher = None
+        self._device_lock = threading.RLock()
+        self._initialize_audio()
+
+    def _initialize_audio(self):
+        """Initialize PyAudio and find suitable input device"""
+        try:
+            self.audio = self.pyaudio.PyAudio()
+            self.device_index = self._find_input_device()
+            if self.device_index is None:
+                raise RuntimeError("No suitable input device found")
+        except Exception as e:
+            logger.error(f"Failed to initialize PyAudio: {e}")
+            raise
+
+    def _input_devices(self):
+        """Enumerate input devices with their host API names, without opening them"""
+        devices = []
+        for i in range(self.audio.get_device_count()):
+            try:
+                device_info = self.audio.get_device_info_by_index(i)
+                if device_info.get('maxInputChannels', 0) <= 0:
+                    continue
+                host_api = self.audio.get_host_api_info_by_index(device_info['hostApi'])['name']
+                channels = min(Config.CHANNELS, int(device_info['maxInputChannels']))
+                key = DeviceProbeCache.key(device_info, host_api, channels)
+                devices.append((device_info, key))
+            except Exception as e:
+                logger.warning(f"Failed to query device {i}: {e}")
+        return devices
+
+    def _native_settings(self, device_info, channels):
+        """Find the device's default rate and the first sample format it accepts"""
+        rate = int(device_info['defaultSampleRate'])
+        names = [Config.FORMAT] + [name for name in SAMPLE_FORMATS if name != Config.FORMAT]
+        for name in names:
+            try:
+                if self.audio.is_format_supported(
+                    rate,
+                    input_device=device_info['index'],
+                    input_channels=channels,
+                    input_format=self.formats[name][0]
+                ):
+                    return name, rate
+            except ValueError:
+                continue
+        return None
+
+    def _probe_device(self, device_info, key) -> bool:
+        """Open and close a test stream at native settings, recording the outcome"""
+        logger.info(f"Testing device {device_info['index']}: {device_info['name']}")
+        channels = min(Config.CHANNELS, int(device_info['maxInputChannels']))
+        try:
+            settings = self.probe_cache.settings(key) or self._native_settings(device_info, channels)
+            if settings is None:
+                raise RuntimeError("no supported sample format")
+            format_name, rate = settings
+            stream = self.audio.open(
+                format=self.formats[format_name][0],
+                channels=channels,
+                rate=rate,
+                input=True,
+                input_device_index=device_info['index'],
+                frames_per_buffer=self._chunk_for(rate)
+            )
+            stream.close()
+            self.probe_cache.record(key, True, format_name, rate)
+            self._use_device(channels, format_name, rate)
+            return True
+        except Exception as e:
+            logger.warning(f"Device {device_info['index']} test failed: {e}")
+            self.probe_cache.record(key, False)
+            return False
+
+    def _use_device(self, channels, format_name, rate):
+        """Configure capture for a device's native settings"""
+        self.format, dtype = self.formats[format_name]
+        self.format_name = format_name
+        self.dtype = np.dtype(dtype)
+        self.rate = rate
+        self.channels = channels
+        self.chunk = self._chunk_for(rate)
+        logger.info(f"Capturing {format_name} at {rate} Hz, {channels} channel(s)")
+
+    def _find_input_device(self):
+        """Find a working input device, validating only the cached choice when possible"""
+        logger.info("Searching for input devices...")
+
+        try:
+            devices = self._input_devices()
+        except Exception as e:
+            logger.error(f"Error enumerating devices: {e}")
+            return None
+
+        # Fast path: the device that worked last time, if it is still present
+        for device_info, key in devices:
+            if key == self.probe_cache.selected:
+                if self._probe_device(device_info, key):
+                    logger.info(f"Using cached input device {device_info['index']}: {device_info['name']}")
+                    return device_info['index']
+                break
+
+        # Otherwise try the default device, then devices not known to fail,
+        # then the known failures in case they have recovered
+        try:
+            default_index = self.audio.get_default_input_device_info()['index']
+        except Exception as e:
+            logger.warning(f"No default input device: {e}")
+            default_index = None
+
+        def order(entry):
+            device_info, key = entry
+            if device_info['index'] == default_index:
+                return 0
+            return 2 if self.probe_cache.result(key) is False else 1
+
+        for device_info, key in sorted(devices, key=order):
+            if self._probe_device(device_info, key):
+                logger.info(f"Selected input device {device_info['index']}: {device_info['name']}")
+                self.probe_cache.select(key)
+                return device_info['index']
+
+        self.probe_cache.save()
+        logger.error("No working input device found")
+        return None
+
+    @property
+    def available(self) -> bool:
+        return self.device_index is not None
+
+    @property
+    def is_open(self) -> bool:
+        return self.stream is not None
+
+    def open(self, callback=None):
+        """Open an input stream on the selected device"""
+        with self._device_lock:
+            self.stream = self.audio.open(
+                format=self.format,
+                channels=self.channels,
+                rate=self.rate,
+                input=True,
+                input_device_index=self.device_index,
+                frames_per_buffer=self.chunk,
+                stream_callback=self._wrap_callback(callback) if callback else None
+            )
+
+    def _wrap_callback(self, callback):
+        """Adapt callback(data) -> bool to the PortAudio callback signature"""
+        def stream_callback(in_data, frame_count, time_info, status):
+            if status & self.pyaudio.paInputOverflow:
+                self.overflows += 1
+            return (None, self.pyaudio.paContinue if callback(in_data) else self.pyaudio.paComplete)
+        return stream_callback
+
+    def read(self) -> bytes:
+        # PyAudio discards the chunk it read when it raises on overflow, so
+        # overruns in blocking mode are detected from the delivered sample
+        # count instead (see CaptureHealth)
+        return self.stream.read(self.chunk, exception_on_overflow=False)
+
+    def close(self):
+        """Stop and close the stream; in callback mode this waits for the callback in flight"""
+        stream, self.stream = self.stream, None
+        if stream:
+            try:
+                stream.stop_stream()
+                stream.close()
+            except Exception as e:
+                logger.error(f"Error stopping stream: {e}")
+
+    def watch(self, on_change):
+        self.device_watcher = DeviceWatcher(on_change)
+        self.device_watcher.start()
+
+    def reinitialize(self) -> bool:
+        """Restart PortAudio so it sees the new device list, then re-select"""
+        with self._device_lock:
+            self.close()
+            try:
+                self.audio.terminate()
+                self.audio = self.pyaudio.PyAudio()
+                self.device_index = self._find_input_device()
+            except Exception as e:
+                logger.error(f"Failed to re-initialize audio after device change: {e}")
+                self.device_index = None
+        return self.device_index is not None
+
+    def terminate(self):
+        if self.device_watcher:
+            self.device_watcher.stop()
+        self.close()
+        if self.audio:
+            try:
+                self.audio.terminate()
+            except Exception as e:
+                logger.error(f"Error terminating PyAudio: {e}")
+
+class BufferedSource(AudioSource):
+    """Serves chunks from an in-memory array of interleaved samples.
+
+    With `realtime` the chunks are paced at the stream rate like a real
+    device; otherwise they are delivered as fast as they are consumed.
+    Each open() replays from the start.
+    """
+
+    def __init__(self, samples: np.ndarray, channels: int, rate: int,
+                 realtime: bool = False, loop: bool = False):
+        self.samples = np.ascontiguousarray(samples)
+        self.dtype = self.samples.dtype
+        self.channels = channels
+        self.rate = rate
+        self.chunk = self._chunk_for(rate)
+        self.realtime = realtime
+        self.loop = loop
+        self._open = False
+        self._thread = None
+        self._position = 0
+        self._started = 0.0
+        self._served = 0
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.channels / self.rate
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    def open(self, callback=None):
+        self._position = 0
+        self._served = 0
+        self._started = time.perf_counter()
+        self._open = True
+        if callback:
+            self._thread = threading.Thread(target=self._feed, args=(callback,), daemon=True)
+            self._thread.start()
+
+    def _feed(self, callback):
+        """Push chunks to the callback, like a PortAudio callback stream"""
+        while self._open:
+            data = self._next_chunk()
+            if data is None:
+                callback(None)
+                break
+            if not callback(data):
+                break
+
+    def _next_chunk(self):
+        step = self.chunk * self.channels
+        if self._position >= len(self.samples):
+            if not self.loop or not len(self.samples):
+                return None
+            self._position = 0
+        data = self.samples[self._position:self._position + step]
+        self._position += step
+        if self.realtime:
+            due = self._started + self._served / self.rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self._served += len(data) // self.channels
+        return data.tobytes()
+
+    def read(self) -> bytes:
+        if not self._open:
+            return b''
+        return self._next_chunk() or b''
+
+    def close(self):
+        self._open = False
+        thread, self._thread = self._thread, None
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+
+class WavFileSource(BufferedSource):
+    """Replays a 16- or 32-bit PCM WAV file"""
+
+    def __init__(self, path: Path, realtime: bool = True, loop: bool = False):
+        with wave.open(str(path), 'rb') as wf:
+            width = wf.getsampwidth()
+            if width not in (2, 4):
+                raise ValueError(f"Unsupported sample width {width * 8} bits in {path}")
+            samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16 if width == 2 else np.int32)
+            super().__init__(samples, wf.getnchannels(), wf.getframerate(), realtime, loop)
+        self.path = Path(path)
+        logger.info(f"Replaying {self.path.name}: {self.duration:.1f}s at {self.rate} Hz")
+
+class DecodedFileSource(BufferedSource):
+    """Any audio file ffmpeg can read (MP3, M4A, Ogg, ...), decoded to mono int16 at Config.RATE"""
+
+    def __init__(self, path: Path, realtime: bool = False):
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', str(path),
+             '-f', 's16le', '-ac', '1', '-ar', str(Config.RATE), 'pipe:1'],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        if result.returncode != 0 or not result.stdout:
+            raise ValueError(f"ffmpeg could not decode {path}: {result.stderr.decode(errors='replace').strip()}")
+        super().__init__(np.frombuffer(result.stdout, dtype=np.int16), 1, Config.RATE, realtime)
+        self.path = Path(path)
+        logger.info(f"Decoded {self.path.name}: {self.duration:.1f}s")
+
+def synthesize_speech(seconds: float, rate: int = Config.RATE, snr_db: float = 20.0,
+                      seed: int = 0, with_speech: bool = True):
+    """Deterministic speech-like audio over brown noise.
+
+    Returns (float32 audio, bool labels) where labels marks the synthetic
+    syllables: voiced harmonic bursts with soft fricative onsets, separated
+    by a mix of short and long pauses. Without speech only the background
+    is returned.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * rate)
+    t = np.arange(n) / rate
+    labels = np.zeros(n, dtype=bool)
+    speech = np.zeros(n, dtype=np.float32)
+
+    pos = int(0.8 * rate)
+    while with_speech and pos < n - rate:
+        length = int(rng.uniform(0.15, 0.45) * rate)
+        f0 = rng.uniform(100, 220)
+        seg = t[:length]
+        voiced = sum(np.sin(2 * np.pi * f0 * k * seg) / k for k in range(1, 8))
+        envelope = np.sin(np.pi * np.arange(length) / length) ** 0.5
+        # Soft fricative onset: high-passed noise before the vowel
+        fric = int(0.06 * rate)
+        speech[pos:pos + fric] += np.diff(rng.standard_normal(fric + 1)) * 0.25
+        speech[pos + fric:pos + fric + length] += voiced * envelope
+        labels[pos:pos + fric + length] = True
+        pos += fric + length + int(rng.choice([0.08, 0.15, 0.6, 1.5]) * rate)
+
+    if labels.any():
+        speech *= 0.3 / np.max(np.abs(speech))
+    background = np.cumsum(rng.standard_normal(n)) * 0.02
+    background -= np.convolve(background, np.ones(400) / 400, mode='same')  # Brown noise, no drift
+    reference = np.sqrt(np.mean(speech[labels] ** 2)) if labels.any() else 0.03
+    background *= reference / (np.sqrt(np.mean(background ** 2)) * 10 ** (snr_db / 20))
+    return (speech + background).astype(np.float32), labels
+
+class SyntheticSource(BufferedSource):
+    """Generated speech-like audio, noise or silence for headless runs"""
+
+    KINDS = ('speech', 'noise', 'silence')
+
+    def __init__(self, seconds: float = 10.0, kind: str = 'speech', snr_db: float = 20.0,
+                 rate: int = Config.RATE, channels: int = 1, seed: int = 0,
+                 realtime: bool = False, loop: bool = False):
+        if kind not in self.KINDS:
+            raise ValueError(f"kind must be one of {self.KINDS}")
+        audio, self.labels = synthesize_speech(seconds, rate, snr_db, seed, with_speech=kind == 'speech')
+        if kind == 'silence':
+            audio[:] = 0
+        samples = np.repeat((audio * 32767).astype(np.int16), channels)
+        super().__init__(samples, channels, rate, realtime, loop)
@@ -1,46 +1,121 @@
 import logging
 from pathlib import Path
-from openai import OpenAI
+import openai
+from .backends import TranscriptionBackend, create_backend
+from .retry import RetryPolicy
 from ..config import Config
 
 logger = logging.getLogger(__name__)
 
+# Status codes besides 5xx worth another attempt: request timeout, conflict, rate limit
+RETRYABLE_STATUS = {408, 409, 429}
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a failed API call may succeed if repeated"""
+    if isinstance(error, openai.APIConnectionError):  # Includes timeouts
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+def is_throttled(error: Exception) -> bool:
+    """Whether the API rejected a call for exceeding its rate limit (not for lack of quota)"""
+    return (isinstance(error, openai.APIStatusError) and error.status_code == 429
+            and getattr(error, 'code', None) != 'insufficient_quota')
+
 class Transcriber:
-    def __init__(self):
-        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
+    def __init__(self, backend: TranscriptionBackend = None, workers: int = None):
+        """`backend` defaults to the one named by Config.TRANSCRIPTION_BACKEND
+
+        `workers`, the number of threads calling transcribe() at once
+        (default TRANSCRIPTION_WORKERS), sizes the connection pool of a
+        default backend and the hedging pool.
+        """
+        self.backend = backend or create_backend(connections=workers)
+        self.transport = self.backend.transport
+        self.admission = self.transport.admission if self.transport else None
+        self.policy = RetryPolicy(is_retryable, workers=workers, throttled=is_throttled)
+        
+    @property
+    def model(self) -> str:
+        return self.backend.model
+        
+    def prewarm(self):
+        """Open connections now so the upload does not pay for the handshake"""
+        self.backend.prewarm()
         
-    def transcribe(self, audio_file_path: Path) -> str:
-        """Transcribe audio file using Whisper API"""
+    def start_keepalive(self):
+        self.backend.start_keepalive()
+        
+    def close(self):
+        self.backend.close()
+        
+    def transcribe(self, audio, prompt: str = None, on_text=None, raise_errors: bool = False) -> str:
+        """Transcribe audio using Whisper API
+        
+        `audio` is a path to an audio file or an in-memory encoded file
+        (a binary file object with a `name`, as from AudioRecorder.encode_segment).
+        `prompt` is preceding text that the transcription should continue.
+        With STREAMING and a backend that streams, `on_text` is called with
+        the text so far as it arrives; a retry starts it over.
+        Failures are logged and give "", like an empty transcript, unless
+        `raise_errors` is set, when they raise instead.
+        """
         try:
-            with open(audio_file_path, 'rb') as audio_file:
-                transcript = self.client.audio.transcriptions.create(
-                    model=Config.WHISPER_MODEL,
-                    file=audio_file,
-                    response_format=Config.WHISPER_RESPONSE_FORMAT,
-                    language=Config.CURRENT_LANGUAGE,
-                    prompt="Hello, please transcribe carefully."
-                )
+            if isinstance(audio, (str, Path)):
+                upload = (Path(audio).name, Path(audio).read_bytes())
+            else:
+                audio.seek(0)
+                upload = (Path(getattr(audio, 'name', 'audio.wav')).name, audio.read())
+        except OSError as e:
+            logger.error(f"Failed to read audio for transcription: {e}")
+            if raise_errors:
+                raise
+            return ""
+        if not (Config.STREAMING and self.backend.streaming):
+            on_text = None
+        return self._transcribe(upload, prompt, on_text, raise_errors)
+            
+    def _request(self, upload, prompt: str = None, on_text=None):
+        """One API call; may run on a hedging thread, so the upload is passed as bytes"""
+        if on_text:
+            request = lambda: self.backend.stream(upload, prompt, on_text)
+        else:
+            request = lambda: self.backend.request(upload, prompt)
+        transcript = self.admission.run(request) if self.admission else request()
+        handshake = self.transport.last_handshake() if self.transport else 0.0
+        if handshake:
+            logger.info(f"Request opened a new connection ({handshake * 1000:.0f} ms handshake)")
+        return transcript
+        
+    def _transcribe(self, upload, prompt: str = None, on_text=None, raise_errors: bool = False) -> str:
+        if self.transport:
+            self.transport.mark_used()
+        try:
+            # A hedge would stream into the same text, so streamed requests are not hedged
+            transcript = self.policy.run(lambda: self._request(upload, prompt, on_text), hedge=on_text is None)
+            
+            # Extract text from response based on format
+            if transcript and hasattr(transcript, 'text'):
+                text = transcript.text
+            elif isinstance(transcript, dict) and 'text' in transcript:
+                text = transcript['text']
+            elif isinstance(transcript, str):
+                text = transcript
+            else:
+                raise ValueError(f"Unexpected response format from Whisper API: {type(transcript).__name__}")
+                
+            if text.strip():
+                logger.info(f"Transcription received: {text[:50]}...")
+                return text
+            else:
+                logger.warning("Empty transcription received from Whisper API")
+                return ""
                 
-                # Extract text from response based on format
-                if transcript and hasattr(transcript, 'text'):
-                    text = transcript.text
-                elif isinstance(transcript, dict) and 'text' in transcript:
-                    text = transcript['text']
-                elif isinstance(transcript, str):
-                    text = transcript
-                else:
-                    logger.warning("Unexpected response format from Whisper API")
-                    return ""
-                    
-                if text.strip():
-                    logger.info(f"Transcription received: {text[:50]}...")
-                    return text
-                else:
-                    logger.warning("Empty transcription received from Whisper API")
-                    return ""
-                    
         except Exception as e:
             logger.error(f"Whisper API error: {e}")
             logger.error(f"Response type: {type(transcript) if 'transcript' in locals() else 'N/A'}")
             logger.error(f"Response content: {transcript if 'transcript' in locals() else 'N/A'}")
+            if raise_errors:
+                raise
             return "" 
\ No newline at end of file
@@ -0,0 +1,135 @@
+import time
+import logging
+import threading
+try:
+    import httpx2 as httpx  # The HTTP client openai is built on from 3.x
+except ImportError:
+    import httpx  # Older openai releases
+from .admission import shared_controller
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1/"
+
+class PooledTransport:
+    """Persistent HTTP connection pool for the transcription API.
+
+    Owns the httpx client that the OpenAI client sends its requests
+    through. Idle connections are kept for HTTP_KEEPALIVE_EXPIRY instead
+    of httpx's 5 s default, prewarm() opens them while the user is still
+    speaking, and a keep-alive thread touches them every
+    HTTP_KEEPALIVE_INTERVAL so the server does not close them between
+    dictations. Connection set-up is timed through httpx's trace hook.
+    Every response's status and rate-limit headers are passed on to the
+    API's shared AdmissionController, `admission`.
+    """
+
+    def __init__(self, base_url: str = None, verify=True, connections: int = None):
+        self.base_url = base_url or DEFAULT_BASE_URL
+        self.connections = connections or Config.TRANSCRIPTION_WORKERS
+        self.timeout = httpx.Timeout(Config.HTTP_TIMEOUT, connect=Config.HTTP_CONNECT_TIMEOUT)
+        self.client = httpx.Client(
+            http2=Config.HTTP2 and self._http2_available(),
+            verify=verify,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=max(self.connections * 2, 10),
+                max_keepalive_connections=self.connections,
+                keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY
+            ),
+            event_hooks={'request': [self._on_request], 'response': [self._on_response]}
+        )
+        self.admission = shared_controller(self.base_url) if Config.ADMISSION else None
+        self.last_used = 0.0
+        self.requests = 0
+        self.handshakes = 0
+        self.handshake_time = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._keepalive = None
+        self._keepalive_stop = threading.Event()
+
+    @staticmethod
+    def _http2_available() -> bool:
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            logger.warning("HTTP2 is enabled but the h2 package is missing (pip install h2), using HTTP/1.1")
+            return False
+
+    def _on_request(self, request: httpx.Request):
+        """Attach the trace hook and reset the per-thread handshake timer"""
+        self._local.handshake = 0.0
+        self._local.started = None
+        request.extensions['trace'] = self._trace
+        with self._lock:
+            self.requests += 1
+
+    def _on_response(self, response: httpx.Response):
+        if self.admission:
+            self.admission.observe(response.status_code, response.headers)
+
+    def _trace(self, event: str, info: dict):
+        # TCP connect and TLS set-up only happen for new connections
+        if event in ('connection.connect_tcp.started', 'connection.start_tls.started'):
+            self._local.started = time.perf_counter()
+        elif event in ('connection.connect_tcp.complete', 'connection.start_tls.complete'):
+            if self._local.started is not None:
+                elapsed = time.perf_counter() - self._local.started
+                self._local.handshake += elapsed
+                self._local.started = None
+                with self._lock:
+                    self.handshake_time += elapsed
+                    if event == 'connection.connect_tcp.complete':
+                        self.handshakes += 1
+
+    def last_handshake(self) -> float:
+        """Seconds the calling thread's last request spent opening a connection"""
+        return getattr(self._local, 'handshake', 0.0)
+
+    def mark_used(self):
+        self.last_used = time.monotonic()
+
+    def prewarm(self):
+        """Open pooled connections in the background, e.g. when the hotkey is pressed"""
+        self.mark_used()
+        self._touch_all()
+
+    def _touch_all(self):
+        # Concurrent requests each need their own HTTP/1.1 connection
+        for _ in range(self.connections):
+            threading.Thread(target=self._touch, daemon=True).start()
+
+    def _touch(self):
+        """A cheap request that leaves a live connection in the pool"""
+        try:
+            self.client.head(self.base_url)
+        except httpx.HTTPError as e:
+            logger.debug(f"Connection warm-up failed: {e}")
+
+    def start_keepalive(self):
+        """Keep connections open while the app is armed and recently used"""
+        if Config.HTTP_KEEPALIVE_INTERVAL <= 0 or (self._keepalive and self._keepalive.is_alive()):
+            return
+        self._keepalive_stop.clear()
+        self._keepalive = threading.Thread(target=self._run_keepalive, daemon=True)
+        self._keepalive.start()
+
+    def _run_keepalive(self):
+        while not self._keepalive_stop.wait(Config.HTTP_KEEPALIVE_INTERVAL):
+            if time.monotonic() - self.last_used < Config.HTTP_KEEPALIVE_DURATION:
+                self._touch_all()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'handshakes': self.handshakes,
+                'handshake_ms': self.handshake_time * 1000,
+            }
+
+    def close(self):
+        self._keepalive_stop.set()
+        self.client.close()
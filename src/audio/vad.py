@@ -0,0 +1,131 @@
+import logging
+import numpy as np
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+class VoiceActivityDetector:
+    """Frame-based voice activity detector.
+
+    Features (log energy, zero-crossing rate and spectral flatness) are
+    computed for all complete frames of a chunk at once; only the small
+    hysteresis state machine runs per frame. Energy is compared with an
+    adaptive noise floor, so the detector follows the room instead of a
+    fixed threshold. Audio is never discarded: speech is reported as sample
+    regions that later stages can use to trim, split or gate.
+    """
+
+    def __init__(self, rate: int = Config.RATE):
+        self.rate = rate
+        self.frame_size = max(int(rate * Config.VAD_FRAME_MS / 1000), 16)
+        self.enter_db = Config.VAD_ENTER_DB
+        self.exit_db = Config.VAD_EXIT_DB
+        self.hangover_frames = max(int(Config.VAD_HANGOVER_MS / Config.VAD_FRAME_MS), 1)
+        self.onset_frames = max(int(Config.VAD_ONSET_MS / Config.VAD_FRAME_MS), 1)
+        self.prepad = int(rate * Config.VAD_PREPAD_MS / 1000)
+        self.min_peak = Config.SILENCE_THRESHOLD
+        self._window = np.hanning(self.frame_size).astype(np.float32)
+        self.reset()
+
+    def reset(self):
+        """Forget all state, e.g. at the start of a new recording"""
+        self._pending = np.empty(0, dtype=np.float32)
+        self._position = 0  # Absolute sample index of the next frame
+        self.noise_floor = None  # dB
+        self.in_speech = False
+        self._hang = 0
+        self._onset = 0
+        self._regions = []
+        self._region_start = None
+
+    @property
+    def regions(self):
+        """Speech regions as (start, end) sample indices, including an open one"""
+        if self._region_start is None:
+            return list(self._regions)
+        return self._regions + [(self._region_start, self._position)]
+
+    @property
+    def closed_regions(self):
+        """Speech regions that have ended"""
+        return list(self._regions)
+
+    @property
+    def has_speech(self) -> bool:
+        return bool(self._regions) or self._region_start is not None
+
+    def speech_samples(self) -> int:
+        """Total number of samples tagged as speech"""
+        return sum(end - start for start, end in self.regions)
+
+    def _features(self, frames: np.ndarray):
+        """Vectorized per-frame energy (dB), zero-crossing rate, flatness and peak"""
+        power = np.einsum('ij,ij->i', frames, frames) / self.frame_size
+        energy_db = 10 * np.log10(power + 1e-12)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / self.frame_size
+        spectrum = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2 + 1e-12
+        flatness = np.exp(np.log(spectrum).mean(axis=1)) / spectrum.mean(axis=1)
+        peak = np.maximum(frames.max(axis=1), -frames.min(axis=1))
+        return energy_db, zcr, flatness, peak
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Feed mono samples; returns the speech flag of each completed frame"""
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        count = len(samples) // self.frame_size
+        self._pending = samples[count * self.frame_size:].copy()
+        flags = np.zeros(count, dtype=bool)
+        if not count:
+            return flags
+
+        frames = samples[:count * self.frame_size].reshape(count, self.frame_size)
+        energy_db, zcr, flatness, peak = self._features(frames)
+        speech_cue = ((flatness < Config.VAD_FLATNESS_MAX) | (zcr > Config.VAD_ZCR_MIN)) & (peak > self.min_peak)
+
+        if self.noise_floor is None:
+            self.noise_floor = float(energy_db[0])
+
+        for i in range(count):
+            energy = energy_db[i]
+            frame_end = self._position + self.frame_size
+            if self.in_speech:
+                if energy > self.noise_floor + self.exit_db and peak[i] > self.min_peak:
+                    self._hang = self.hangover_frames
+                else:
+                    self._hang -= 1
+                    if self._hang <= 0:
+                        self.in_speech = False
+                        self._regions.append((self._region_start, frame_end))
+                        self._region_start = None
+                # Let the floor creep up so a lasting rise in noise cannot latch speech
+                self.noise_floor += 0.001 * (energy - self.noise_floor)
+            else:
+                if energy > self.noise_floor + self.enter_db and speech_cue[i]:
+                    self._onset += 1
+                    if self._onset >= self.onset_frames:
+                        self.in_speech = True
+                        self._hang = self.hangover_frames
+                        onset_start = frame_end - self._onset * self.frame_size - self.prepad
+                        # Never overlap the previous region
+                        previous_end = self._regions[-1][1] if self._regions else 0
+                        if self._regions and onset_start <= previous_end:
+                            self._region_start = self._regions.pop()[0]
+                        else:
+                            self._region_start = max(onset_start, previous_end)
+                        self._onset = 0
+                else:
+                    self._onset = 0
+                    # Fast attack downwards, slow release upwards
+                    rate = 0.3 if energy < self.noise_floor else 0.02
+                    self.noise_floor += rate * (energy - self.noise_floor)
+            flags[i] = self.in_speech
+            self._position = frame_end
+        return flags
+
+    def finish(self):
+        """Close any open region at the current position"""
+        if self._region_start is not None:
+            self._regions.append((self._region_start, self._position + len(self._pending)))
+            self._region_start = None
+            self.in_speech = False
@@ -0,0 +1,290 @@
+"""Headless batch transcription of recorded files and folders.
+
+Run from the repository root:
+
+    python -m src.batch PATH [PATH ...] [--format jsonl|txt] [--output FILE_OR_DIR]
+                        [--concurrency N] [--segment-length S]
+
+Directories are searched recursively for audio files. Each file is cut
+into segments at pauses (as during dictation, but up to
+BATCH_SEGMENT_LENGTH long) and the segments are transcribed by a pool of
+--concurrency workers. Results go to a JSONL file, one line per input
+file with per-segment timestamps, or to a .txt per file. Runs are
+resumable: files already in the output are skipped.
+"""
+import sys
+import json
+import time
+import wave
+import queue
+import logging
+import argparse
+import threading
+from pathlib import Path
+from .audio.recorder import AudioRecorder
+from .audio.sources import WavFileSource, DecodedFileSource
+from .audio.backends import TranscriptionBackend
+from .audio.transcriber import Transcriber
+from .pipeline import Dictation
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Files picked up when walking directories; WAV is read directly, the rest through ffmpeg
+AUDIO_EXTENSIONS = {'.wav', '.mp3', '.m4a', '.aac', '.ogg', '.oga', '.opus', '.flac', '.webm', '.mp4', '.amr'}
+
+def find_audio(paths):
+    """(file, path relative to its argument) for the audio among `paths`, directories walked recursively"""
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            for file in sorted(p for p in path.rglob('*') if p.is_file() and p.suffix.lower() in AUDIO_EXTENSIONS):
+                yield file, file.relative_to(path)
+        elif path.is_file():
+            yield path, Path(path.name)
+        else:
+            logger.warning(f"Skipping {path}: not found")
+
+def open_source(path: Path):
+    """AudioSource replaying `path` as fast as it can be read"""
+    if path.suffix.lower() == '.wav':
+        try:
+            return WavFileSource(path, realtime=False)
+        except (ValueError, wave.Error) as e:
+            logger.debug(f"Decoding {path.name} with ffmpeg ({e})")
+    return DecodedFileSource(path)
+
+class FileJob(Dictation):
+    """One input file: a dictation whose segments carry timestamps"""
+
+    def __init__(self, number: int, path: Path, relative: Path):
+        super().__init__(number)
+        self.path = path
+        self.relative = relative  # Where the .txt goes under an output directory
+        stat = path.stat()
+        self.identity = {'path': str(path.resolve()), 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+        self.times = {}  # Segment index -> (start, end) in seconds
+        self.duration = 0.0
+        self.error = None
+        self.failed = set()  # Indices of segments that could not be encoded or transcribed
+
+    def record(self) -> dict:
+        segments = [{'start': round(start, 2), 'end': round(end, 2), 'text': self.transcripts.get(index, "").strip()}
+                    for index, (start, end) in sorted(self.times.items())]
+        return dict(self.identity, duration=round(self.duration, 2), text=self.text, segments=segments,
+                    failed=len(self.failed), error=self.error)
+
+class BatchTranscriber:
+    """Transcribes files through a bounded pool of transcription workers.
+
+    Files are decoded and segmented one at a time on the calling thread,
+    much faster than real time. Encoded segments wait in a queue twice
+    the pool size, so decoding pauses when the workers fall behind.
+    Each file is decoded whole and its audio held twice, decoded and
+    captured, until it has been segmented, so memory grows with the
+    longest file rather than with the whole batch. A writer thread
+    records each file once all its segments are back, in input order.
+    Segments that come back empty (music, silence) are results; only
+    those whose request failed count as failed.
+    """
+
+    def __init__(self, output: Path = None, fmt: str = 'jsonl', concurrency: int = None,
+                 backend: TranscriptionBackend = None):
+        self.format = fmt
+        self.output = Path(output) if output else (Path('transcripts.jsonl') if fmt == 'jsonl' else None)
+        self.concurrency = concurrency or Config.BATCH_WORKERS
+        self.transcriber = Transcriber(backend, workers=self.concurrency)
+        self.segment_queue = queue.Queue(maxsize=self.concurrency * 2)
+        self.write_queue = queue.Queue()
+        self.done = self._completed()
+        self.audio_seconds = 0.0
+        self.files = 0
+        self.failed_segments = 0
+        self.unreadable = 0  # Files that could not be decoded
+        self._count = 0
+
+        self.workers = [threading.Thread(target=self._transcribe_segments, daemon=True)
+                        for _ in range(self.concurrency)]
+        self.writer = threading.Thread(target=self._write_results, daemon=True)
+        for thread in self.workers + [self.writer]:
+            thread.start()
+
+    def _completed(self) -> set:
+        """Identities of files the output already holds without failures, for resuming"""
+        done = set()
+        if self.format != 'jsonl' or not self.output.exists():
+            return done
+        with open(self.output) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by an interrupted run
+                if not record.get('failed') and not record.get('error'):
+                    done.add((record['path'], record['size'], record['mtime']))
+        return done
+
+    def _txt_path(self, path: Path, relative: Path) -> Path:
+        if self.output:
+            return (self.output / relative).with_suffix('.txt')
+        return path.with_suffix('.txt')
+
+    def is_done(self, path: Path, relative: Path) -> bool:
+        if self.format == 'txt':
+            target = self._txt_path(path, relative)
+            return target.exists() and target.stat().st_mtime >= path.stat().st_mtime
+        stat = path.stat()
+        return (str(path.resolve()), stat.st_size, int(stat.st_mtime)) in self.done
+
+    def run(self, paths) -> dict:
+        started = time.perf_counter()
+        skipped = 0
+        for path, relative in find_audio(paths):
+            if self.is_done(path, relative):
+                skipped += 1
+                continue
+            self._count += 1
+            job = FileJob(self._count, path, relative)
+            self.write_queue.put(job)
+            self._segment(job)
+        self.write_queue.put(None)
+        self.writer.join()
+        self.transcriber.close()
+
+        elapsed = time.perf_counter() - started
+        if self.transcriber.admission:
+            stats = self.transcriber.admission.stats()
+            logger.info(f"Admission control: window {stats['window']:.1f}, {stats['throttled']} throttled, "
+                        f"mean wait {stats['mean_wait_ms']:.0f} ms, max wait {stats['max_wait_ms']:.0f} ms")
+        summary = {
+            'files': self.files,
+            'skipped': skipped,
+            'audio_hours': self.audio_seconds / 3600,
+            'wall_hours': elapsed / 3600,
+            'speed': self.audio_seconds / elapsed if elapsed else 0.0,  # Audio hours per wall-clock hour
+            'failed_segments': self.failed_segments,
+            'unreadable': self.unreadable,
+        }
+        logger.info(f"Transcribed {self.files} files ({skipped} already done), "
+                    f"{summary['audio_hours']:.2f} audio hours in {elapsed / 60:.1f} min: "
+                    f"{summary['speed']:.1f} audio hours per hour")
+        return summary
+
+    def _segment(self, job: FileJob):
+        """Cut a file into encoded segments and queue them; runs on the calling thread"""
+        try:
+            source = open_source(job.path)
+        except Exception as e:
+            logger.error(f"Cannot read {job.path}: {e}")
+            job.error = str(e)
+            job.close()
+            return
+
+        recorder = AudioRecorder(source=source)
+
+        def queue_segment(segment):
+            job.add_segment()
+            job.times[segment.index] = (segment.start / segment.rate, segment.end / segment.rate)
+            audio = recorder.encode_segment(segment)
+            if audio is None:
+                job.failed.add(segment.index)
+                job.set_transcript(segment.index, "")
+                return
+            self.segment_queue.put((job, segment.index, audio))  # Blocks while the workers are behind
+
+        recorder.on_segment = queue_segment
+        try:
+            if not recorder.start():
+                raise RuntimeError("source did not open")
+            while recorder.record_chunk():
+                pass
+            recorder.stop()
+            recorder.finish_recording()
+            job.duration = source.duration
+        except Exception as e:
+            logger.error(f"Failed to segment {job.path}: {e}")
+            job.error = str(e)
+        finally:
+            recorder.cleanup()
+            job.close()
+
+    def _transcribe_segments(self):
+        while True:
+            job, index, audio = self.segment_queue.get()
+            text = ""
+            try:
+                text = self.transcriber.transcribe(audio, prompt=job.context(index), raise_errors=True)
+            except Exception as e:
+                logger.error(f"Failed to transcribe segment {index} of {job.path}: {e}")
+                job.failed.add(index)
+            finally:
+                job.set_transcript(index, text)
+
+    def _write_results(self):
+        """Writer: one result per file as it completes, in input order"""
+        while True:
+            job = self.write_queue.get()
+            if job is None:
+                break
+            job.done.wait()
+            record = job.record()
+            self.files += 1
+            self.audio_seconds += job.duration
+            self.failed_segments += record['failed']
+            self.unreadable += job.error is not None
+            try:
+                if self.format == 'jsonl':
+                    with open(self.output, 'a') as f:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                elif not job.error:
+                    target = self._txt_path(job.path, job.relative)
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    target.write_text(job.text + "\n")
+            except OSError as e:
+                logger.error(f"Failed to write result for {job.path}: {e}")
+            logger.info(f"[{self.files}] {job.path.name}: {job.duration / 60:.1f} min, "
+                        f"{len(job.times)} segments, {record['failed']} failed")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m src.batch', description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', type=Path, help="audio files or directories")
+    parser.add_argument('--format', choices=['jsonl', 'txt'], default='jsonl')
+    parser.add_argument('--output', type=Path,
+                        help="JSONL file (default transcripts.jsonl) or directory for .txt files "
+                             "(default next to each input)")
+    parser.add_argument('--concurrency', type=int, default=Config.BATCH_WORKERS,
+                        help="transcription requests in flight")
+    parser.add_argument('--segment-length', type=float, default=Config.BATCH_SEGMENT_LENGTH,
+                        help="target segment length in seconds")
+    parser.add_argument('--language', help=f"language code (default {Config.CURRENT_LANGUAGE or 'auto-detected'})")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.verbose:
+        for name in ('src.audio', 'httpx', 'httpx2', 'openai'):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    # Batch settings: no hotkey, no length cap, longer segments for fewer requests
+    Config.CAPTURE_MODE = 'blocking'
+    Config.WARM_STREAM = False
+    Config.MAX_DICTATION_LENGTH = float('inf')
+    Config.SEGMENT_TARGET_LENGTH = args.segment_length
+    if args.language:
+        Config.CURRENT_LANGUAGE = args.language
+    Config.BATCH_WORKERS = args.concurrency
+    try:
+        Config.validate()
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    summary = BatchTranscriber(args.output, args.format, args.concurrency).run(args.paths)
+    print(f"{summary['files']} files, {summary['audio_hours']:.2f} audio hours, "
+          f"{summary['speed']:.1f} audio hours per wall-clock hour, {summary['failed_segments']} failed segments, "
+          f"{summary['unreadable']} unreadable files")
+    return 1 if summary['failed_segments'] or summary['unreadable'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,12 @@ load_dotenv()
 class Config:
     # API Settings
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    TRANSCRIPTION_BACKEND = os.getenv('TRANSCRIPTION_BACKEND', 'openai')  # 'openai', 'compatible' (self-hosted) or 'fake'
+    TRANSCRIPTION_BASE_URL = os.getenv('TRANSCRIPTION_BASE_URL')  # e.g. http://whisper.lan:8000/v1/ for 'compatible'
+    TRANSCRIPTION_API_KEY = os.getenv('TRANSCRIPTION_API_KEY')  # Only needed if the server checks one
+    TRANSCRIPTION_MODEL = os.getenv('TRANSCRIPTION_MODEL')  # The server's model name; WHISPER_MODEL if unset
+    TRANSCRIPTION_VERIFY_TLS = True  # Set False for a LAN server with a self-signed certificate
+    FAKE_BACKEND_LATENCY = 0.05  # Seconds the in-process 'fake' backend takes per request
     
     # Language Settings
     SUPPORTED_LANGUAGES = {
@@ -19,13 +25,55 @@ class Config:
     CURRENT_LANGUAGE = 'en'  # Default to English
     
     # Audio Settings
-    CHANNELS = 1  # Mono audio
-    RATE = 16000  # Sample rate that works well with Whisper
-    CHUNK = 1024  # Reduced chunk size for better stability
-    FORMAT = 'FLOAT32'  # Audio format
+    CHANNELS = 1  # Channels captured from the device, downmixed to mono
+    RATE = 16000  # Sample rate that works well with Whisper; devices are resampled to it
+    CHUNK = 1024  # Reduced chunk size for better stability (in samples at RATE)
+    MAX_CHUNK = 8192  # Largest chunk CHUNK is doubled up to after lossy sessions
+    XRUN_OVERFLOW_THRESHOLD = 2  # Overflows in one session that trigger a larger chunk
+    XRUN_MISSING_THRESHOLD = 0.01  # Fraction of samples lost in one session that triggers a larger chunk
+    FORMAT = 'INT16'  # Preferred capture format; INT16, FLOAT32 and INT32 are tried in turn
+    RESAMPLER_TAPS = 64  # Polyphase filter taps per phase
+    CAPTURE_MODE = 'callback'  # 'callback' (PortAudio pushes chunks) or 'blocking' (polling thread)
+    WARM_STREAM = False  # Keep the input stream open while armed (requires callback mode)
+    PREROLL_MS = 300  # Audio kept from before the hotkey press in warm mode
+    WARM_IDLE_TIMEOUT = 300.0  # Seconds without a recording before the warm stream is suspended (0 = never)
+    WARM_IDLE_CPU_BUDGET = 0.01  # Max fraction of one core the idle warm stream may use
+    PREPROCESS = False  # Clean up audio chunk by chunk during capture (high-pass, pre-emphasis, noise gate)
+    HIGHPASS_HZ = 80.0  # Remove DC and hum below this frequency (0 = DC only)
+    PRE_EMPHASIS = 0.0  # First-order pre-emphasis coefficient, e.g. 0.97 (0 = off)
+    NOISE_REDUCTION_DB = 12.0  # Maximum attenuation of bins gated as noise (0 = no gating)
+    NOISE_GATE_DB = 3.0  # Noise over-subtraction; higher removes more noise and more speech
+    TRIM_SILENCE = True  # Drop leading/trailing silence and shorten long pauses before upload
+    MAX_PAUSE_MS = 300  # Longer pauses between speech regions are shortened to this
+    UPLOAD_CODEC = 'flac'  # 'wav', 'flac' or 'opus'; compressed codecs are encoded by ffmpeg during capture
+    UPLOAD_BITRATE = '24k'  # Opus bitrate
     MIN_AUDIO_LENGTH = 0.5  # Minimum audio length in seconds
-    MAX_AUDIO_LENGTH = 30.0  # Maximum audio length in seconds
-    SILENCE_THRESHOLD = 0.01  # Slightly lower threshold for better sensitivity
+    MAX_AUDIO_LENGTH = 30.0  # Maximum length of one uploaded segment in seconds
+    MAX_DICTATION_LENGTH = 900.0  # Maximum length of a whole dictation in seconds
+    SEGMENT_TARGET_LENGTH = 5.0  # Dictation is cut into phrases at the first pause after this many seconds
+    SEGMENT_MIN_PAUSE_MS = 400  # Silence needed to split a segment
+    MAX_UPLOAD_BYTES = 25 * 1024 * 1024  # Whisper API file size limit
+    SILENCE_THRESHOLD = 0.01  # Frames whose peak stays below this are never tagged as speech
+    
+    # Gain Settings (computed during capture, applied while encoding and on save)
+    GAIN_TARGET_DBFS = -20.0  # Target speech RMS
+    GAIN_PEAK_CEILING = 0.98  # Level the robust peak may reach after gain
+    GAIN_PEAK_PERCENTILE = 99.0  # Chunk-peak percentile used as the robust peak
+    GAIN_MAX = 30.0  # Largest gain applied (about +30 dB)
+    
+    # Voice Activity Detection Settings
+    VAD_FRAME_MS = 30  # Analysis frame length
+    VAD_ENTER_DB = 9.0  # Energy above the noise floor needed to enter speech
+    VAD_EXIT_DB = 5.0  # Energy above the noise floor needed to stay in speech
+    VAD_ONSET_MS = 60  # Consecutive speech-like audio required to enter speech
+    VAD_HANGOVER_MS = 300  # Speech is held this long after the energy drops
+    VAD_PREPAD_MS = 150  # Audio before a detected onset included in the speech region
+    VAD_FLATNESS_MAX = 0.45  # Spectral flatness below this counts as voiced
+    VAD_ZCR_MIN = 0.25  # Zero-crossing rate above this counts as fricative
+    
+    # Input Device Settings
+    DEVICE_CACHE_FILE = Path(os.getenv('XDG_CACHE_HOME', Path.home() / '.cache')) / 'voice-to-text' / 'devices.json'
+    HOTPLUG_POLL_INTERVAL = 2.0  # Seconds between device list checks (0 = disabled)
     
     # Volume Control Settings
     RECORDING_VOLUME = 30  # Volume percentage during recording
@@ -38,14 +86,74 @@ class Config:
     ICON_COLOR_RECORDING = 'red'
     ICON_COLOR_PROCESSING = 'purple'  # New color for processing state
     
+    # Text Output Settings
+    OUTPUT_METHOD = 'auto'  # 'clipboard' (paste), 'xdotool' (bulk type), 'keys' (pyautogui) or 'auto'
+    OUTPUT_DELAY = 0.0  # Seconds to wait before writing text
+    OUTPUT_PASTE_KEYS = 'ctrl+v'  # Paste shortcut sent by the clipboard method (terminals may need ctrl+shift+v)
+    OUTPUT_CLIPBOARD_RESTORE_DELAY = 0.2  # Seconds the pasted text stays on the clipboard before it is restored
+    OUTPUT_TYPE_DELAY_MS = 2  # Delay between characters typed by xdotool
+    
+    # Output Sink Settings
+    OUTPUT_SINKS = os.getenv('OUTPUT_SINKS', 'keyboard')  # Comma-separated: keyboard, stdout, file, fifo, socket
+    OUTPUT_FORMAT = 'jsonl'  # 'jsonl' (one event per line) or 'text' (one transcript per line) for the other sinks
+    OUTPUT_PARTIALS = False  # Also send streamed partial text to sinks other than the keyboard
+    OUTPUT_SINK_QUEUE = 100  # Events waiting per sink (and socket subscriber) before new partials are dropped
+    
     # Paths
     TEMP_DIR = Path(os.getenv('TEMP', tempfile.gettempdir()))
+    SAVE_AUDIO_FILES = False  # Also write every uploaded segment to TEMP_DIR (debugging/spooling)
+    TRANSCRIPT_CACHE_FILE = Path(os.getenv('XDG_CACHE_HOME', Path.home() / '.cache')) / 'voice-to-text' / 'transcripts.json'
+    OUTPUT_FILE = Path(os.getenv('XDG_DATA_HOME', Path.home() / '.local' / 'share')) / 'voice-to-text' / 'transcripts.jsonl'
+    OUTPUT_SOCKET = Path(os.getenv('XDG_RUNTIME_DIR', tempfile.gettempdir())) / 'voice-to-text.sock'
+    OUTPUT_FIFO = Path(os.getenv('XDG_RUNTIME_DIR', tempfile.gettempdir())) / 'voice-to-text.fifo'
     LOG_FILE = 'voice_to_text.log'
     
     # Whisper API Settings
     WHISPER_MODEL = "whisper-1"
     WHISPER_LANGUAGE = None  # Auto-detect language
     WHISPER_RESPONSE_FORMAT = "verbose_json"  # Use verbose JSON format for better response handling
+    TRANSCRIPTION_WORKERS = 2  # Phrases transcribed concurrently while recording
+    STREAMING = False  # Type words as the transcript streams in (needs a model that streams, e.g. gpt-4o-transcribe)
+    PROMPT_CONTEXT_CHARS = 200  # Text of the preceding phrases sent as the prompt for the next
+    PIPELINE_QUEUE_SIZE = 4  # Encoded segments waiting for a transcription worker
+    MAX_PENDING_DICTATIONS = 3  # Dictations in flight before further presses are ignored
+    
+    # HTTP Settings
+    HTTP2 = False  # Use HTTP/2 for API requests (needs `pip install h2`)
+    HTTP_TIMEOUT = 60.0  # Seconds before an API request is abandoned
+    HTTP_CONNECT_TIMEOUT = 5.0  # Seconds allowed for connection set-up
+    HTTP_KEEPALIVE_EXPIRY = 120.0  # Seconds an idle pooled connection is kept (httpx default is 5)
+    HTTP_KEEPALIVE_INTERVAL = 25.0  # Seconds between keep-alive requests on idle connections (0 = off)
+    HTTP_KEEPALIVE_DURATION = 600.0  # Keep connections warm this long after the last dictation
+    
+    # Retry Settings
+    RETRY_MAX_ATTEMPTS = 3  # Attempts per transcription, including the first
+    RETRY_BASE_DELAY = 0.25  # Seconds; backoff before retry n is random up to BASE * 2**n
+    RETRY_MAX_DELAY = 4.0  # Cap on a single backoff delay
+    RETRY_DEADLINE = 45.0  # Seconds after which a transcription is given up, retries included
+    HEDGE = False  # Send a duplicate request when a response is slower than usual
+    HEDGE_PERCENTILE = 95  # Hedge once a request has taken longer than this latency percentile
+    HEDGE_BUDGET = 0.1  # At most this fraction of requests are hedged
+    HEDGE_WINDOW = 50  # Recent request latencies the percentile is taken over
+    HEDGE_MIN_SAMPLES = 10  # Latencies needed before hedging starts
+    
+    # Admission Control Settings (shared by all transcriptions to one API)
+    ADMISSION = True  # Pace requests to stay within the API's rate limits
+    ADMISSION_INITIAL_WINDOW = 4  # Requests in flight to start with
+    ADMISSION_MAX_WINDOW = 16  # Upper bound the window grows to while requests succeed
+    ADMISSION_DECREASE = 0.5  # Window multiplier when the API throttles
+    ADMISSION_RATE = 0.0  # Requests per second (0 = take it from the rate-limit headers)
+    ADMISSION_BURST = 4  # Requests that may start back to back when paced
+    
+    # Transcript Cache Settings
+    TRANSCRIPT_CACHE_ENTRIES = 256  # Segment transcripts kept, keyed by their audio (0 = no cache)
+    TRANSCRIPT_CACHE_PERSIST = False  # Keep the cache in TRANSCRIPT_CACHE_FILE across restarts
+    TRANSCRIPT_CACHE_MAX_BYTES = 1_000_000  # Size cap of TRANSCRIPT_CACHE_FILE
+    TRANSCRIPT_CACHE_SAVE_DELAY = 2.0  # Seconds changes are gathered before TRANSCRIPT_CACHE_FILE is rewritten
+    
+    # Batch Transcription Settings (python -m src.batch)
+    BATCH_WORKERS = 4  # Segments transcribed concurrently
+    BATCH_SEGMENT_LENGTH = 25.0  # Files are cut at the first pause after this many seconds
     
     @classmethod
     def validate(cls):
@@ -53,8 +161,15 @@ class Config:
         errors = []
         
         # Check for required API key
-        if not cls.OPENAI_API_KEY or cls.OPENAI_API_KEY == 'your_openai_api_key_here':
+        if cls.TRANSCRIPTION_BACKEND not in ['openai', 'compatible', 'fake']:
+            errors.append("TRANSCRIPTION_BACKEND must be 'openai', 'compatible' or 'fake'")
+            
+        if cls.TRANSCRIPTION_BACKEND == 'openai' and (
+                not cls.OPENAI_API_KEY or cls.OPENAI_API_KEY == 'your_openai_api_key_here'):
             errors.append("OPENAI_API_KEY not found in .env file or is set to default value")
+            
+        if cls.TRANSCRIPTION_BACKEND == 'compatible' and not cls.TRANSCRIPTION_BASE_URL:
+            errors.append("TRANSCRIPTION_BASE_URL must be set for the 'compatible' backend")
         
         # Validate audio settings
         if cls.CHANNELS not in [1, 2]:
@@ -63,12 +178,94 @@ class Config:
         if not isinstance(cls.RATE, int) or cls.RATE <= 0:
             errors.append("RATE must be a positive integer")
             
+        if cls.FORMAT not in ['INT16', 'FLOAT32', 'INT32']:
+            errors.append("FORMAT must be INT16, FLOAT32 or INT32")
+            
         if not isinstance(cls.CHUNK, int) or cls.CHUNK <= 0:
             errors.append("CHUNK must be a positive integer")
             
+        if not isinstance(cls.MAX_CHUNK, int) or cls.MAX_CHUNK < cls.CHUNK:
+            errors.append("MAX_CHUNK must be an integer no smaller than CHUNK")
+            
+        if cls.XRUN_OVERFLOW_THRESHOLD < 1 or not 0 < cls.XRUN_MISSING_THRESHOLD <= 1:
+            errors.append("Invalid overflow threshold settings")
+            
+        if cls.CAPTURE_MODE not in ['blocking', 'callback']:
+            errors.append("CAPTURE_MODE must be 'blocking' or 'callback'")
+            
+        if cls.VAD_FRAME_MS <= 0 or cls.VAD_EXIT_DB > cls.VAD_ENTER_DB:
+            errors.append("Invalid voice activity detection settings")
+            
+        if cls.WARM_STREAM and cls.CAPTURE_MODE != 'callback':
+            errors.append("WARM_STREAM requires CAPTURE_MODE = 'callback'")
+            
+        if cls.PREROLL_MS < 0 or cls.WARM_IDLE_TIMEOUT < 0 or cls.WARM_IDLE_CPU_BUDGET <= 0:
+            errors.append("Invalid warm stream settings")
+            
+        if cls.HIGHPASS_HZ < 0 or not 0 <= cls.PRE_EMPHASIS < 1 or cls.NOISE_REDUCTION_DB < 0:
+            errors.append("Invalid preprocessing settings")
+            
+        if cls.MAX_PAUSE_MS < 0:
+            errors.append("MAX_PAUSE_MS must not be negative")
+            
+        if cls.UPLOAD_CODEC not in ['wav', 'flac', 'opus']:
+            errors.append("UPLOAD_CODEC must be 'wav', 'flac' or 'opus'")
+            
         if cls.MIN_AUDIO_LENGTH <= 0 or cls.MAX_AUDIO_LENGTH <= cls.MIN_AUDIO_LENGTH:
             errors.append("Invalid audio length settings")
             
+        if not cls.MIN_AUDIO_LENGTH <= cls.SEGMENT_TARGET_LENGTH < cls.MAX_AUDIO_LENGTH <= cls.MAX_DICTATION_LENGTH:
+            errors.append("Segment lengths must satisfy MIN_AUDIO_LENGTH <= SEGMENT_TARGET_LENGTH "
+                          "< MAX_AUDIO_LENGTH <= MAX_DICTATION_LENGTH")
+            
+        if not isinstance(cls.TRANSCRIPTION_WORKERS, int) or cls.TRANSCRIPTION_WORKERS < 1:
+            errors.append("TRANSCRIPTION_WORKERS must be a positive integer")
+            
+        if cls.STREAMING and cls.TRANSCRIPTION_BACKEND == 'openai' and cls.WHISPER_MODEL == 'whisper-1':
+            errors.append("STREAMING needs a model that streams (e.g. gpt-4o-transcribe); whisper-1 does not")
+            
+        if cls.PIPELINE_QUEUE_SIZE < 1 or cls.MAX_PENDING_DICTATIONS < 1:
+            errors.append("PIPELINE_QUEUE_SIZE and MAX_PENDING_DICTATIONS must be at least 1")
+            
+        if cls.HTTP_TIMEOUT <= 0 or cls.HTTP_CONNECT_TIMEOUT <= 0 or cls.HTTP_KEEPALIVE_EXPIRY < 0:
+            errors.append("Invalid HTTP timeout settings")
+            
+        if 0 < cls.HTTP_KEEPALIVE_EXPIRY <= cls.HTTP_KEEPALIVE_INTERVAL:
+            errors.append("HTTP_KEEPALIVE_INTERVAL must be shorter than HTTP_KEEPALIVE_EXPIRY")
+            
+        if cls.RETRY_MAX_ATTEMPTS < 1 or cls.RETRY_BASE_DELAY < 0 or cls.RETRY_DEADLINE <= 0:
+            errors.append("Invalid retry settings")
+            
+        if not 0 < cls.HEDGE_PERCENTILE < 100 or not 0 <= cls.HEDGE_BUDGET <= 1 or not 1 <= cls.HEDGE_MIN_SAMPLES <= cls.HEDGE_WINDOW:
+            errors.append("Invalid hedging settings")
+            
+        if (not 1 <= cls.ADMISSION_INITIAL_WINDOW <= cls.ADMISSION_MAX_WINDOW or not 0 < cls.ADMISSION_DECREASE < 1
+                or cls.ADMISSION_RATE < 0 or cls.ADMISSION_BURST < 1):
+            errors.append("Invalid admission control settings")
+            
+        if (cls.TRANSCRIPT_CACHE_ENTRIES < 0 or cls.TRANSCRIPT_CACHE_MAX_BYTES <= 0
+                or cls.TRANSCRIPT_CACHE_SAVE_DELAY < 0):
+            errors.append("Invalid transcript cache settings")
+            
+        if not isinstance(cls.BATCH_WORKERS, int) or cls.BATCH_WORKERS < 1:
+            errors.append("BATCH_WORKERS must be a positive integer")
+            
+        if not cls.MIN_AUDIO_LENGTH <= cls.BATCH_SEGMENT_LENGTH < cls.MAX_AUDIO_LENGTH:
+            errors.append("BATCH_SEGMENT_LENGTH must be between MIN_AUDIO_LENGTH and MAX_AUDIO_LENGTH")
+            
+        if cls.OUTPUT_METHOD not in ['auto', 'clipboard', 'xdotool', 'keys']:
+            errors.append("OUTPUT_METHOD must be 'auto', 'clipboard', 'xdotool' or 'keys'")
+            
+        if cls.OUTPUT_DELAY < 0 or cls.OUTPUT_CLIPBOARD_RESTORE_DELAY < 0 or cls.OUTPUT_TYPE_DELAY_MS < 0:
+            errors.append("Invalid text output settings")
+            
+        unknown = {name.strip() for name in cls.OUTPUT_SINKS.split(',')} - {'keyboard', 'stdout', 'file', 'fifo', 'socket'}
+        if unknown:
+            errors.append(f"Unknown OUTPUT_SINKS: {', '.join(sorted(unknown))}")
+            
+        if cls.OUTPUT_FORMAT not in ['jsonl', 'text'] or cls.OUTPUT_SINK_QUEUE < 1:
+            errors.append("Invalid output sink settings")
+            
         # Validate volume settings
         if not isinstance(cls.RECORDING_VOLUME, int) or not 0 <= cls.RECORDING_VOLUME <= 100:
             errors.append("RECORDING_VOLUME must be an integer between 0 and 100")
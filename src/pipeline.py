@@ -0,0 +1,320 @@
+import time
+import queue
+import logging
+import functools
+import threading
+from pathlib import Path
+from datetime import datetime
+from .audio.cache import TranscriptCache
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+class Dictation:
+    """One press-to-release recording on its way through the pipeline"""
+
+    def __init__(self, number: int):
+        self.number = number
+        self.release_time = None  # perf_counter() at key release
+        self.transcripts = {}  # Segment index -> text
+        self.partials = {}  # Segment index -> text streamed so far
+        self.keys = {}  # Segment index -> TranscriptCache key
+        self.segments = 0  # Segments handed to the pipeline so far
+        self.closed = False  # Set once the final segment has been handed over
+        self.done = threading.Event()
+        self.updated = threading.Event()  # Set whenever text arrives
+        self._lock = threading.Lock()
+
+    def add_segment(self):
+        with self._lock:
+            self.segments += 1
+
+    def set_transcript(self, index: int, text: str):
+        with self._lock:
+            self.transcripts[index] = text
+            self._check_done()
+        self.updated.set()
+
+    def set_partial(self, index: int, text: str):
+        with self._lock:
+            self.partials[index] = text
+        self.updated.set()
+
+    def close(self):
+        """No more segments will arrive; done once the ones in flight are transcribed"""
+        with self._lock:
+            self.closed = True
+            self._check_done()
+        self.updated.set()
+
+    def _check_done(self):
+        if self.closed and len(self.transcripts) >= self.segments:
+            self.done.set()
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.transcripts[index].strip() for index in sorted(self.transcripts)
+                        if self.transcripts[index].strip())
+
+    def visible_text(self) -> str:
+        """Text that can be shown while streaming: finished segments in order, then the first partial one"""
+        parts = []
+        index = 0
+        with self._lock:
+            while index in self.transcripts:
+                parts.append(self.transcripts[index].strip())
+                index += 1
+            partial = self.partials.get(index, "").lstrip()
+        text = " ".join(part for part in parts if part)
+        if partial:
+            return f"{text} {partial}" if text else partial
+        # The last finished segment's last word is final too
+        return f"{text} " if text else text
+
+    def context(self, index: int) -> str:
+        """Tail of the text of the transcribed phrases immediately before `index`"""
+        parts = []
+        length = 0
+        index -= 1
+        while index in self.transcripts and length < Config.PROMPT_CONTEXT_CHARS:
+            text = self.transcripts[index].strip()
+            parts.append(text)
+            length += len(text) + 1
+            index -= 1
+        return " ".join(reversed(parts))[-Config.PROMPT_CONTEXT_CHARS:] or None
+
+    def __repr__(self):
+        return f"Dictation({self.number}, {self.segments} segments, closed={self.closed})"
+
+class TranscriptionPipeline:
+    """Encode, transcribe and output stages behind the capture stage.
+
+    Segments are tagged with their dictation as the recorder closes them
+    and pass through an encode worker, TRANSCRIPTION_WORKERS transcription
+    workers and a single output worker, so a key release only hands the
+    final segment over and returns. Dictations may overlap: the output
+    worker takes them in the order they began and waits for each to
+    complete, so text is written in the order it was spoken.
+
+    Capture must never block, so segments enter through an unbounded
+    queue (they are views of audio already in memory). Encoded uploads
+    wait in a queue of PIPELINE_QUEUE_SIZE, which holds back the encode
+    worker when the API is slow, and begin() refuses new dictations while
+    MAX_PENDING_DICTATIONS are still in flight.
+
+    Transcripts are cached by audio content, so a segment identical to
+    one already transcribed skips the upload, and reinsert_last() writes
+    the last dictation again without any request.
+
+    With STREAMING and an `incremental` writer factory, the dictation at
+    the head of the output queue is typed word by word as its segments
+    stream in, and corrected once their final text is known.
+    """
+
+    def __init__(self, recorder, transcriber, output, on_idle=None, incremental=None, reinsert=None):
+        self.recorder = recorder
+        self.transcriber = transcriber
+        self.output = output  # Called with the text of each dictation, in order
+        self.reinsert = reinsert or output  # Called with the text reinsert_last() writes again
+        self.on_idle = on_idle  # Called when the last dictation in flight has been output
+        self.incremental = incremental if Config.STREAMING else None  # Returns an IncrementalText per dictation
+        self.current = None  # Dictation being recorded
+        self.pending = 0  # Dictations begun and not yet output
+        self.last_upload_latency = None  # Seconds from key release to upload start
+        self.last_text_latency = None  # Seconds from key release to the full transcript
+        self.last_first_word_latency = None  # Seconds from key release to the first word (0 if it came earlier)
+        self.last_text = None  # Text of the last dictation written out
+        self.cache = None
+        if Config.TRANSCRIPT_CACHE_ENTRIES > 0:
+            path = Config.TRANSCRIPT_CACHE_FILE if Config.TRANSCRIPT_CACHE_PERSIST else None
+            self.cache = TranscriptCache(path=path)
+        self._count = 0
+        self._lock = threading.Lock()
+
+        self.encode_queue = queue.Queue()
+        self.transcribe_queue = queue.Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+        self.output_queue = queue.Queue(maxsize=Config.MAX_PENDING_DICTATIONS)
+        self.recorder.on_segment = self.submit
+
+        self.threads = [threading.Thread(target=self._encode_segments, daemon=True),
+                        threading.Thread(target=self._output_dictations, daemon=True)]
+        for _ in range(Config.TRANSCRIPTION_WORKERS):
+            self.threads.append(threading.Thread(target=self._transcribe_segments, daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def begin(self):
+        """Open a dictation before capture starts; returns None if too many are in flight"""
+        with self._lock:
+            if self.pending >= Config.MAX_PENDING_DICTATIONS:
+                logger.warning(f"{self.pending} dictations still in flight, ignoring hotkey")
+                return None
+            self.pending += 1
+            self._count += 1
+            self.current = Dictation(self._count)
+        self.output_queue.put(self.current)
+        return self.current
+
+    def submit(self, segment):
+        """Recorder on_segment hook: queue a closed segment of the current dictation"""
+        dictation = self.current
+        dictation.add_segment()
+        self.encode_queue.put((dictation, segment))
+
+    def finish(self, release_time: float = None):
+        """Close the last segment after the recorder stopped and close the dictation"""
+        dictation = self.current
+        if dictation is None:
+            return
+        dictation.release_time = release_time
+        try:
+            self.recorder.finish_recording()
+        except Exception as e:
+            logger.error(f"Failed to finish {dictation}: {e}")
+        finally:
+            self.current = None
+            dictation.close()
+
+    def cancel(self):
+        """Close the current dictation without its final segment, e.g. if capture failed"""
+        dictation, self.current = self.current, None
+        if dictation is not None:
+            dictation.close()
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Wait until every dictation in flight has been output"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self.pending:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self):
+        """Save the transcript cache; call once the pipeline is idle"""
+        if self.cache:
+            self.cache.close()
+
+    def _encode_segments(self):
+        """Encode worker; segments are unpacked in a helper so no view outlives its turn"""
+        while True:
+            self._encode(*self.encode_queue.get())
+
+    def _encode(self, dictation, segment):
+        if self.cache and self._cached(dictation, segment):
+            return
+        audio = None
+        try:
+            audio = self.recorder.encode_segment(segment)
+            if audio is not None and Config.SAVE_AUDIO_FILES:
+                self._save_audio_file(segment, audio)
+        except Exception as e:
+            logger.error(f"Failed to encode {segment}: {e}")
+        if audio is None:
+            dictation.set_transcript(segment.index, "")
+            return
+        # Blocks while the transcription workers are behind
+        self.transcribe_queue.put((dictation, segment.index, segment.final, audio))
+
+    def _cached(self, dictation, segment) -> bool:
+        """Look the segment up in the transcript cache; True if its text is known"""
+        key = TranscriptCache.key(segment.compacted(), Config.CURRENT_LANGUAGE,
+                                  getattr(self.transcriber, 'model', None))
+        dictation.keys[segment.index] = key
+        text = self.cache.get(key)
+        if text is None:
+            return False
+        logger.info(f"Reusing cached transcript for {segment}")
+        if segment.encoder:
+            segment.encoder.abort()
+        dictation.set_transcript(segment.index, text)
+        return True
+
+    def _save_audio_file(self, segment, audio):
+        """Keep a copy of an uploaded segment in TEMP_DIR"""
+        suffix = Path(audio.name).suffix
+        path = Config.TEMP_DIR / f"recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{segment.index}{suffix}"
+        try:
+            path.write_bytes(audio.getbuffer())
+            logger.info(f"Saved {segment} to {path}")
+        except Exception as e:
+            logger.error(f"Failed to save audio file {path}: {e}")
+
+    def _transcribe_segments(self):
+        """Transcription worker: segments of one dictation are stitched by index"""
+        while True:
+            self._transcribe(*self.transcribe_queue.get())
+
+    def _transcribe(self, dictation, index: int, final: bool, audio):
+        text = ""
+        try:
+            if final and dictation.release_time is not None:
+                self.last_upload_latency = time.perf_counter() - dictation.release_time
+                logger.info(f"Release-to-upload latency: {self.last_upload_latency * 1000:.1f} ms "
+                            f"({self.recorder.capture_mode} capture)")
+            # Transcribe audio, continuing from the phrases before it
+            on_text = functools.partial(dictation.set_partial, index) if self.incremental else None
+            text = self.transcriber.transcribe(audio, prompt=dictation.context(index), on_text=on_text)
+            if self.cache and index in dictation.keys:
+                self.cache.put(dictation.keys[index], text)
+        except Exception as e:
+            logger.error(f"Failed to transcribe segment {index} of {dictation}: {e}")
+        finally:
+            dictation.set_transcript(index, text)
+
+    def _output_dictations(self):
+        """Output worker: writes each dictation's text once complete, in the order they began"""
+        while True:
+            dictation = self.output_queue.get()
+            try:
+                if self.incremental:
+                    first_word = self._stream_dictation(dictation)
+                else:
+                    dictation.done.wait()
+                    first_word = time.perf_counter()
+                text = dictation.text
+                if dictation.release_time is not None:
+                    self.last_text_latency = time.perf_counter() - dictation.release_time
+                    if text:
+                        self.last_first_word_latency = max(first_word - dictation.release_time, 0.0)
+                        logger.info(f"Release-to-first-word latency: {self.last_first_word_latency * 1000:.0f} ms")
+                    logger.info(f"Release-to-text latency: {self.last_text_latency * 1000:.0f} ms")
+                if text:
+                    self.last_text = text
+                    if self.cache:
+                        self.cache.set_last(dictation.keys[index] for index in sorted(dictation.keys)
+                                            if dictation.transcripts.get(index, "").strip())
+                    if not self.incremental:
+                        self.output(text)
+            except Exception as e:
+                logger.error(f"Failed to output {dictation}: {e}")
+            with self._lock:
+                self.pending -= 1
+                idle = self.pending == 0
+            if idle and self.on_idle:
+                self.on_idle()
+
+    def _stream_dictation(self, dictation) -> float:
+        """Type a dictation as it streams in; returns when its first word was typed"""
+        writer = self.incremental()
+        first_word = None
+        while True:
+            dictation.updated.clear()
+            done = dictation.done.is_set()
+            if writer.update(dictation.text if done else dictation.visible_text(), final=done) and first_word is None:
+                first_word = time.perf_counter()
+            if done:
+                break
+            dictation.updated.wait()
+        if writer.corrections:
+            logger.info(f"Corrected {writer.corrections} streamed characters of {dictation}")
+        return first_word if first_word is not None else time.perf_counter()
+
+    def reinsert_last(self) -> bool:
+        """Write the last dictation's text again, e.g. after it went to the wrong window"""
+        text = (self.cache.last_text() if self.cache else None) or self.last_text
+        if not text:
+            logger.warning("No transcript to re-insert")
+            return False
+        logger.info("Re-inserting last transcript")
+        return self.reinsert(text)
@@ -0,0 +1,401 @@
+import os
+import sys
+import json
+import stat
+import errno
+import socket
+import logging
+import threading
+import collections
+from abc import ABC, abstractmethod
+from pathlib import Path
+from datetime import datetime
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+class Sink(ABC):
+    """A destination for transcripts, fed through its own queue and thread.
+
+    publish() never blocks, so a slow or stuck destination never holds
+    up the pipeline or the other sinks. Events wait in a queue of
+    OUTPUT_SINK_QUEUE; a partial replaces the text of one still waiting
+    for the same dictation, as only the latest text so far matters, and
+    other partials are dropped, and counted, while the queue is full.
+    Transcripts are never dropped: each ends a dictation and may be all
+    of it.
+
+    Events are dicts: {'type': 'transcript', 'id', 'time', 'language',
+    'text'} for each dictation, and while streaming {'type': 'partial',
+    'id', 'text'} with the text so far, which sinks other than the
+    keyboard only pass on with OUTPUT_PARTIALS. A streamed dictation
+    always ends with its transcript event, even if the text came out
+    empty, so the keyboard can take back what it typed; the other sinks
+    pass empty transcripts on only with OUTPUT_PARTIALS, to close the
+    partials they sent.
+    """
+
+    name = 'sink'
+
+    def __init__(self, queue_size: int = None):
+        self.queue = collections.deque()
+        self.queue_size = queue_size or Config.OUTPUT_SINK_QUEUE
+        self.pending = {}  # Dictation id -> its partial waiting in the queue
+        self._cond = threading.Condition()
+        self.format = Config.OUTPUT_FORMAT
+        self.partials = Config.OUTPUT_PARTIALS
+        self.delivered = 0
+        self.dropped = 0
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, name=f'sink-{self.name}', daemon=True)
+        self.thread.start()
+
+    def publish(self, event) -> bool:
+        with self._cond:
+            kind = event['type'] if isinstance(event, dict) else None
+            if kind == 'partial' and event['id'] in self.pending:
+                self.pending[event['id']]['text'] = event['text']
+                return True
+            if kind != 'transcript' and len(self.queue) >= self.queue_size:
+                self.dropped += 1
+                logger.warning(f"{self} is not keeping up, dropped an event ({self.dropped} so far)")
+                return False
+            if kind == 'partial':
+                event = self.pending[event['id']] = dict(event)  # Own copy, updated in place
+            self.queue.append(event)
+            self._cond.notify()
+            return True
+
+    def _next(self):
+        with self._cond:
+            while not self.queue:
+                self._cond.wait()
+            event = self.queue.popleft()
+            if isinstance(event, dict) and self.pending.get(event.get('id')) is event:
+                del self.pending[event['id']]
+            return event
+
+    def _run(self):
+        while not self.stopped:
+            event = self._next()
+            if event is None:
+                break
+            try:
+                self.deliver(event)
+                self.delivered += 1
+            except Exception as e:
+                logger.error(f"{self} failed to deliver an event: {e}")
+        self.cleanup()
+
+    @abstractmethod
+    def deliver(self, event):
+        """Send one event to the destination; runs on the sink's thread"""
+
+    def serialize(self, event) -> bytes:
+        """The event as a line in OUTPUT_FORMAT, or None if this sink skips it"""
+        if event['type'] == 'partial' and not self.partials:
+            return None
+        if self.format == 'text':
+            return (event['text'] + "\n").encode() if event['type'] == 'transcript' and event['text'].strip() else None
+        if event['type'] == 'transcript' and not event['text'].strip() and not self.partials:
+            return None  # Only of interest to readers that saw its partials
+        return (json.dumps(event, ensure_ascii=False) + "\n").encode()
+
+    def close(self, timeout: float = None):
+        """Deliver what is queued, then release the destination"""
+        with self._cond:
+            self.queue.append(None)
+            self._cond.notify()
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            self.stopped = True  # Stuck delivering; give up on the rest
+
+    def cleanup(self):
+        pass
+
+    def stats(self) -> dict:
+        return {'queued': len(self.queue), 'delivered': self.delivered, 'dropped': self.dropped}
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+class KeyboardSink(Sink):
+    """Types transcripts at the cursor with a TextOutput, streamed ones word by word"""
+
+    name = 'keyboard'
+
+    def __init__(self, output):
+        self.output = output  # TextOutput
+        self.writers = {}  # Dictation id -> IncrementalText while it streams
+        super().__init__()
+
+    def deliver(self, event):
+        if event['type'] == 'partial':
+            writer = self.writers.setdefault(event['id'], self.output.incremental())
+            writer.update(event['text'])
+        elif event['id'] in self.writers:
+            self.writers.pop(event['id']).update(event['text'], final=True)  # Erases it all if the text is empty
+        elif event['text'].strip():
+            self.output.write_text(event['text'])
+
+class StdoutSink(Sink):
+    """Lines on standard output, for piping into another program"""
+
+    name = 'stdout'
+
+    def deliver(self, event):
+        data = self.serialize(event)
+        if data:
+            sys.stdout.buffer.write(data)
+            sys.stdout.flush()
+
+class FileSink(Sink):
+    """Lines appended to OUTPUT_FILE, flushed as they are written"""
+
+    name = 'file'
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path or Config.OUTPUT_FILE)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, 'ab')
+        super().__init__()
+
+    def deliver(self, event):
+        data = self.serialize(event)
+        if data:
+            self.file.write(data)
+            self.file.flush()
+
+    def cleanup(self):
+        self.file.close()
+
+    def __repr__(self):
+        return f"FileSink({self.path})"
+
+class FifoSink(Sink):
+    """Lines written to the named pipe OUTPUT_FIFO for a reader on the same host.
+
+    Events arriving while no reader has the pipe open are dropped; a
+    reader that stops reading blocks only this sink's thread.
+    """
+
+    name = 'fifo'
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path or Config.OUTPUT_FIFO)
+        if not self.path.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            os.mkfifo(self.path, 0o600)
+        elif not stat.S_ISFIFO(self.path.stat().st_mode):
+            raise ValueError(f"{self.path} exists and is not a named pipe")
+        self.fd = None
+        super().__init__()
+
+    def deliver(self, event):
+        data = self.serialize(event)
+        if not data:
+            return
+        if self.fd is None:
+            try:
+                self.fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                if e.errno == errno.ENXIO:
+                    return  # No reader
+                raise
+            os.set_blocking(self.fd, True)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self.fd, view):]
+        except BrokenPipeError:
+            logger.info(f"Reader of {self.path} went away")
+            os.close(self.fd)
+            self.fd = None
+
+    def cleanup(self):
+        if self.fd is not None:
+            os.close(self.fd)
+
+    def __repr__(self):
+        return f"FifoSink({self.path})"
+
+class Subscriber(Sink):
+    """One connection to a SocketSink, with its own queue so it can fall behind alone"""
+
+    name = 'subscriber'
+
+    def __init__(self, connection: socket.socket, on_close):
+        self.connection = connection
+        self.on_close = on_close
+        super().__init__()
+
+    def deliver(self, event):
+        data = self.serialize(event)
+        if not data:
+            return
+        try:
+            self.connection.sendall(data)
+        except OSError:
+            self.stopped = True
+            self.on_close(self)
+
+    def cleanup(self):
+        self.connection.close()
+
+class SocketSink(Sink):
+    """Publishes lines on the Unix socket OUTPUT_SOCKET to every connected subscriber.
+
+    Any number of readers can connect (e.g. `socat - UNIX-CONNECT:PATH`)
+    and each gets every event from then on. Subscribers have their own
+    queues, so one that reads slowly only loses its own partials.
+    """
+
+    name = 'socket'
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path or Config.OUTPUT_SOCKET)
+        self.subscribers = []
+        self._lock = threading.Lock()
+        if self.path.exists() and stat.S_ISSOCK(self.path.stat().st_mode):
+            self.path.unlink()  # Left over from a previous run
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(str(self.path))
+        os.chmod(self.path, 0o600)
+        self.server.listen()
+        threading.Thread(target=self._accept, daemon=True).start()
+        super().__init__()
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return  # Closed
+            connection.shutdown(socket.SHUT_RD)
+            with self._lock:
+                self.subscribers.append(Subscriber(connection, self._remove))
+            logger.info(f"Subscriber connected to {self.path}")
+
+    def _remove(self, subscriber):
+        with self._lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+                logger.info(f"Subscriber disconnected from {self.path}")
+
+    def deliver(self, event):
+        if not self.serialize(event):
+            return
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.publish(event)
+
+    def cleanup(self):
+        self.server.close()
+        with self._lock:
+            subscribers, self.subscribers = self.subscribers, []
+        for subscriber in subscribers:
+            subscriber.close(timeout=1)
+            try:
+                subscriber.connection.shutdown(socket.SHUT_RDWR)  # Unblocks a send to a reader that stopped
+            except OSError:
+                pass
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        with self._lock:
+            stats['subscribers'] = len(self.subscribers)
+        return stats
+
+    def __repr__(self):
+        return f"SocketSink({self.path})"
+
+# Sinks by Config.OUTPUT_SINKS name
+SINKS = {
+    'keyboard': KeyboardSink,
+    'stdout': StdoutSink,
+    'file': FileSink,
+    'fifo': FifoSink,
+    'socket': SocketSink,
+}
+
+class StreamedText:
+    """Publishes a streaming dictation's text so far; stands in for IncrementalText in the pipeline"""
+
+    def __init__(self, sinks, number: int):
+        self.sinks = sinks
+        self.number = number
+        self.text = ""
+
+    def update(self, text: str, final: bool = False) -> bool:
+        if final:
+            # Published even when empty, so the keyboard erases the words it typed
+            return self.sinks.publish(self.sinks.event(self.number, text)) and bool(text.strip())
+        if text == self.text:
+            return False
+        self.text = text
+        published = self.sinks.publish({'type': 'partial', 'id': self.number, 'text': text})
+        return published and bool(text[:text.rfind(' ') + 1].strip())
+
+class OutputSinks:
+    """Fans each transcript out to every sink; called like TextOutput.write_text"""
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+        self._count = 0
+        self._lock = threading.Lock()
+        logger.info(f"Output sinks: {', '.join(repr(sink) for sink in sinks)}")
+
+    def _next(self) -> int:
+        with self._lock:
+            self._count += 1
+            return self._count
+
+    def event(self, number: int, text: str) -> dict:
+        return {
+            'type': 'transcript',
+            'id': number,
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'language': Config.CURRENT_LANGUAGE,
+            'text': text,
+        }
+
+    def __call__(self, text: str) -> bool:
+        if not text or not text.strip():
+            return False
+        return self.publish(self.event(self._next(), text))
+
+    def publish(self, event) -> bool:
+        """Queue the event on every sink; True if any took it"""
+        return any([sink.publish(event) for sink in self.sinks])
+
+    def reinsert(self, text: str) -> bool:
+        """Type `text` again; only the keyboard gets it, as it is not a new dictation"""
+        event = self.event(None, text)
+        return any([sink.publish(event) for sink in self.sinks if isinstance(sink, KeyboardSink)])
+
+    def incremental(self) -> StreamedText:
+        return StreamedText(self, self._next())
+
+    def close(self, timeout: float = None):
+        for sink in self.sinks:
+            sink.close(timeout)
+
+    def stats(self) -> dict:
+        return {sink.name: sink.stats() for sink in self.sinks}
+
+def create_sinks(text_output=None, names: str = None) -> OutputSinks:
+    """The sinks named in `names` or Config.OUTPUT_SINKS; the keyboard one types with `text_output`"""
+    sinks = []
+    for name in (names or Config.OUTPUT_SINKS).split(','):
+        name = name.strip()
+        try:
+            sinks.append(KeyboardSink(text_output) if name == 'keyboard' else SINKS[name]())
+        except Exception as e:
+            logger.error(f"Failed to open output sink '{name}': {e}")
+    return OutputSinks(sinks)
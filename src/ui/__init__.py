@@ -1,3 +1,13 @@
-from .tray_icon import TrayIcon
-from .keyboard_handler import KeyboardHandler
-from .text_output import TextOutput 
\ No newline at end of file
+def __getattr__(name):
+    # Imported on first use, so the display-independent parts of the UI
+    # (such as IncrementalText) load without a display or GUI libraries
+    if name == 'TrayIcon':
+        from .tray_icon import TrayIcon
+        return TrayIcon
+    if name == 'KeyboardHandler':
+        from .keyboard_handler import KeyboardHandler
+        return KeyboardHandler
+    if name == 'TextOutput':
+        from .text_output import TextOutput
+        return TextOutput
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
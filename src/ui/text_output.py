@@ -1,31 +1,227 @@
+import shutil
 import logging
-import pyautogui
+import subprocess
 import time
+from abc import ABC, abstractmethod
+from ..config import Config
 
 logger = logging.getLogger(__name__)
 
+class OutputStrategy(ABC):
+    """One way of getting text to the cursor"""
+
+    name = 'strategy'
+    unicode = True  # Whether non-ASCII text comes out intact
+
+    def available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def write(self, text: str):
+        """Insert `text` at the cursor; raises on failure"""
+
+class ClipboardPaste(OutputStrategy):
+    """Put the text on the clipboard, send the paste shortcut, then restore the clipboard.
+
+    The whole text lands in one event whatever its length or script. The
+    previous clipboard is put back after OUTPUT_CLIPBOARD_RESTORE_DELAY,
+    giving the target application time to read the pasted text first;
+    only text contents can be restored.
+    """
+
+    name = 'clipboard'
+
+    def __init__(self):
+        if shutil.which('xclip'):
+            self.copy = ['xclip', '-selection', 'clipboard', '-in']
+            self.paste = ['xclip', '-selection', 'clipboard', '-out']
+        elif shutil.which('xsel'):
+            self.copy = ['xsel', '--clipboard', '--input']
+            self.paste = ['xsel', '--clipboard', '--output']
+        else:
+            self.copy = self.paste = None
+        self.xdotool = shutil.which('xdotool')
+
+    def available(self) -> bool:
+        return self.copy is not None
+
+    def _get(self):
+        """Current clipboard text, or None if it is empty or not text"""
+        try:
+            result = subprocess.run(self.paste, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, timeout=1)
+            return result.stdout.decode() if result.returncode == 0 else None
+        except (subprocess.TimeoutExpired, UnicodeDecodeError):
+            return None
+
+    def _set(self, text: str):
+        # xclip and xsel fork to serve the selection; their output must not be captured
+        subprocess.run(self.copy, input=text.encode(), stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, timeout=1, check=True)
+
+    def _send_paste(self):
+        keys = Config.OUTPUT_PASTE_KEYS
+        if self.xdotool:
+            subprocess.run([self.xdotool, 'key', '--clearmodifiers', keys], check=True, timeout=2)
+        else:
+            import pyautogui
+            pyautogui.hotkey(*keys.split('+'))
+
+    def write(self, text: str):
+        previous = self._get()
+        self._set(text)
+        self._send_paste()
+        if previous is not None and previous != text:
+            time.sleep(Config.OUTPUT_CLIPBOARD_RESTORE_DELAY)
+            self._set(previous)
+
+class XdotoolType(OutputStrategy):
+    """`xdotool type` in one call: any Unicode text, typed without per-key round trips from Python"""
+
+    name = 'xdotool'
+
+    def __init__(self):
+        self.xdotool = shutil.which('xdotool')
+
+    def available(self) -> bool:
+        return self.xdotool is not None
+
+    def write(self, text: str):
+        subprocess.run([self.xdotool, 'type', '--clearmodifiers', '--delay', str(Config.OUTPUT_TYPE_DELAY_MS),
+                        '--', text], check=True, timeout=max(len(text) * 0.05, 10))
+
+class KeystrokeType(OutputStrategy):
+    """pyautogui's one synthesized key event per character; ASCII only"""
+
+    name = 'keys'
+    unicode = False
+
+    def write(self, text: str):
+        import pyautogui
+        pyautogui.write(text)
+
+# Strategies by Config.OUTPUT_METHOD name, fastest first
+STRATEGIES = {
+    'clipboard': ClipboardPaste,
+    'xdotool': XdotoolType,
+    'keys': KeystrokeType,
+}
+
+class IncrementalText:
+    """Text typed a piece at a time as a streamed transcript grows.
+
+    update() is given the whole text so far and types only what is new.
+    Until the final update the last word is held back, as it may still
+    change; where an update disagrees with what was already typed (the
+    service corrected itself, or a retry started over) the differing
+    tail is erased with backspaces and retyped.
+    """
+
+    def __init__(self, output):
+        self.output = output  # Has insert(text) and erase(count)
+        self.typed = ""
+        self.corrections = 0  # Characters erased
+
+    def update(self, text: str, final: bool = False) -> bool:
+        """Bring the typed text in line with `text`; True if anything was typed"""
+        if not final:
+            text = text[:text.rfind(' ') + 1]
+        elif self.typed.startswith(text) and not self.typed[len(text):].strip():
+            return False  # Only a trailing space was typed beyond the final text
+        common = 0
+        for typed, new in zip(self.typed, text):
+            if typed != new:
+                break
+            common += 1
+        if common == len(self.typed) == len(text):
+            return False
+        if common < len(self.typed):
+            erase = len(self.typed) - common
+            logger.debug(f"Correcting {self.typed[common:]!r} to {text[common:]!r}")
+            if not self.output.erase(erase):
+                return False
+            self.corrections += erase
+            self.typed = self.typed[:common]
+        if len(text) > common:
+            if not self.output.insert(text[common:]):
+                return False
+            self.typed = text
+        return True
+
 class TextOutput:
-    @staticmethod
-    def write_text(text: str):
+    """Writes text at the cursor with the best available strategy.
+
+    With OUTPUT_METHOD 'auto' the strategies are tried fastest first,
+    skipping those whose tools are not installed and, for non-ASCII text,
+    per-key typing which would mangle it; if one fails the next is tried.
+    Streamed transcripts are typed through incremental(), which prefers
+    typing to pasting so a clipboard restore does not hold up every word.
+    """
+
+    def __init__(self, method: str = None):
+        method = method or Config.OUTPUT_METHOD
+        names = list(STRATEGIES) if method == 'auto' else [method]
+        self.strategies = [strategy for strategy in (STRATEGIES[name]() for name in names) if strategy.available()]
+        if not self.strategies:
+            logger.warning(f"Output method '{method}' is not available, typing key by key")
+            self.strategies = [KeystrokeType()]
+        logger.info(f"Text output: {', '.join(strategy.name for strategy in self.strategies)}")
+        self.xdotool = shutil.which('xdotool')
+
+    def write_text(self, text: str):
         """Write text to current cursor position"""
         try:
             if not text or not text.strip():
                 logger.warning("Empty text received, nothing to write")
                 return False
-                
-            # Add a small delay to ensure the system is ready
-            time.sleep(0.1)
-            
-            # Write text with error handling
-            try:
-                logger.debug(f"Writing text: {text[:50]}...")
-                pyautogui.write(text)
+
+            if Config.OUTPUT_DELAY > 0:
+                time.sleep(Config.OUTPUT_DELAY)
+
+            if self._write(text, self.strategies):
                 logger.info("Text written successfully")
                 return True
+            return False
+
+        except Exception as e:
+            logger.error(f"Failed to write text: {e}")
+            return False
+
+    def _write(self, text: str, strategies) -> bool:
+        import pyautogui
+        if not text.isascii():
+            strategies = [strategy for strategy in strategies if strategy.unicode] or strategies
+        for strategy in strategies:
+            try:
+                logger.debug(f"Writing text with {strategy.name}: {text[:50]}...")
+                strategy.write(text)
+                return True
             except pyautogui.FailSafeException:
                 logger.error("FailSafe triggered while writing text")
                 return False
-                
+            except Exception as e:
+                logger.warning(f"Writing text with {strategy.name} failed: {e}")
+        return False
+
+    def insert(self, text: str) -> bool:
+        """Type one piece of a streamed transcript"""
+        strategies = sorted(self.strategies, key=lambda strategy: isinstance(strategy, ClipboardPaste))
+        return self._write(text, strategies)
+
+    def erase(self, count: int) -> bool:
+        """Delete the `count` characters before the cursor"""
+        try:
+            if self.xdotool:
+                subprocess.run([self.xdotool, 'key', '--clearmodifiers', '--repeat', str(count), 'BackSpace'],
+                               check=True, timeout=max(count * 0.05, 10))
+            else:
+                import pyautogui
+                pyautogui.press('backspace', presses=count)
+            return True
         except Exception as e:
-            logger.error(f"Failed to write text: {e}")
-            return False 
\ No newline at end of file
+            logger.error(f"Failed to erase text: {e}")
+            return False
+
+    def incremental(self) -> IncrementalText:
+        """Writer for one streamed dictation"""
+        return IncrementalText(self)
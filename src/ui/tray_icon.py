@@ -10,10 +10,11 @@ from ..config import Config
 logger = logging.getLogger(__name__)
 
 class TrayIcon:
-    def __init__(self, on_exit=None):
+    def __init__(self, on_exit=None, on_reinsert=None):
         logger.debug("Initializing TrayIcon")
         self.icon = None
         self.on_exit = on_exit
+        self.on_reinsert = on_reinsert
         self.menu_items = None
         
     def create_icon(self, color):
@@ -45,6 +46,12 @@ class TrayIcon:
             logger.debug("Calling exit handler")
             self.on_exit()
             
+    def _handle_reinsert(self):
+        """Handle re-insert menu item click"""
+        logger.debug("Re-insert menu item clicked")
+        if self.on_reinsert:
+            self.on_reinsert()
+            
     def _handle_about(self):
         """Show about information"""
         logger.debug("About menu item clicked")
@@ -97,6 +104,11 @@ class TrayIcon:
                     enabled=False
                 ),
                 pystray.Menu.SEPARATOR,
+                pystray.MenuItem(
+                    "Re-insert Last Transcript",
+                    self._handle_reinsert,
+                    enabled=lambda item: self.on_reinsert is not None
+                ),
                 pystray.MenuItem(
                     "Language",
                     pystray.Menu(*language_items)
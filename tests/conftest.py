@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config import Config
+
+@pytest.fixture(autouse=True)
+def config():
+    """Config as the tests left it is put back afterwards"""
+    saved = {name: value for name, value in vars(Config).items() if name.isupper()}
+    yield Config
+    for name, value in saved.items():
+        setattr(Config, name, value)
@@ -0,0 +1,71 @@
+import io
+import time
+import threading
+
+import pytest
+
+from src.audio import admission
+from src.audio.backends import FakeBackend, FakeWhisperServer
+from src.audio.transcriber import Transcriber
+
+@pytest.fixture(autouse=True)
+def fresh_controllers(config):
+    """Controllers are shared per URL, and a new server may reuse an old one's port"""
+    config.HTTP_KEEPALIVE_INTERVAL = 0
+    config.RETRY_BASE_DELAY = 0.01
+    admission._controllers.clear()
+    yield
+    admission._controllers.clear()
+
+def upload():
+    audio = io.BytesIO(b'\0' * 32000)
+    audio.name = 'segment_0.wav'
+    return audio
+
+def test_window_shrinks_on_429(config):
+    """Concurrent clients over the server's limit make the window shrink, and nothing is lost"""
+    config.ADMISSION_INITIAL_WINDOW = 8
+    config.TRANSCRIPTION_WORKERS = 8
+    server = FakeWhisperServer(latency=0.1, max_concurrency=2, seed=1)
+    transcriber = Transcriber(FakeBackend(server))
+    texts = []
+
+    def client():
+        for _ in range(3):
+            texts.append(transcriber.transcribe(upload()))
+
+    clients = [threading.Thread(target=client) for _ in range(8)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    stats = transcriber.admission.stats()
+    transcriber.close()
+    server.close()
+    assert texts == ["hello world"] * 24
+    assert server.rejected > 0
+    assert stats['throttled'] == server.rejected
+    assert stats['window'] < 8
+
+def test_retry_after_is_honoured(config):
+    """After a 429 the request is not sent again until Retry-After has passed"""
+    server = FakeWhisperServer(rate_limit=1.0, seed=1)  # One request per second
+    transcriber = Transcriber(FakeBackend(server))
+    results = []
+
+    def client():
+        started = time.perf_counter()
+        text = transcriber.transcribe(upload())
+        results.append((text, time.perf_counter() - started))
+
+    # Sent together before any rate-limit headers are known: one gets a 429 with Retry-After 1 s
+    clients = [threading.Thread(target=client) for _ in range(2)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    transcriber.close()
+    server.close()
+    assert [text for text, _ in results] == ["hello world"] * 2
+    assert server.rejected == 1  # The retry waited instead of being rejected again
+    assert max(elapsed for _, elapsed in results) >= 0.9
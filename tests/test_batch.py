@@ -0,0 +1,86 @@
+import json
+import wave
+
+import numpy as np
+import pytest
+
+from src.audio.backends import FakeBackend, FakeWhisperServer
+from src.audio.sources import synthesize_speech
+from src.batch import BatchTranscriber
+
+@pytest.fixture
+def config(config):
+    """Batch settings as main() makes them, with short segments"""
+    config.CAPTURE_MODE = 'blocking'
+    config.WARM_STREAM = False
+    config.UPLOAD_CODEC = 'wav'
+    config.MAX_DICTATION_LENGTH = float('inf')
+    config.SEGMENT_TARGET_LENGTH = 2.0
+    config.HTTP_KEEPALIVE_INTERVAL = 0
+    return config
+
+def write_wav(path, seconds: float, seed: int):
+    audio, _ = synthesize_speech(seconds, seed=seed)
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes((audio * 32767).astype(np.int16).tobytes())
+
+@pytest.fixture
+def recordings(tmp_path):
+    """A folder of recordings, longest first so later ones can finish first"""
+    folder = tmp_path / 'audio'
+    (folder / 'sub').mkdir(parents=True)
+    write_wav(folder / 'a.wav', 12.0, 0)
+    write_wav(folder / 'b.wav', 3.0, 1)
+    write_wav(folder / 'sub' / 'c.wav', 5.0, 2)
+    return folder
+
+def run(config, folder, output, server):
+    batch = BatchTranscriber(output, concurrency=4, backend=FakeBackend(server))
+    summary = batch.run([folder])
+    return summary, [json.loads(line) for line in output.read_text().splitlines()]
+
+def test_results_in_input_order_and_resumed(config, recordings, tmp_path):
+    """Each file gets one record, in input order, and a second run skips them all"""
+    output = tmp_path / 'transcripts.jsonl'
+    server = FakeWhisperServer(latency=0.05, slow=0.3, slow_rate=0.3, seed=1)
+    summary, records = run(config, recordings, output, server)
+    assert [record['path'] for record in records] == [
+        str(path.resolve()) for path in (recordings / 'a.wav', recordings / 'b.wav', recordings / 'sub' / 'c.wav')]
+    assert summary['files'] == 3 and summary['failed_segments'] == 0
+    assert len(records[0]['segments']) > 2
+    for record in records:
+        assert record['failed'] == 0 and record['error'] is None
+        assert record['text'] == " ".join(["hello world"] * len(record['segments']))
+
+    summary, records = run(config, recordings, output, server)
+    server.close()
+    assert summary['files'] == 0 and summary['skipped'] == 3
+    assert len(records) == 3
+
+def test_failed_segments_counted_and_retried(config, recordings, tmp_path):
+    """Segments whose request failed are counted, and their files are done again on the next run"""
+    config.RETRY_MAX_ATTEMPTS = 1
+    output = tmp_path / 'transcripts.jsonl'
+    server = FakeWhisperServer(error_rate=1.0)
+    summary, records = run(config, recordings, output, server)
+    server.close()
+    assert summary['failed_segments'] == sum(len(record['segments']) for record in records) > 0
+    assert all(record['failed'] == len(record['segments']) for record in records)
+
+    server = FakeWhisperServer()
+    summary, records = run(config, recordings, output, server)
+    server.close()
+    assert summary['files'] == 3 and summary['skipped'] == 0 and summary['failed_segments'] == 0
+    assert [record['failed'] for record in records[3:]] == [0, 0, 0]
+
+def test_empty_transcripts_are_not_failures(config, recordings, tmp_path):
+    """A segment that comes back empty, like music or silence, is a result"""
+    output = tmp_path / 'transcripts.jsonl'
+    server = FakeWhisperServer(text="")
+    summary, records = run(config, recordings, output, server)
+    server.close()
+    assert summary['failed_segments'] == 0
+    assert all(record['text'] == "" and record['failed'] == 0 for record in records)
@@ -0,0 +1,98 @@
+import time
+
+import numpy as np
+
+from src.audio.cache import TranscriptCache
+from src.audio.recorder import AudioRecorder
+from src.audio.sources import SyntheticSource
+from src.pipeline import TranscriptionPipeline
+
+def test_key_depends_on_audio_language_and_model():
+    """Only the same samples in the same language and model share a key"""
+    pcm = np.arange(1000, dtype=np.int16)
+    key = TranscriptCache.key(pcm, 'en', 'whisper-1')
+    assert key == TranscriptCache.key(pcm.copy(), 'en', 'whisper-1')
+    assert key != TranscriptCache.key(pcm[1:], 'en', 'whisper-1')
+    assert key != TranscriptCache.key(pcm, 'pt', 'whisper-1')
+    assert key != TranscriptCache.key(pcm, 'en', 'other')
+
+def test_least_recently_used_entries_are_evicted():
+    """A lookup keeps an entry; the one unused longest goes when the cache is full"""
+    cache = TranscriptCache(capacity=3)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    assert cache.get('a') == 'A'  # Now the most recently used
+    cache.put('d', 'D')
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == ['A', 'C', 'D']
+    assert cache.stats() == {'entries': 3, 'hits': 4, 'misses': 1}
+
+def test_failures_are_not_cached():
+    """An empty transcript is not stored, so the audio is sent again next time"""
+    cache = TranscriptCache(capacity=3)
+    cache.put('a', "")
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+def test_last_text_needs_every_segment():
+    """The last dictation is only read back while all its segments are cached"""
+    cache = TranscriptCache(capacity=3)
+    cache.put('a', " hello ")
+    cache.put('b', "world")
+    assert cache.last_text() is None
+    cache.set_last(['a', 'b'])
+    assert cache.last_text() == "hello world"
+    cache.put('c', "x")
+    cache.put('d', "y")  # Evicts 'a'
+    assert cache.last_text() is None
+
+def test_reinsert_reads_the_cache(config):
+    """reinsert_last() writes the cached last dictation through the re-insert output"""
+    config.CAPTURE_MODE = 'blocking'
+    config.WARM_STREAM = False
+    config.TRANSCRIPT_CACHE_ENTRIES = 8
+    config.TRANSCRIPT_CACHE_PERSIST = False
+    output, reinserted = [], []
+    recorder = AudioRecorder(source=SyntheticSource(1.0))
+    pipeline = TranscriptionPipeline(recorder, None, output.append, reinsert=reinserted.append)
+    assert not pipeline.reinsert_last()
+    pipeline.cache.put('a', "hello")
+    pipeline.cache.put('b', "again")
+    pipeline.cache.set_last(['a', 'b'])
+    pipeline.reinsert_last()
+    recorder.cleanup()
+    assert reinserted == ["hello again"]
+    assert output == []
+
+def test_saved_under_the_size_cap_and_reloaded(config, tmp_path):
+    """The oldest entries are dropped to fit TRANSCRIPT_CACHE_MAX_BYTES; the rest come back in order"""
+    config.TRANSCRIPT_CACHE_MAX_BYTES = 4000
+    config.TRANSCRIPT_CACHE_SAVE_DELAY = 60.0
+    path = tmp_path / 'transcripts.json'
+    cache = TranscriptCache(capacity=100, path=path)
+    for number in range(100):
+        cache.put(f"key{number}", f"transcript {number} " + "x" * 80)
+    cache.set_last(['key99'])
+    started = time.monotonic()
+    cache.close()
+    assert time.monotonic() - started < 5  # Written at close, not after the delay
+    assert 0 < path.stat().st_size <= 4000
+
+    reloaded = TranscriptCache(capacity=100, path=path)
+    keys = list(reloaded.entries)
+    assert 0 < len(keys) < 100
+    assert keys == [f"key{number}" for number in range(100 - len(keys), 100)]
+    assert reloaded.last_text() == cache.last_text()
+    reloaded.close()
+
+def test_unreadable_file_is_ignored(tmp_path):
+    """A corrupt cache file starts an empty cache, which then replaces it"""
+    path = tmp_path / 'transcripts.json'
+    path.write_text("{not json")
+    cache = TranscriptCache(capacity=3, path=path)
+    assert cache.get('a') is None
+    cache.put('a', "hello")
+    cache.close()
+    reloaded = TranscriptCache(capacity=3, path=path)
+    assert reloaded.get('a') == "hello"
+    reloaded.close()
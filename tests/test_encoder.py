@@ -0,0 +1,116 @@
+import time
+import shutil
+import itertools
+import threading
+import subprocess
+
+import numpy as np
+import pytest
+
+from src.audio import recorder as recorder_module
+from src.audio.encoder import StreamingEncoder
+from src.audio.recorder import AudioRecorder
+from src.audio.segmenter import Segment, Segmenter
+from src.audio.sources import SyntheticSource, synthesize_speech
+from src.audio.vad import VoiceActivityDetector
+from src.config import Config
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="needs ffmpeg")
+
+@pytest.fixture
+def config(config):
+    config.CAPTURE_MODE = 'blocking'
+    config.WARM_STREAM = False
+    config.UPLOAD_CODEC = 'flac'
+    return config
+
+@pytest.fixture
+def started(monkeypatch):
+    """Encoders the recorder starts, each taking a moment to launch"""
+    encoders = []
+
+    class SlowEncoder(StreamingEncoder):
+        def __init__(self, *args, **kwargs):
+            time.sleep(0.2)
+            super().__init__(*args, **kwargs)
+            encoders.append(self)
+
+    monkeypatch.setattr(recorder_module, 'StreamingEncoder', SlowEncoder)
+    return encoders
+
+def wait_spawned(recorder):
+    deadline = time.monotonic() + 5
+    while recorder._spawning and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def test_one_spare_encoder_at_a_time(config, started):
+    """Preparing again while the spare is still launching does not start a second process"""
+    recorder = AudioRecorder(source=SyntheticSource(1.0))
+    threads = [threading.Thread(target=recorder._prepare_encoder) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wait_spawned(recorder)
+    assert len(started) == 1
+    assert recorder._spare_encoder is started[0]
+    recorder.cleanup()
+    assert started[0].process.poll() is not None
+
+def test_spare_started_after_cleanup_is_aborted(config, started):
+    """An encoder that finishes launching after cleanup() is stopped rather than leaked"""
+    recorder = AudioRecorder(source=SyntheticSource(1.0))
+    recorder._prepare_encoder()
+    recorder.cleanup()
+    wait_spawned(recorder)
+    assert len(started) == 1
+    assert recorder._spare_encoder is None
+    started[0].process.wait(timeout=5)  # Aborted just after the launch thread lets go of the lock
+    recorder._prepare_encoder()
+    wait_spawned(recorder)
+    assert len(started) == 1  # None started once cleaned up
+
+def decode(encoded) -> np.ndarray:
+    """Samples of an encoded upload, decoded back to int16 with ffmpeg"""
+    result = subprocess.run(['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0', '-f', 's16le', 'pipe:1'],
+                            input=encoded.getvalue(), stdout=subprocess.PIPE, check=True)
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+def stream(seconds: float, gains):
+    """Feed synthetic speech to a StreamingEncoder chunk by chunk, as the recorder does.
+
+    The VAD regions, and so the kept spans, grow as capture proceeds;
+    `gains` yields the gain for each feed. Returns the decoded upload
+    and the segment as it stands at the close.
+    """
+    samples, _ = synthesize_speech(seconds, seed=3)
+    audio = (samples * 32767).astype(np.int16)
+    vad = VoiceActivityDetector()
+    segmenter = Segmenter()
+    encoder = StreamingEncoder()
+    for start, gain in zip(range(0, len(audio), Config.CHUNK), gains):
+        end = min(start + Config.CHUNK, len(audio))
+        vad.process(samples[start:end])
+        encoder.feed(audio[:end], segmenter.keep_spans(vad.regions, 0, end), gain)
+    vad.finish()
+    segment = Segment(0, 0, len(audio), audio, gain, Config.RATE)
+    segment.spans = segmenter.keep_spans(vad.regions, 0, len(audio))
+    encoder.feed(audio, segment.spans, gain)
+    return decode(encoder.finish()), segment
+
+def test_streamed_upload_matches_the_compacted_segment(config):
+    """Encoding during capture gives the same samples as compacting the closed segment"""
+    decoded, segment = stream(8.0, itertools.repeat(1.5))
+    assert len(segment.spans) > 2  # Several pauses were shortened
+    expected = np.clip(segment.compacted() * 1.5, -32768, 32767)
+    assert len(decoded) == len(expected)
+    assert np.abs(decoded - expected).max() <= 2  # Rounding of the fades and the gain
+
+def test_streamed_upload_follows_the_gain(config):
+    """Samples are scaled by the gain of the feed that sent them, ramping where it changes"""
+    feeds = int(8.0 * Config.RATE) // Config.CHUNK
+    decoded, segment = stream(8.0, itertools.chain([1.0] * (feeds // 2), itertools.repeat(2.0)))
+    compacted = segment.compacted().astype(np.float32)
+    part = len(decoded) * 4 // 10  # Well clear of the feed that ramped
+    assert np.abs(decoded[:part] - compacted[:part]).max() <= 2
+    assert np.abs(decoded[-part:] - np.clip(compacted[-part:] * 2.0, -32768, 32767)).max() <= 2
@@ -0,0 +1,119 @@
+import time
+import hashlib
+import threading
+
+import pytest
+
+from src.audio.recorder import AudioRecorder
+from src.audio.sources import SyntheticSource
+from src.pipeline import TranscriptionPipeline
+
+SECONDS = 6.0
+
+class FakeTranscriber:
+    """Answers with a fingerprint of the uploaded audio; the first request waits for `hold`"""
+
+    def __init__(self):
+        self.hold = threading.Event()
+        self.finished = []  # Answers in the order their requests completed
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio, prompt=None, on_text=None) -> str:
+        with self._lock:
+            first = self.calls == 0
+            self.calls += 1
+        if first:
+            self.hold.wait(10)
+        text = hashlib.sha1(audio.getvalue()).hexdigest()[:8]
+        with self._lock:
+            self.finished.append(text)
+        return text
+
+@pytest.fixture
+def config(config):
+    config.CAPTURE_MODE = 'blocking'
+    config.WARM_STREAM = False
+    config.UPLOAD_CODEC = 'wav'
+    config.STREAMING = False
+    config.TRANSCRIPT_CACHE_ENTRIES = 0
+    return config
+
+def record(recorder, seed: int, seconds: float = SECONDS):
+    recorder.source = SyntheticSource(seconds, seed=seed)
+    recorder.start()
+    while recorder.record_chunk():
+        pass
+    recorder.stop()
+
+def expected_text(seed: int, seconds: float = SECONDS) -> str:
+    """The text of a dictation recorded on its own, with nothing else in flight"""
+    recorder = AudioRecorder(source=SyntheticSource(seconds, seed=seed))
+    segments = []
+    recorder.on_segment = segments.append
+    record(recorder, seed, seconds)
+    recorder.finish_recording()
+    text = " ".join(hashlib.sha1(recorder.encode_segment(segment).getvalue()).hexdigest()[:8]
+                    for segment in segments)
+    recorder.cleanup()
+    return text
+
+def dictate(pipeline, recorder, seeds, seconds: float = SECONDS):
+    for seed in seeds:
+        assert pipeline.begin() is not None
+        record(recorder, seed, seconds)
+        pipeline.finish(time.perf_counter())
+
+def test_output_in_order_when_later_dictations_finish_first(config):
+    """Dictations are written in the order they began even if later ones are transcribed first"""
+    config.TRANSCRIPTION_WORKERS = 4
+    expected = [expected_text(seed) for seed in range(3)]
+    transcriber = FakeTranscriber()
+    recorder = AudioRecorder(source=SyntheticSource(SECONDS))
+    output = []
+    pipeline = TranscriptionPipeline(recorder, transcriber, output.append)
+    dictate(pipeline, recorder, range(3))
+    segments = sum(len(text.split()) for text in expected)
+    deadline = time.monotonic() + 10
+    while len(transcriber.finished) < segments - 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert output == []  # Everything else is done, but the first dictation is still waiting
+    transcriber.hold.set()
+    assert pipeline.wait_idle(timeout=10)
+    recorder.cleanup()
+    assert output == expected
+    assert transcriber.finished[-1] == expected[0].split()[0]
+
+def test_overlapping_dictations_keep_their_audio(config):
+    """Segments still queued when the next dictation records are not overwritten by it"""
+    config.TRANSCRIPTION_WORKERS = 1
+    config.PIPELINE_QUEUE_SIZE = 1
+    config.SEGMENT_TARGET_LENGTH = 1.0  # Several segments per dictation, most left waiting
+    expected = [expected_text(seed, 15.0) for seed in range(3)]
+    assert all(len(text.split()) > 2 for text in expected)
+    transcriber = FakeTranscriber()
+    recorder = AudioRecorder(source=SyntheticSource(SECONDS))
+    output = []
+    pipeline = TranscriptionPipeline(recorder, transcriber, output.append)
+    dictate(pipeline, recorder, range(3), 15.0)
+    transcriber.hold.set()
+    assert pipeline.wait_idle(timeout=10)
+    recorder.cleanup()
+    assert output == expected
+
+def test_begin_refuses_presses_at_max_pending(config):
+    """No new dictation starts while MAX_PENDING_DICTATIONS are in flight"""
+    config.MAX_PENDING_DICTATIONS = 2
+    transcriber = FakeTranscriber()
+    recorder = AudioRecorder(source=SyntheticSource(SECONDS))
+    output = []
+    pipeline = TranscriptionPipeline(recorder, transcriber, output.append)
+    dictate(pipeline, recorder, range(2))
+    assert pipeline.begin() is None
+    transcriber.hold.set()
+    assert pipeline.wait_idle(timeout=10)
+    assert pipeline.begin() is not None
+    pipeline.cancel()
+    assert pipeline.wait_idle(timeout=10)
+    recorder.cleanup()
+    assert len(output) == 2
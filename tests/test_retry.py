@@ -0,0 +1,84 @@
+import io
+import time
+
+import pytest
+
+from src.audio.backends import FakeBackend, FakeWhisperServer
+from src.audio.transcriber import Transcriber
+
+@pytest.fixture
+def upload():
+    audio = io.BytesIO(b'\0' * 32000)
+    audio.name = 'segment_0.wav'
+    return audio
+
+@pytest.fixture(autouse=True)
+def quick_retries(config):
+    config.HTTP_KEEPALIVE_INTERVAL = 0
+    config.RETRY_BASE_DELAY = 0.01
+    config.RETRY_MAX_DELAY = 0.05
+
+def transcribe_all(server, upload, count):
+    transcriber = Transcriber(FakeBackend(server))
+    try:
+        latencies, texts = [], []
+        for _ in range(count):
+            started = time.perf_counter()
+            texts.append(transcriber.transcribe(upload))
+            latencies.append(time.perf_counter() - started)
+        return texts, latencies, transcriber.policy.stats()
+    finally:
+        transcriber.close()
+
+def test_no_lost_transcriptions_with_server_errors(config, upload):
+    """Retries recover every transcription when the server fails a fifth of requests with 503"""
+    config.RETRY_MAX_ATTEMPTS = 1
+    server = FakeWhisperServer(error_rate=0.2, seed=1)
+    texts, _, _ = transcribe_all(server, upload, 50)
+    server.close()
+    assert texts.count("") > 0  # Without retries some are lost
+
+    config.RETRY_MAX_ATTEMPTS = 5
+    server = FakeWhisperServer(error_rate=0.2, seed=1)
+    texts, _, stats = transcribe_all(server, upload, 50)
+    server.close()
+    assert texts == ["hello world"] * 50
+    assert stats['retries'] > 0
+    assert server.requests == 50 + stats['retries']
+
+class StallingServer(FakeWhisperServer):
+    """FakeWhisperServer that holds the next request a second before answering once `stall` is set"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.stall = False
+
+    def _respond(self, size: int):
+        with self._lock:
+            stalled, self.stall = self.stall, False
+        if stalled:
+            time.sleep(1.0)
+        return super()._respond(size)
+
+def test_hedge_fires_past_p95(config, upload):
+    """A request slower than the observed p95 gets a duplicate, and the duplicate's answer is used"""
+    config.HEDGE = True
+    config.HEDGE_BUDGET = 0.5
+    server = StallingServer(latency=0.02, seed=1)
+    transcriber = Transcriber(FakeBackend(server))
+    for _ in range(config.HEDGE_WINDOW):  # Enough that p95 is not the first, connecting request
+        transcriber.transcribe(upload)
+    before = transcriber.policy.stats()
+
+    server.stall = True
+    started = time.perf_counter()
+    text = transcriber.transcribe(upload)
+    latency = time.perf_counter() - started
+    after = transcriber.policy.stats()
+    time.sleep(1.0)  # Let the stalled request finish before the server goes
+    transcriber.close()
+    server.close()
+    assert text == "hello world"
+    assert after['hedges'] == before['hedges'] + 1
+    assert after['hedge_wins'] == before['hedge_wins'] + 1
+    assert latency < 0.5  # Answered by the hedge, long before the stalled request
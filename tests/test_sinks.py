@@ -0,0 +1,94 @@
+import json
+import time
+
+from src.sinks import FileSink, KeyboardSink, OutputSinks
+from src.ui.text_output import IncrementalText
+
+class Screen:
+    """Stand-in TextOutput that applies typed text and backspaces"""
+
+    def __init__(self, delay: float = 0.0):
+        self.content = ""
+        self.delay = delay  # Seconds to type each piece
+
+    def write_text(self, text: str) -> bool:
+        return self.insert(text)
+
+    def insert(self, text: str) -> bool:
+        time.sleep(self.delay)
+        self.content += text
+        return True
+
+    def erase(self, count: int) -> bool:
+        self.content = self.content[:-count]
+        return True
+
+    def incremental(self) -> IncrementalText:
+        return IncrementalText(self)
+
+def open_sinks(config, tmp_path, partials=False):
+    config.OUTPUT_PARTIALS = partials
+    screen = Screen()
+    keyboard = KeyboardSink(screen)
+    sinks = OutputSinks([keyboard, FileSink(tmp_path / 'out.jsonl')])
+    return sinks, keyboard, screen
+
+def lines(tmp_path):
+    return [json.loads(line) for line in (tmp_path / 'out.jsonl').read_text().splitlines()]
+
+def test_empty_final_erases_and_releases_the_writer(config, tmp_path):
+    """A streamed dictation that ends up empty is erased from the screen and its writer dropped"""
+    sinks, keyboard, screen = open_sinks(config, tmp_path)
+    streamed = sinks.incremental()
+    streamed.update("so what I mean ")
+    streamed.update("", final=True)
+    sinks.close(timeout=5)
+    assert screen.content == ""
+    assert keyboard.writers == {}
+    assert lines(tmp_path) == []  # Nothing for readers that saw no partials
+
+def test_empty_final_closes_partials(config, tmp_path):
+    """Readers that were sent partials get the empty transcript that ends them"""
+    sinks, _, _ = open_sinks(config, tmp_path, partials=True)
+    streamed = sinks.incremental()
+    streamed.update("so what I mean ")
+    streamed.update("", final=True)
+    sinks.close(timeout=5)
+    assert [(event['type'], event['text']) for event in lines(tmp_path)] == [
+        ('partial', "so what I mean "), ('transcript', "")]
+
+def test_reinsert_types_without_publishing(config, tmp_path):
+    """Re-inserted text is typed again but not published as a new dictation"""
+    sinks, _, screen = open_sinks(config, tmp_path)
+    sinks("hello there")
+    sinks.reinsert("hello there")
+    sinks.close(timeout=5)
+    assert screen.content == "hello therehello there"
+    assert [event['text'] for event in lines(tmp_path)] == ["hello there"]
+
+def test_slow_keyboard_gets_the_final_text(config):
+    """Partials pile up behind slow typing, but the corrected final text still arrives"""
+    config.OUTPUT_SINK_QUEUE = 5
+    screen = Screen(delay=0.01)
+    keyboard = KeyboardSink(screen)
+    sinks = OutputSinks([keyboard])
+    words = [f"word{i}" for i in range(200)]
+    streamed = sinks.incremental()
+    for count in range(1, len(words) + 1):
+        streamed.update(" ".join(words[:count]) + " ")
+    final = " ".join(words[:-1] + ["corrected"])
+    assert streamed.update(final, final=True)
+    sinks.close(timeout=10)
+    assert screen.content == final
+    assert keyboard.writers == {}
+    assert keyboard.dropped == 0  # Merged into the partial already waiting
+
+def test_transcripts_are_never_dropped(config):
+    """Whole dictations queue past OUTPUT_SINK_QUEUE rather than being lost"""
+    config.OUTPUT_SINK_QUEUE = 2
+    screen = Screen(delay=0.01)
+    sinks = OutputSinks([KeyboardSink(screen)])
+    for number in range(20):
+        assert sinks(f"{number} ")
+    sinks.close(timeout=10)
+    assert screen.content == "".join(f"{number} " for number in range(20))
@@ -0,0 +1,78 @@
+import pytest
+
+from src.audio.backends import FakeBackend, FakeWhisperServer
+from src.audio.recorder import AudioRecorder
+from src.audio.sources import SyntheticSource
+from src.audio.transcriber import Transcriber
+from src.pipeline import TranscriptionPipeline
+from src.ui.text_output import IncrementalText
+
+TEXT = "we agreed to move the staging environment first"
+
+class Screen:
+    """Applies typed text and backspaces like a text box, keeping every state it showed"""
+
+    def __init__(self):
+        self.content = ""
+        self.shown = []
+
+    def write_text(self, text: str) -> bool:
+        return self.insert(text)
+
+    def insert(self, text: str) -> bool:
+        self.content += text
+        self.shown.append(self.content)
+        return True
+
+    def erase(self, count: int) -> bool:
+        self.content = self.content[:-count]
+        self.shown.append(self.content)
+        return True
+
+    def incremental(self) -> IncrementalText:
+        return IncrementalText(self)
+
+@pytest.fixture(autouse=True)
+def streaming(config):
+    config.STREAMING = True
+    config.CAPTURE_MODE = 'blocking'
+    config.WARM_STREAM = False
+    config.UPLOAD_CODEC = 'wav'
+    config.HTTP_KEEPALIVE_INTERVAL = 0
+    config.TRANSCRIPT_CACHE_ENTRIES = 0
+    config.SEGMENT_TARGET_LENGTH = 30.0  # One segment per dictation
+
+def dictate(server) -> Screen:
+    """Record a short synthetic dictation and stream its transcript onto a Screen"""
+    transcriber = Transcriber(FakeBackend(server))
+    recorder = AudioRecorder(source=SyntheticSource(4))
+    screen = Screen()
+    pipeline = TranscriptionPipeline(recorder, transcriber, screen.write_text, incremental=screen.incremental)
+    try:
+        pipeline.begin()
+        recorder.start()
+        while recorder.record_chunk():
+            pass
+        recorder.stop()
+        pipeline.finish()
+        assert pipeline.wait_idle(timeout=10)
+    finally:
+        recorder.cleanup()
+        transcriber.close()
+        server.close()
+    return screen
+
+def test_streamed_words_converge_to_final_text():
+    """Words appear as they stream; a mistake in them is corrected once the final text arrives"""
+    server = FakeWhisperServer(text=TEXT, stream_text=TEXT.replace("staging", "stage in"), stream_interval=0.01)
+    screen = dictate(server)
+    assert screen.content.strip() == TEXT
+    assert any(shown.startswith("we agreed") and len(shown) < len(TEXT) for shown in screen.shown)
+    assert any("stage in" in shown for shown in screen.shown)
+
+def test_empty_final_text_erases_streamed_words():
+    """A transcript that ends up empty takes back the words typed while it streamed"""
+    server = FakeWhisperServer(text="", stream_text="um so the ", stream_interval=0.01)
+    screen = dictate(server)
+    assert any(shown.strip() for shown in screen.shown)
+    assert screen.content == ""
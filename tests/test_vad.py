@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from src.audio.sources import synthesize_speech
+from src.audio.vad import VoiceActivityDetector
+from src.config import Config
+
+SECONDS = 20
+MIN_ACCURACY = 0.9
+MIN_RECALL = 0.97
+
+def score(audio, labels):
+    """Frame accuracy and speech recall of the VAD against the fixture's labels.
+
+    As in benchmarks/bench_vad.py, silence within the pre-pad before an
+    onset or the hangover after an offset is not scored.
+    """
+    vad = VoiceActivityDetector(Config.RATE)
+    for i in range(0, len(audio), Config.CHUNK):
+        vad.process(audio[i:i + Config.CHUNK])
+    vad.finish()
+
+    predicted = np.zeros(len(audio), dtype=bool)
+    for start, end in vad.regions:
+        predicted[start:end] = True
+    changes = np.diff(labels.astype(np.int8))
+    scored = np.ones(len(labels), dtype=bool)
+    for onset in np.flatnonzero(changes == 1) + 1:
+        scored[max(onset - int((Config.VAD_PREPAD_MS / 1000 + 0.05) * Config.RATE), 0):onset] = False
+    for offset in np.flatnonzero(changes == -1) + 1:
+        scored[offset:offset + int((Config.VAD_HANGOVER_MS / 1000 + 0.05) * Config.RATE)] = False
+    scored |= labels
+
+    accuracy = np.count_nonzero((predicted == labels) & scored) / np.count_nonzero(scored)
+    recall = np.count_nonzero(predicted & labels) / np.count_nonzero(labels)
+    return accuracy, recall
+
+@pytest.mark.parametrize('snr_db', [30, 20, 10])
+def test_accuracy_and_recall(snr_db):
+    """Speech is found and silence mostly left out on the labeled fixture"""
+    audio, labels = synthesize_speech(SECONDS, Config.RATE, snr_db, seed=1)
+    accuracy, recall = score(audio, labels)
+    assert accuracy >= MIN_ACCURACY
+    assert recall >= MIN_RECALL
+
+def test_few_false_alarms_in_noise():
+    """Background noise alone is almost never taken for speech"""
+    audio, _ = synthesize_speech(SECONDS, Config.RATE, 20, seed=1, with_speech=False)
+    vad = VoiceActivityDetector(Config.RATE)
+    for i in range(0, len(audio), Config.CHUNK):
+        vad.process(audio[i:i + Config.CHUNK])
+    vad.finish()
+    assert vad.speech_samples() / len(audio) <= 1 - MIN_ACCURACY